@@ -0,0 +1,294 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import device_tree_generator as dtg
+from core.generator import get_metadata, GenerationError
+from soc_generator import generate_soc_header
+
+"""
+Benchmark of the parse, build and render pipeline
+
+A synthetic soc.h is generated for each scale, then the stages of the
+generator are run and timed separately. Each scale is run @repeat times after
+a warm up run, the fastest time of each stage is kept. The results are saved
+as json, so a baseline saved on one commit can be compared with another.
+"""
+
+# format 1 baselines timed a wrong parse of the scales with more than 10
+# peripherals of a type
+BENCHMARK_FORMAT = 2
+
+SCALES = {
+    "small": {"uarts": 10, "spis": 10, "gpios": 10, "apb_slaves": 10, "axi_slaves": 10,
+              "cores": 4, "axi_buses": 2},
+    "medium": {"uarts": 100, "spis": 100, "gpios": 100, "apb_slaves": 100, "axi_slaves": 100,
+               "cores": 16, "axi_buses": 4},
+    "large": {"uarts": 1000, "spis": 1000, "gpios": 1000, "apb_slaves": 1000, "axi_slaves": 1000,
+              "cores": 64, "axi_buses": 8},
+    "xlarge": {"uarts": 4000, "spis": 4000, "gpios": 4000, "apb_slaves": 4000, "axi_slaves": 4000,
+               "cores": 256, "axi_buses": 26}
+}
+
+DEFAULT_SCALES = ["small", "medium", "large"]
+
+STAGES = ["parse_soc_config", "create_root_nodes", "create_bus_nodes", "override_peripherals",
+          "render_dtsi", "render_dts"]
+
+"""
+get_user_config: user configuration which overrides every peripheral
+
+@params (dict): peripheral counts of the scale
+
+return (dict): user configuration with an override per peripheral
+"""
+def get_user_config(params):
+    overrides = {}
+
+    for kind, key in [('UART', 'uarts'), ('SPI', 'spis'), ('GPIO', 'gpios'),
+                      ('APB_SLAVE', 'apb_slaves'), ('AXI_SLAVE', 'axi_slaves')]:
+        for i in range(params[key]):
+            overrides["{}_{}".format(kind, i)] = {"status": "okay"}
+
+    return {"overrides": overrides}
+
+"""
+check_parse: check the parsed peripherals against the generated soc.h, so
+the timed stages work on a correct soc configuration
+
+@soc_config (dict): soc configuration from parse_soc_config()
+@layout (dict): peripherals of the generated soc.h, see generate_soc_header()
+
+raise ValueError: a peripheral is missing or parsed with a wrong address,
+size or interrupts
+"""
+def check_parse(soc_config, layout):
+    for kind, expected in layout.items():
+        parsed = soc_config['peripherals'].get(kind, {})
+        if len(parsed) != len(expected):
+            raise ValueError("%d %s parsed instead of %d" % (len(parsed), kind, len(expected)))
+
+        for name, (addr, size, interrupts) in expected.items():
+            peri = parsed.get(name)
+            if peri is None:
+                raise ValueError("%s is not parsed" % name)
+
+            if (peri.addr, peri.size, tuple(peri.interrupts)) != (addr, size, interrupts):
+                raise ValueError("%s parsed at %s size %s interrupts %s instead of %s size %s interrupts %s" %
+                                 (name, hex(peri.addr), hex(peri.size), peri.interrupts,
+                                  hex(addr), hex(size), interrupts))
+
+"""
+run_pipeline: run and time the stages of a generation
+
+@soc_path (str): path to soc.h
+@metadata (dict): metadata of the root node
+@user_cfg (dict): user configuration with overrides
+
+return (dict): time of each stage in second
+"""
+def run_pipeline(soc_path, metadata, user_cfg):
+    times = {}
+    dtsi_template, dts_template = dtg.get_templates()
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        times[stage] = time.perf_counter() - start
+        return result
+
+    # the warnings of the generation are not printed
+    warnings = []
+    soc_config = timed("parse_soc_config", dtg.parse_soc_config, soc_path, warnings)
+    timed("create_root_nodes", dtg.create_root_nodes, soc_config, metadata, "sapphire_soc_bench.dtsi")
+    buses_node = timed("create_bus_nodes", dtg.create_bus_nodes, soc_config, warnings)
+    timed("override_peripherals", dtg.override_peripherals, buses_node, user_cfg, None, warnings)
+    soc_config['root'].update(buses_node)
+    timed("render_dtsi", dtsi_template.render, soc_config)
+    timed("render_dts", dts_template.render, soc_config)
+
+    return times
+
+"""
+run_scale: benchmark a scale
+
+@params (dict): arguments of generate_soc_header()
+@metadata (dict): metadata of the root node
+@repeat (int): number of timed runs
+
+return (dict): result of the scale, fastest time of each stage
+
+raise ValueError: soc.h is not parsed correctly, see check_parse()
+"""
+def run_scale(params, metadata, repeat):
+    layout = {}
+    header = generate_soc_header(layout=layout, **params)
+    user_cfg = get_user_config(params)
+
+    with tempfile.TemporaryDirectory() as d:
+        soc_path = os.path.join(d, "soc.h")
+        with open(soc_path, 'w') as f:
+            f.write(header)
+
+        soc_config = dtg.parse_soc_config(soc_path, [])
+        check_parse(soc_config, layout)
+
+        # warm up, load the configuration files and compile the templates
+        run_pipeline(soc_path, metadata, user_cfg)
+
+        runs = [run_pipeline(soc_path, metadata, user_cfg) for _ in range(repeat)]
+
+    stages = {stage: min(run[stage] for run in runs) for stage in STAGES}
+
+    return {
+        "params": params,
+        "lines": header.count('\n'),
+        "peripherals": len(user_cfg['overrides']),
+        "stages": stages,
+        "total": sum(stages.values())
+    }
+
+def get_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return out.stdout.decode().strip()
+
+def print_results(results):
+    print("{:<8} {:>7} {:>6}  {}".format("scale", "lines", "nodes",
+          " ".join("{:>20}".format(s) for s in STAGES + ["total"])))
+
+    for name, r in results['scales'].items():
+        times = [r['stages'][s] for s in STAGES] + [r['total']]
+        print("{:<8} {:>7} {:>6}  {}".format(name, r['lines'], r['peripherals'],
+              " ".join("{:>18.2f}ms".format(t * 1000) for t in times)))
+
+"""
+compare_results: compare the results with a baseline
+
+A stage is a regression when it is slower than the baseline by more than
+@threshold percent and by more than @min_delta.
+
+@baseline (dict): results of the baseline
+@results (dict): results of the current run
+@threshold (float): allowed slow down in percent
+@min_delta (float): allowed slow down in second, to ignore the noise of the fast stages
+
+return (list): list of (scale, stage, baseline time, current time) of the regressions
+"""
+def compare_results(baseline, results, threshold, min_delta):
+    regressions = []
+
+    print("Info: compare with baseline of commit %s" % baseline.get('commit'))
+    print("{:<8} {:<22} {:>12} {:>12} {:>8}".format("scale", "stage", "baseline", "current", "ratio"))
+
+    for name, r in results['scales'].items():
+        if name not in baseline['scales']:
+            continue
+
+        base = baseline['scales'][name]
+        if base['params'] != r['params']:
+            print("Warning: scale %s has different parameters in the baseline, skipped" % name)
+            continue
+
+        for stage in STAGES + ["total"]:
+            if stage == "total":
+                old, new = base['total'], r['total']
+            elif stage in base['stages']:
+                old, new = base['stages'][stage], r['stages'][stage]
+            else:
+                continue
+
+            ratio = new / old if old else float('inf')
+            mark = ''
+            if new > old * (1 + threshold / 100.0) and new - old > min_delta:
+                mark = '  REGRESSION'
+                if stage != "total":
+                    regressions.append((name, stage, old, new))
+
+            print("{:<8} {:<22} {:>10.2f}ms {:>10.2f}ms {:>7.2f}x{}".format(
+                  name, stage, old * 1000, new * 1000, ratio, mark))
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the device tree generator pipeline')
+    parser.add_argument('-s', '--scale', action='append', choices=list(SCALES),
+            help='Scale to run, could be repeated. By default is %s' % ', '.join(DEFAULT_SCALES))
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Number of timed runs of each scale. By default is 3')
+    parser.add_argument('-b', '--board', type=str, default='ti180', help='Development kit name. By default is ti180')
+    parser.add_argument('--os', type=str, default='linux', choices=['linux', 'uboot', 'zephyr'], help='Target OS. By default is linux')
+    parser.add_argument('-o', '--output', type=str, help='Save the results as a json baseline')
+    parser.add_argument('-c', '--compare', type=str, help='Compare the results with a json baseline, exit with status 1 on regression')
+    parser.add_argument('--threshold', type=float, default=20.0, help='Allowed slow down of a stage in percent. By default is 20')
+    parser.add_argument('--min-delta', type=float, default=1.0, help='Allowed slow down of a stage in ms. By default is 1')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+        if baseline.get('format') != BENCHMARK_FORMAT:
+            print("Error: %s is not a benchmark baseline of format %d" % (args.compare, BENCHMARK_FORMAT))
+            return 1
+
+    try:
+        metadata = get_metadata(args.board, args.os)
+    except GenerationError as e:
+        print("Error: %s" % e)
+        return 1
+
+    results = {
+        "format": BENCHMARK_FORMAT,
+        "commit": get_commit(),
+        "generator_version": dtg.GENERATOR_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "board": metadata['board'],
+        "os": args.os,
+        "repeat": args.repeat,
+        "scales": {}
+    }
+
+    for name in args.scale or DEFAULT_SCALES:
+        print("Info: run scale %s" % name, file=sys.stderr)
+        try:
+            results['scales'][name] = run_scale(SCALES[name], metadata, args.repeat)
+        except ValueError as e:
+            print("Error: scale %s: %s" % (name, e))
+            return 1
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print("Info: results stored in %s" % args.output)
+
+    if baseline:
+        regressions = compare_results(baseline, results, args.threshold, args.min_delta / 1000.0)
+        if regressions:
+            print("Error: %d stages are slower than the baseline" % len(regressions))
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
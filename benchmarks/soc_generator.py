@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import argparse
+
+"""
+Synthetic soc.h generator
+
+Generate a soc.h with the same layout as the headers of Efinity IP Manager,
+with any number of cores, AXI buses and peripherals. The peripherals are
+placed one after the other on the BMB peripheral bus, the AXI slaves are
+spread over the AXI buses. Each peripheral has its own interrupt number.
+"""
+
+BMB_ADDR = 0xf8000000
+BMB_SIZE = 0x1000000
+PERIPHERAL_ADDR = 0xf8010000
+PERIPHERAL_SIZE = 0x100
+PLIC_ADDR = 0xf8c00000
+CLINT_ADDR = 0xf8b00000
+AXI_ADDR = 0x80000000
+AXI_SIZE = 0x1000000
+AXI_SLAVE_SIZE = 0x1000
+
+# the AXI buses are named SYSTEM_AXI_A_BMB to SYSTEM_AXI_Z_BMB
+MAX_AXI_BUSES = 26
+
+"""
+generate_soc_header: generate the content of a synthetic soc.h
+
+@uarts, @spis, @gpios (int): number of uart, spi and gpio
+@apb_slaves (int): number of APB slaves
+@axi_slaves (int): number of AXI slaves
+@cores (int): number of cpu cores
+@axi_buses (int): number of AXI buses, at most 26
+@layout (dict): if given, filled with the (address, size, interrupts) of
+                every peripheral by type and name, such as
+                layout['UART']['UART_0']
+
+return (str): content of soc.h
+"""
+def generate_soc_header(uarts=1, spis=1, gpios=1, apb_slaves=1, axi_slaves=0, cores=1, axi_buses=1,
+                        layout=None):
+    if axi_buses > MAX_AXI_BUSES:
+        raise ValueError("at most %d AXI buses are supported" % MAX_AXI_BUSES)
+
+    if axi_slaves and not axi_buses:
+        raise ValueError("AXI slaves require at least one AXI bus")
+
+    if axi_buses and axi_slaves > axi_buses * (AXI_SIZE // AXI_SLAVE_SIZE):
+        raise ValueError("too many AXI slaves for %d AXI buses" % axi_buses)
+
+    peripherals = uarts + spis + gpios + apb_slaves
+    if PERIPHERAL_ADDR + peripherals * PERIPHERAL_SIZE > CLINT_ADDR:
+        raise ValueError("too many peripherals for the BMB peripheral bus")
+
+    if layout is None:
+        layout = {}
+
+    lines = ["#ifndef SOC_H", "#define SOC_H"]
+    for ext in ['RV32I', 'EXT_M', 'EXT_A', 'EXT_C', 'EXT_F', 'EXT_D', 'EXT_ZICSR', 'EXT_ZIFENCEI']:
+        lines.append("#define SYSTEM_RISCV_ISA_{} 1".format(ext))
+
+    irq = 0
+    for core in range(cores):
+        lines.append("#define SYSTEM_PLIC_SYSTEM_CORES_{}_EXTERNAL_INTERRUPT {}".format(core, irq))
+        lines.append("#define SYSTEM_PLIC_SYSTEM_CORES_{}_EXTERNAL_SUPERVISOR_INTERRUPT {}".format(core, irq + 1))
+        irq += 2
+
+    lines.append("#define SYSTEM_CLINT_HZ 100000000")
+    lines.append("#define SYSTEM_RAM_A_SIZE 4096")
+
+    for core in range(cores):
+        for name, value in [('CFU', 0), ('FPU', 1), ('MMU', 1), ('ICACHE_WAYS', 8), ('ICACHE_SIZE', 32768),
+                            ('BYTES_PER_LINE', 64), ('DCACHE_WAYS', 8), ('DCACHE_SIZE', 32768),
+                            ('SUPERVISOR', 1)]:
+            lines.append("#define SYSTEM_CORES_{}_{} {}".format(core, name, value))
+
+    lines.append("#define SYSTEM_BRIDGE_BMB 0x0")
+    lines.append("#define SYSTEM_RAM_A_CTRL 0xf9000000")
+    lines.append("#define SYSTEM_RAM_A_CTRL_SIZE 0x1000")
+    lines.append("#define SYSTEM_BMB_PERIPHERAL_BMB {}".format(hex(BMB_ADDR)))
+    lines.append("#define SYSTEM_BMB_PERIPHERAL_BMB_SIZE {}".format(hex(BMB_SIZE)))
+    lines.append("#define SYSTEM_PLIC_CTRL {}".format(hex(PLIC_ADDR)))
+    lines.append("#define SYSTEM_PLIC_CTRL_SIZE 0x400000")
+    lines.append("#define SYSTEM_CLINT_CTRL {}".format(hex(CLINT_ADDR)))
+    lines.append("#define SYSTEM_CLINT_CTRL_SIZE 0x10000")
+
+    irq = max(irq, 32)
+    addr = PERIPHERAL_ADDR
+    for kind, count in [('UART', uarts), ('SPI', spis), ('GPIO', gpios)]:
+        for i in range(count):
+            if kind == 'GPIO':
+                lines.append("#define SYSTEM_PLIC_SYSTEM_GPIO_{}_IO_INTERRUPTS_0 {}".format(i, irq))
+                lines.append("#define SYSTEM_PLIC_SYSTEM_GPIO_{}_IO_INTERRUPTS_1 {}".format(i, irq + 1))
+                interrupts = (irq, irq + 1)
+                irq += 2
+            else:
+                lines.append("#define SYSTEM_PLIC_SYSTEM_{}_{}_IO_INTERRUPT {}".format(kind, i, irq))
+                interrupts = (irq,)
+                irq += 1
+
+            lines.append("#define SYSTEM_{}_{}_IO_CTRL {}".format(kind, i, hex(addr)))
+            lines.append("#define SYSTEM_{}_{}_IO_CTRL_SIZE {}".format(kind, i, hex(PERIPHERAL_SIZE)))
+            layout.setdefault(kind, {})["{}_{}".format(kind, i)] = (addr, PERIPHERAL_SIZE, interrupts)
+            addr += PERIPHERAL_SIZE
+
+    for i in range(apb_slaves):
+        lines.append("#define IO_APB_SLAVE_{}_INPUT {}".format(i, hex(addr)))
+        lines.append("#define IO_APB_SLAVE_{}_INPUT_SIZE {}".format(i, hex(PERIPHERAL_SIZE)))
+        layout.setdefault('APB_SLAVE', {})["APB_SLAVE_{}".format(i)] = (addr, PERIPHERAL_SIZE, ())
+        addr += PERIPHERAL_SIZE
+
+    for i in range(axi_slaves):
+        bus = i % axi_buses
+        addr = AXI_ADDR + bus * AXI_SIZE + (i // axi_buses) * AXI_SLAVE_SIZE
+        lines.append("#define SYSTEM_PLIC_SYSTEM_AXI_SLAVE_{}_IO_INTERRUPT {}".format(i, irq))
+        lines.append("#define SYSTEM_AXI_SLAVE_{}_IO_CTRL {}".format(i, hex(addr)))
+        lines.append("#define SYSTEM_AXI_SLAVE_{}_IO_CTRL_SIZE {}".format(i, hex(AXI_SLAVE_SIZE)))
+        layout.setdefault('AXI_SLAVE', {})["AXI_SLAVE_{}".format(i)] = (addr, AXI_SLAVE_SIZE, (irq,))
+        irq += 1
+
+    lines.append("#define SYSTEM_DDR_BMB 0x1000")
+    lines.append("#define SYSTEM_DDR_BMB_SIZE 0x10000000")
+
+    for bus in range(axi_buses):
+        lines.append("#define SYSTEM_AXI_{}_BMB {}".format(chr(65 + bus), hex(AXI_ADDR + bus * AXI_SIZE)))
+        lines.append("#define SYSTEM_AXI_{}_BMB_SIZE {}".format(chr(65 + bus), hex(AXI_SIZE)))
+
+    lines.append("#endif")
+
+    return '\n'.join(lines) + '\n'
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic soc.h for benchmarks')
+    parser.add_argument('output', type=str, help='path to generated soc.h')
+    parser.add_argument('-n', '--count', type=int, default=1, help='Number of each peripheral type, overridden by the options below. By default is 1')
+    parser.add_argument('--uarts', type=int, help='Number of uart')
+    parser.add_argument('--spis', type=int, help='Number of spi')
+    parser.add_argument('--gpios', type=int, help='Number of gpio')
+    parser.add_argument('--apb-slaves', type=int, help='Number of APB slaves')
+    parser.add_argument('--axi-slaves', type=int, help='Number of AXI slaves')
+    parser.add_argument('--cores', type=int, default=1, help='Number of cpu cores. By default is 1')
+    parser.add_argument('--axi-buses', type=int, default=1, help='Number of AXI buses, at most %d. By default is 1' % MAX_AXI_BUSES)
+    args = parser.parse_args()
+
+    def count(value):
+        return args.count if value is None else value
+
+    try:
+        header = generate_soc_header(uarts=count(args.uarts), spis=count(args.spis),
+                                     gpios=count(args.gpios), apb_slaves=count(args.apb_slaves),
+                                     axi_slaves=count(args.axi_slaves), cores=args.cores,
+                                     axi_buses=args.axi_buses)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with open(args.output, 'w') as f:
+        f.write(header)
+
+if __name__ == '__main__':
+    main()
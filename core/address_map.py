@@ -0,0 +1,191 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+from core.core import get_os_data
+from core.utils import parse_int
+from core.stats import stats
+
+"""
+Validation of the address map
+
+The bus, peripheral and memory windows of soc.h, the reserved memory regions
+and the memory mapped images of the OS are put on integer endpoints and
+sorted once by start address, the larger region first. A sweep keeps the
+stack of the regions which contain the current address. Each region must
+end inside the innermost region of the stack, or start after it, and must
+be allowed to be inside it, such as a peripheral inside a bus. So checking
+n regions costs O(n log n), for the sort.
+
+The address ranges of a bus which none of its peripherals, memories or
+nested buses use are reported as gaps. They are not errors.
+"""
+
+# kinds of region which a region of each kind could be inside
+CONTAINERS = {
+    'bus': ('bus',),
+    'memory': ('bus',),
+    'reserved_memory': ('memory',),
+    'peripheral': ('bus',),
+    'memory_mapped': ('memory', 'reserved_memory')
+}
+
+# what the regions of these kinds must be inside
+REQUIRED_CONTAINER = {
+    'peripheral': 'bus',
+    'reserved_memory': 'memory region',
+    'memory_mapped': 'memory region'
+}
+
+# the containers sort first when regions have the same start and end
+KIND_ORDER = {
+    'bus': 0,
+    'memory': 1,
+    'reserved_memory': 2,
+    'peripheral': 3,
+    'memory_mapped': 4
+}
+
+class Region:
+    __slots__ = ('kind', 'name', 'start', 'end', 'parent')
+
+    def __init__(self, kind, name, start, end):
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.end = end
+        self.parent = None
+
+    def __str__(self):
+        if self.start == self.end:
+            return "%s %s at %s" % (self.kind.replace('_', ' '), self.name, hex(self.start))
+
+        return "%s %s [%s, %s)" % (self.kind.replace('_', ' '), self.name, hex(self.start), hex(self.end))
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "start": hex(self.start),
+            "end": hex(self.end),
+            "parent": self.parent.name if self.parent else None
+        }
+
+class AddressMap:
+    __slots__ = ('regions', 'gaps', 'errors')
+
+    def __init__(self, regions, gaps, errors):
+        self.regions = regions
+        self.gaps = gaps
+        self.errors = errors
+
+    def to_dict(self):
+        return {
+            "regions": [r.to_dict() for r in self.regions],
+            "gaps": [{"bus": bus, "start": hex(start), "end": hex(end), "size": hex(end - start)}
+                     for bus, start, end in self.gaps],
+            "errors": list(self.errors)
+        }
+
+"""
+get_regions: get the address regions of a soc configuration
+
+@soc_config (dict): soc configuration from parse_soc_config(), or built for
+                    an OS to check the reserved memory and the memory mapped
+                    images of the OS too
+
+return (list): list of Region, not sorted
+"""
+def get_regions(soc_config):
+    regions = []
+
+    for name, bus in soc_config['buses'].items():
+        regions.append(Region('bus', name, bus.addr, bus.end))
+
+    for group in soc_config['peripherals'].values():
+        for name, peri in group.items():
+            regions.append(Region('peripheral', name, peri.addr, peri.end))
+
+    for name, mem in soc_config['memory'].items():
+        if mem.addr is not None and mem.size:
+            regions.append(Region('memory', name, mem.addr, mem.end))
+
+    reserved = soc_config['root'].get('reserved_memory', {})
+    for name, node in reserved.get('child', {}).items():
+        start = int(node['addr'], 16)
+        regions.append(Region('reserved_memory', name, start, start + int(node['size'], 16)))
+
+    os_data = get_os_data(soc_config) if 'os' in soc_config['root'] else {}
+    for name, addr in os_data.get('memory_mapped', {}).items():
+        addr = parse_int(addr)
+        regions.append(Region('memory_mapped', name, addr, addr))
+
+    return regions
+
+"""
+check_address_map: check that the address regions are disjoint or nested
+as expected
+
+Reported errors: regions which overlap without one being inside the other,
+a region inside a region which can not contain it such as a peripheral
+inside another peripheral, peripherals outside of every bus, reserved
+memory and memory mapped images outside of the memory, and memory mapped
+images at the same address.
+
+@soc_config (dict): soc configuration, see get_regions()
+
+return (AddressMap): regions sorted by address with their parent, gaps as
+(bus, start, end) and errors
+"""
+def check_address_map(soc_config):
+    regions = get_regions(soc_config)
+    stats.count('address_regions', len(regions))
+    regions.sort(key=lambda r: (r.start, -r.end, KIND_ORDER[r.kind]))
+
+    stack = []
+    gaps = []
+    errors = []
+    # end of the last region inside each open bus
+    used = {}
+    images = {}
+
+    def close(region):
+        if region.kind == 'bus' and used[region] < region.end:
+            gaps.append((region.name, used[region], region.end))
+
+    for r in regions:
+        while stack and stack[-1].end <= r.start:
+            close(stack.pop())
+
+        parent = stack[-1] if stack else None
+        if parent and r.end > parent.end:
+            errors.append("%s overlaps %s" % (r, parent))
+        elif parent and parent.kind not in CONTAINERS[r.kind]:
+            errors.append("%s overlaps %s" % (r, parent))
+        else:
+            r.parent = parent
+            if r.kind in REQUIRED_CONTAINER and parent is None:
+                errors.append("%s is outside of every %s" % (r, REQUIRED_CONTAINER[r.kind]))
+
+        if r.kind == 'memory_mapped':
+            if r.start in images:
+                errors.append("%s is at the same address as %s" % (r, images[r.start]))
+            images[r.start] = r
+            continue
+
+        if r.parent and r.parent.kind == 'bus':
+            if used[r.parent] < r.start:
+                gaps.append((r.parent.name, used[r.parent], r.start))
+            used[r.parent] = max(used[r.parent], r.end)
+
+        if r.kind == 'bus':
+            used[r] = r.start
+
+        stack.append(r)
+
+    while stack:
+        close(stack.pop())
+
+    gaps.sort(key=lambda g: g[1])
+
+    return AddressMap(regions, gaps, errors)
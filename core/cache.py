@@ -0,0 +1,393 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import io
+import os
+import json
+import glob
+import hashlib
+import marshal
+
+from core.variables import *
+from core.utils import *
+from core.model import MemoryRegion, Bus, Peripheral, InterruptMap
+from core.stats import stats
+
+_source_digest = None
+
+"""
+get_cache_dir: get the default directory of the output cache
+
+return (str): $XDG_CACHE_HOME/sapphire-soc-dt-generator or
+~/.cache/sapphire-soc-dt-generator
+"""
+def get_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+
+    return os.path.join(base, CACHE_NAME)
+
+"""
+file_digest: get the SHA-256 digest of a file content
+
+@filename (str): path to file
+
+return (str): digest in hex
+"""
+def file_digest(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+"""
+get_source_digest: get the digest of the generator source code
+
+The python files of the generator are part of the cache key, so editing the
+generator invalidates the outputs cached by the previous code.
+
+return (str): digest in hex
+"""
+def get_source_digest():
+    global _source_digest
+
+    if _source_digest is None:
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        files = sorted(glob.glob(os.path.join(root, 'core', '*.py')))
+        files.append(os.path.join(root, 'device_tree_generator.py'))
+
+        h = hashlib.sha256()
+        for f in files:
+            h.update(file_digest(f).encode())
+
+        _source_digest = h.hexdigest()
+
+    return _source_digest
+
+"""
+cache_key: compute the key of a generation from its inputs
+
+@input_files (list): list of (role, path) of every file read by the generation.
+                     Only the content of the file is hashed, not its path.
+@options (dict): command line options which change the outputs
+
+return (str): SHA-256 key in hex
+"""
+def cache_key(input_files, options):
+    h = hashlib.sha256()
+    h.update(GENERATOR_VERSION.encode())
+    h.update(get_source_digest().encode())
+    h.update(json.dumps(options, sort_keys=True).encode())
+
+    for role, filename in input_files:
+        h.update("{}:{}\n".format(role, file_digest(filename)).encode())
+
+    return h.hexdigest()
+
+"""
+evict_entries: remove the least recently used entries of a cache until
+their total size is below a size limit
+
+The modification time of an entry is updated when it is used.
+
+@directories (list): directories of the entries
+@suffix (str): file name extension of the entries
+@max_size (int): size limit of the entries in bytes
+@keep (str): path of an entry which is never removed, the one just stored,
+             its size is counted in the total size
+"""
+def evict_entries(directories, suffix, max_size, keep=None):
+    entries = []
+    total = 0
+    for directory in directories:
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+
+        with it:
+            for entry in it:
+                if not entry.name.endswith(suffix):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                total += st.st_size
+                if entry.path != keep:
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+"""
+touch_entry: mark a cache entry as used, for evict_entries()
+
+@path (str): path of the entry
+"""
+def touch_entry(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+"""
+OutputCache: on-disk cache of the generated outputs
+
+Each entry is a json file named by the cache key which store the content of
+every output such as dtsi, dts and json, and the warnings of the generation.
+The directory could be shared between users or machines, entries are written
+atomically.
+
+The entries are evicted in least recently used order when their total size
+is above @max_size.
+
+@directory (str): cache directory
+@max_size (int): size limit of the entries in bytes
+"""
+class OutputCache:
+    def __init__(self, directory, max_size=OUTPUT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def __path(self, key):
+        return os.path.join(self.directory, key[:2], "{}.json".format(key))
+
+    """
+    lookup: get the outputs of a cached generation
+
+    @key (str): key from cache_key()
+
+    return: (content of the outputs by role, list of warnings), None if not
+    cached
+    """
+    def lookup(self, key):
+        path = self.__path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(entry.get('outputs'), dict):
+            return None
+
+        touch_entry(path)
+
+        return entry['outputs'], entry.get('warnings', [])
+
+    """
+    store: save the outputs of a generation, then evict the least recently
+    used entries above the size limit
+
+    @key (str): key from cache_key()
+    @outputs (dict): content of the outputs by role
+    @warnings (list): warnings of the generation, printed again on a hit
+    """
+    def store(self, key, outputs, warnings=()):
+        path = self.__path(key)
+        try:
+            write_if_changed(path, json.dumps({"outputs": outputs, "warnings": list(warnings)}))
+            self.evict(keep=path)
+        except OSError as e:
+            print("Warning: unable to store output in cache %s: %s" % (self.directory, e))
+
+    """
+    evict: remove the least recently used entries until the total size of
+    the entries is below the size limit
+
+    @keep (str): path of an entry which is never removed, see evict_entries()
+    """
+    def evict(self, keep=None):
+        # the entries are in the sub directories named by the first two
+        # digits of their key
+        with os.scandir(self.directory) as it:
+            directories = [e.path for e in it if len(e.name) == 2 and e.is_dir()]
+
+        evict_entries(directories, '.json', self.max_size, keep)
+
+# header of the parse cache entries, changed when the format of the entries
+# changes
+PARSE_CACHE_MAGIC = b'SDTPARSE2\n'
+
+"""
+encode_soc_config: convert a parsed soc configuration to builtin types
+
+The model objects are stored as tuples of their fields, which marshal
+writes and reads much faster than the objects could be rebuilt from soc.h.
+
+@soc_config (dict): soc configuration from parse_soc_lines()
+
+return (dict): soc configuration made of dict, tuple, str, int and bool
+"""
+def encode_soc_config(soc_config):
+    return {
+        'root': soc_config['root'],
+        'memory': {name: (m.label, m.addr, m.size) for name, m in soc_config['memory'].items()},
+        'peripherals': {
+            _type: {name: (p.type, p.name, p.label, p.addr, p.size, tuple(p.interrupts))
+                    for name, p in group.items()}
+            for _type, group in soc_config['peripherals'].items()
+        },
+        'buses': {name: (b.name, b.label, b.addr, b.size) for name, b in soc_config['buses'].items()},
+        'interrupt_map': tuple(soc_config['interrupt_map'].items())
+    }
+
+"""
+decode_soc_config: rebuild a soc configuration from encode_soc_config()
+
+@data (dict): encoded soc configuration
+
+return (dict): soc configuration, as returned by parse_soc_lines()
+"""
+def decode_soc_config(data):
+    interrupt_map = InterruptMap()
+    for irq, owners in data['interrupt_map']:
+        for owner in owners:
+            interrupt_map.add(irq, owner)
+
+    return {
+        'root': data['root'],
+        'memory': {name: MemoryRegion(*m) for name, m in data['memory'].items()},
+        'peripherals': {
+            _type: {name: Peripheral(*p) for name, p in group.items()}
+            for _type, group in data['peripherals'].items()
+        },
+        'buses': {name: Bus(*b) for name, b in data['buses'].items()},
+        'interrupt_map': interrupt_map
+    }
+
+"""
+parse_key: compute the key of a parsed soc.h
+
+@data (bytes): content of soc.h
+
+return (str): SHA-256 key in hex
+"""
+def parse_key(data):
+    h = hashlib.sha256()
+    h.update(PARSE_CACHE_MAGIC)
+    h.update(GENERATOR_VERSION.encode())
+    h.update(get_source_digest().encode())
+    h.update("marshal:{}\n".format(marshal.version).encode())
+    h.update(hashlib.sha256(data).digest())
+
+    return h.hexdigest()
+
+"""
+ParseCache: on-disk cache of the parsed soc.h
+
+Each entry is the soc configuration parsed from a soc.h, serialized with
+marshal and named by the digest of soc.h and of the parser, see
+parse_key(). An entry is loaded with a single read. marshal only loads
+builtin types, so an entry from a shared directory can not run code, unlike
+pickle.
+
+The entries are evicted in least recently used order when their total size
+is above @max_size: the modification time of an entry is updated when it is
+used.
+
+@directory (str): cache directory, the entries are in its parse sub directory
+@max_size (int): size limit of the entries in bytes
+"""
+class ParseCache:
+    def __init__(self, directory, max_size=PARSE_CACHE_SIZE):
+        self.directory = os.path.join(directory, "parse")
+        self.max_size = max_size
+
+    def __path(self, key):
+        return os.path.join(self.directory, "{}.bin".format(key))
+
+    """
+    lookup: get a cached soc configuration
+
+    @key (str): key from parse_key()
+
+    return: (soc configuration, list of warnings of soc.h), None if not cached
+    """
+    def lookup(self, key):
+        path = self.__path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if not data.startswith(PARSE_CACHE_MAGIC):
+            return None
+
+        try:
+            encoded, warnings = marshal.loads(data[len(PARSE_CACHE_MAGIC):])
+            soc_config = decode_soc_config(encoded)
+        except (EOFError, ValueError, TypeError, KeyError):
+            return None
+
+        touch_entry(path)
+
+        return soc_config, list(warnings)
+
+    """
+    store: save a soc configuration, then evict the least recently used
+    entries above the size limit
+
+    @key (str): key from parse_key()
+    @soc_config (dict): soc configuration from parse_soc_lines()
+    @warnings (list): warnings of soc.h, reported again on a hit
+    """
+    def store(self, key, soc_config, warnings=()):
+        data = PARSE_CACHE_MAGIC + marshal.dumps((encode_soc_config(soc_config), tuple(warnings)))
+        try:
+            write_if_changed(self.__path(key), data)
+            self.evict(keep=self.__path(key))
+        except OSError as e:
+            print("Warning: unable to store parsed soc.h in cache %s: %s" % (self.directory, e))
+
+    """
+    evict: remove the least recently used entries until the total size of
+    the entries is below the size limit
+
+    @keep (str): path of an entry which is never removed, see evict_entries()
+    """
+    def evict(self, keep=None):
+        evict_entries([self.directory], '.bin', self.max_size, keep)
+
+    """
+    parse: parse a soc.h, or get it from the cache
+
+    The warnings of soc.h are reported on a hit too.
+
+    @filename (str): path to soc.h
+    @warnings (list): warnings of the generation, printed to stderr if None
+
+    return (dict): soc configuration, see parse_soc_config()
+    """
+    def parse(self, filename, warnings=None):
+        from core.core import parse_soc_lines
+
+        with stats.stage("read soc.h"):
+            with open(filename, 'rb') as f:
+                data = f.read()
+
+        key = parse_key(data)
+        with stats.stage("parse cache lookup"):
+            entry = self.lookup(key)
+        if entry is not None:
+            stats.count('parse_cache_hits')
+            soc_config, parse_warnings = entry
+        else:
+            # same lines as read_file(), with universal newlines
+            parse_warnings = []
+            soc_config = parse_soc_lines(io.StringIO(data.decode(), newline=None).readlines(),
+                                         parse_warnings)
+            with stats.stage("parse cache store"):
+                self.store(key, soc_config, parse_warnings)
+
+        for w in parse_warnings:
+            warn(warnings, w)
+
+        return soc_config
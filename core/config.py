@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import json
+import hashlib
+from types import MappingProxyType
+
+from core.stats import stats
+
+"""
+freeze: convert a json object into a read-only view
+
+@data: object returned by json.load()
+
+return: dict is converted to MappingProxyType and list to tuple, recursively
+"""
+def freeze(data):
+    if isinstance(data, dict):
+        return MappingProxyType({k: freeze(v) for k, v in data.items()})
+
+    if isinstance(data, list):
+        return tuple(freeze(v) for v in data)
+
+    return data
+
+"""
+thaw: get a mutable copy of a read-only view created by freeze()
+
+@data: read-only view
+
+return: plain dict and list copy of @data which is safe to modify
+"""
+def thaw(data):
+    if isinstance(data, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in data.items()}
+
+    if isinstance(data, (list, tuple)):
+        return [thaw(v) for v in data]
+
+    return data
+
+"""
+ConfigRegistry: cache of the parsed json configuration files
+
+Each file is parsed once and kept as a read-only view. The modification
+time and size of the file are checked on every lookup. When they change,
+the file is read again but only parsed again if its SHA-256 digest is
+different, so touching a file does not invalidate its entry.
+"""
+class ConfigRegistry:
+    def __init__(self):
+        self._entries = {}
+        self.loads = 0
+
+    """
+    get: get the parsed content of a json file
+
+    @filename (str): path to json file
+
+    return: read-only view of the json content
+    """
+    def get(self, filename):
+        stats.count('config_lookups')
+        path = os.path.abspath(filename)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(path)
+        if entry and entry['stamp'] == stamp:
+            return entry['data']
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        digest = hashlib.sha256(raw).hexdigest()
+        if entry and entry['digest'] == digest:
+            entry['stamp'] = stamp
+            return entry['data']
+
+        data = freeze(json.loads(raw))
+        self.loads += 1
+        stats.count('config_loads')
+        self._entries[path] = {
+            "stamp": stamp,
+            "digest": digest,
+            "data": data
+        }
+
+        return data
+
+    def clear(self):
+        self._entries.clear()
+
+config_registry = ConfigRegistry()
+
+"""
+load_config: get the read-only content of a json configuration file
+through the process wide registry
+
+@filename (str): path to json file
+
+return: read-only view of the json content
+"""
+def load_config(filename):
+    return config_registry.get(filename)
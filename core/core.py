@@ -6,6 +6,9 @@ import sys
 import re
 from core.variables import *
 from core.utils import *
+from core.soc_header import *
+from core.model import *
+from core.stats import stats
 
 """
 get_value: get a value for a given property string
@@ -21,24 +24,33 @@ def get_value(prop):
 
     return props[len(props) -1]
 
+"""
+has_peripheral_name: check that a macro name belongs to a peripheral
+
+The peripheral name must be whole tokens of the macro name, so UART_1 is in
+SYSTEM_UART_1_IO_CTRL but not in SYSTEM_UART_11_IO_CTRL.
+
+@prop_name (str): macro name such as SYSTEM_UART_1_IO_CTRL
+@periph_name (str): peripheral name such as UART_1 or PLIC
+
+return (bool): True if the macro belongs to the peripheral
+"""
+def has_peripheral_name(prop_name, periph_name):
+    return '_{}_'.format(periph_name) in '_{}_'.format(prop_name)
+
 """
 get_peripheral_properties: get a list of a peripheral's properties
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripheral (str): peripheral name such as SPI, I2C. Must be in capital letter
 
-return: list of peripheral's properties for a given peripheral
+return: list of peripheral's properties (Define) for a given peripheral
 """
 def __get_peripheral_properties(cfg, peripheral, exclude_properties="", exclude=False):
-    props = []
+    props = cfg.find(peripheral)
 
-    for line in cfg:
-        if exclude:
-            if exclude_properties in line:
-                continue
-
-        if peripheral in line:
-            props.append(line)
+    if exclude:
+        props = [prop for prop in props if not exclude_properties in prop.line]
 
     return props
 
@@ -51,7 +63,7 @@ def get_peripheral_properties(cfg, peripheral):
 get_peripheral_properties_exclude: get a list of a peripheral by excluding the keyword
 which defined in @exclude_properties
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripheral (str): peripheral name such as SPI, I2C. Must be in capital letter
 @exclude_properties (str): the properties to exclude such as SIZE
 @exclude (bool): flag to exclude the properties defined in @exclude_properties
@@ -64,7 +76,7 @@ def get_peripheral_properties_exclude(cfg, peripheral, exclude_properties, exclu
 """
 get_property_value: get the value of peripheral properties from soc.h
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripheral (str): peripheral name such as SPI, I2C. Must be in capital letter
 @name (str): properties name such as SIZE, INTERRUPT
 
@@ -75,21 +87,17 @@ def __get_property_value(cfg, peripheral, name, match=False, exclude=False):
     props = get_peripheral_properties(cfg, peripheral)
 
     if exclude:
-        for prop in props:
-            if name in prop:
-                props.remove(prop)
-
+        props = [prop for prop in props if not name in prop.line]
         name = peripheral
 
     for prop in props:
         if match:
-            prop_name = prop.split()[1]
-            if name == prop_name:
-                value = get_value(prop)
+            if name == prop.name:
+                value = prop.value
 
         else:
-            if name in prop:
-                value = get_value(prop)
+            if name in prop.line:
+                value = prop.value
 
     return value
 
@@ -105,7 +113,7 @@ def get_property_value_exclude(cfg, peripheral, name):
 """
 get_size: get the peripheral allocated memory size
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripheral (str): peripheral name such as SPI, I2C. Must be in capital letter
 
 return: string of size of memory allocated for the peripheral in hex
@@ -138,7 +146,7 @@ def get_base_address(cfg, root_node, bus):
 
     props = get_peripheral_properties(cfg, BASE_ADDR_PROP)
     for prop in props:
-        addr = get_value(prop)
+        addr = prop.value
 
     if 'buses' in root_node['root']:
         if not bus in root_node['root']['buses']:
@@ -156,7 +164,7 @@ def get_base_address(cfg, root_node, bus):
 """
 get_address: get the address of the peripheral
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripheral (str): peripheral name such as SPI, I2C. Must be in capital letter
 
 return: string of address of the peripheral in hex
@@ -180,7 +188,7 @@ def get_address(cfg, peripheral):
 get_peripheral_offset_address: calculate the offset address of peripheral
 from bus address
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripheral (str): peripheral name such as SPI, I2C. Must be in capital letter
 @root_node (dict): node which contain buses node
 @bus (str): bus label on which the peripheral is connected on
@@ -191,7 +199,7 @@ def get_peripheral_offset_address(cfg, peripheral, root_node=None, bus=None):
     addr = get_address(cfg, peripheral)
     base = get_base_address(cfg, root_node, bus)
 
-    offset = hex(int(addr, 0) - int(base, 0))
+    offset = hex(cfg.evaluate(addr) - cfg.evaluate(base))
 
     return offset
 
@@ -217,28 +225,10 @@ def get_bus_address(cfg, bus_name):
 
     return addr
 
-"""
-get_interrupt_id: get interrupt number of peripheral
-
-@cfg (list): raw data of soc.h
-@peripheral (str): peripheral name such as SPI, I2C. Must be in capital letter
-
-return: string of interrupt of the peripheral
-"""
-def get_interrupt_id(cfg, peripheral):
-    irq_name = "{0}_{1}".format(peripheral, INTERRUPT)
-
-    irq = get_property_value(cfg, peripheral, irq_name)
-
-    if not irq.isdigit() and not irq == '':
-        irq = dereference_symbol(cfg, irq)
-
-    return irq
-
 """
 get_frequency: get the frequency of soc
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 
 return: string of soc's frequency
 """
@@ -246,7 +236,7 @@ def get_frequency(cfg):
     freq = ''
     props = get_peripheral_properties(cfg, FREQUENCY)
     for prop in props:
-        freq = get_value(prop)
+        freq = prop.value
 
     return freq
 
@@ -261,7 +251,7 @@ def get_status(okay=False):
 """
 count_peripheral: count the number for the peripheral in the soc
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripheral (str): peripheral name such as SPI, I2C. Must be in capital letter
 
 return: number of peripheral in the soc
@@ -271,10 +261,10 @@ def count_peripheral(cfg, peripheral):
 
     props = get_peripheral_properties_exclude(cfg, peripheral, "SIZE")
     for prop in props:
-        if PERIPHERAL in prop:
+        if PERIPHERAL in prop.line:
             count = count + 1
 
-        if 'APB' in prop:
+        if 'APB' in prop.line:
             count = count + 1
 
     return count
@@ -294,7 +284,7 @@ def get_cpu_count(cfg):
 """
 get_cache_way: get number of I/D cache way
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @cache_type (str): ICACHE or DCACHE cache
 
 return: number of cache way for I or D cache
@@ -362,44 +352,44 @@ def del_node_key(node, keys_to_delete):
     return node
 
 """
-get_cpu_metadata: get metadata of a cpu
+get_cpu: get the cpu of the soc
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 
-return: dict of a cpu metadata
+return (Cpu): cpu of the soc
 """
-def get_cpu_metadata(cfg):
-    cpu_count = get_cpu_count(cfg)
-    cpu_node = {
-        "cpu": {
-            "label": "cpus",
-            "name": "cpu",
-            "cores": cpu_count,
-            "arch": "riscv",
-            "isa": get_cpu_isa(cfg, 0),
-            "tlb": True,
-            "i_cache_size": get_cache_size(cfg, 0, ICACHE),
-            "i_cache_sets": get_cache_way(cfg, 0, ICACHE),
-            "i_cache_block_size": get_cache_block(cfg, 0),
-            "d_cache_size": get_cache_size(cfg, 0, ICACHE),
-            "d_cache_sets": get_cache_way(cfg, 0, ICACHE),
-            "d_cache_block_size": get_cache_block(cfg, 0),
-            "frequency": get_frequency(cfg)
-        }
-    }
+def get_cpu(cfg):
+    cpu = Cpu(cores=get_cpu_count(cfg),
+              isa=get_cpu_isa(cfg, 0),
+              i_cache_size=cfg.evaluate(get_cache_size(cfg, 0, ICACHE)),
+              i_cache_sets=cfg.evaluate(get_cache_way(cfg, 0, ICACHE)),
+              i_cache_block_size=cfg.evaluate(get_cache_block(cfg, 0)),
+              d_cache_size=cfg.evaluate(get_cache_size(cfg, 0, ICACHE)),
+              d_cache_sets=cfg.evaluate(get_cache_way(cfg, 0, ICACHE)),
+              d_cache_block_size=cfg.evaluate(get_cache_block(cfg, 0)),
+              frequency=cfg.evaluate(get_frequency(cfg)))
 
     cpu_type = get_property_value(cfg, "SYSTEM_HARD_RISCV_QC32", "SYSTEM_HARD_RISCV_QC32")
 
     if cpu_type == str(1):
-        print("DEBUG: cpu is hard soc")
-        cpu_node["cpu"].update({"clock_frequency": 1000000000})
-    else:
-        cpu_node["cpu"].update({"clock_frequency": 0})
+        cpu.clock_frequency = 1000000000
 
     system_core = "SYSTEM_RISCV_ISA"
     mmu = get_property_value(cfg, system_core, MMU)
     if mmu:
-        cpu_node["cpu"].update({"mmu_type": "riscv,sv32"})
+        cpu.mmu_type = "riscv,sv32"
+
+    return cpu
+
+"""
+get_cpu_metadata: get metadata of a cpu
+
+@cfg (SocHeader): indexed data of soc.h
+
+return: dict of a cpu metadata
+"""
+def get_cpu_metadata(cfg):
+    cpu_node = {"cpu": get_cpu(cfg).to_dict()}
 
     return cpu_node
 
@@ -407,9 +397,9 @@ def get_cpu_metadata(cfg):
 get_memory_config: get the memory information from the soc.h then create the dictionary
 of internal memory and external memory.
 
-@cfg (list): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 
-return (dict): memory node for internal and external
+return (dict): memory region (MemoryRegion) for internal and external
 """
 def get_memory_config(cfg):
     memory_types = ['external_memory', 'internal_memory']
@@ -422,15 +412,7 @@ def get_memory_config(cfg):
             addr = get_property_value_match(cfg, keyword, keyword)
 
         mem_type = memory_types[i]
-        memory_node = {
-            "label": "{}".format(mem_type),
-            "name": "memory",
-            "addr": addr.lstrip('0x'),
-            "size": size,
-            "device_type": "memory"
-        }
-
-        mem_node['memory'][mem_type] = memory_node
+        mem_node['memory'][mem_type] = MemoryRegion(mem_type, cfg.evaluate(addr), cfg.evaluate(size))
 
     return mem_node
 
@@ -442,41 +424,35 @@ For example, there are 2 spi and a i2c listed in soc.h. However, i2c is not
 supported by the driver. So, @filter_peripherals should only list the supported
 peripherals.
 
-@cfg (str): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @filter_peripherals: list of supported peripherals
 
 return: list of supported peripheral
 """
 def get_peripherals(cfg, filter_peripherals):
-    peripherals = []
+    found = []
 
-    for line in cfg:
-        for x in filter_peripherals:
-            if x in line:
-                peripherals.append(x)
+    for i, x in enumerate(filter_peripherals):
+        props = get_peripheral_properties(cfg, x)
+        if props:
+            found.append((cfg.entries.index(props[0]), i, x))
 
     # remove duplicate from list
-    peripherals = list(dict.fromkeys(peripherals))
+    peripherals = list(dict.fromkeys(x for _, _, x in sorted(found)))
 
     return peripherals
 
 """
-get_supported_peripherals: get the list of supported peripherals
+get_peripherals_file: get the path of peripherals.json for the operating system
 
-@soc_config might have lot of peripherals but it may not supported by the driver.
-For example, there are 2 spi and a i2c listed in soc.h. The peripherals.json
-only contain the whitelist of supported peripherals.
-
-@soc_config (dict): soc configuration after parse_soc_config
+@operating_system (str): operating system name such as linux or zephyr
 
-return (list): list of peripherals name
+return (str): path to config/<os>/peripherals.json, linux by default
 """
-def get_supported_peripherals(soc_config):
-    peripherals = []
+def get_peripherals_file(operating_system):
     d = os.path.dirname(os.path.abspath(__file__))
-    f = ''
+    operating_system = operating_system or ''
 
-    operating_system = get_os(soc_config)
     if 'linux' in operating_system:
         f = "linux/peripherals.json"
 
@@ -489,8 +465,25 @@ def get_supported_peripherals(soc_config):
     else:
         f = "linux/peripherals.json"
 
-    f = os.path.join(d, "../config", f)
-    cfg = load_json_file(f)
+    return os.path.join(d, "../config", f)
+
+"""
+get_supported_peripherals: get the list of supported peripherals
+
+@soc_config might have lot of peripherals but it may not supported by the driver.
+For example, there are 2 spi and a i2c listed in soc.h. The peripherals.json
+only contain the whitelist of supported peripherals.
+
+@soc_config (dict): soc configuration after parse_soc_config
+
+return (list): list of peripherals name
+"""
+def get_supported_peripherals(soc_config):
+    peripherals = []
+
+    operating_system = get_os(soc_config)
+    f = get_peripherals_file(operating_system)
+    cfg = load_config(f)
     whitelist = cfg['peripherals']
 
     if 'peripherals' in soc_config:
@@ -518,19 +511,98 @@ new_cfg = {
 
 APB_SLAVE_0 is the key to override specific peripherals properties.
 
+The nodes are looked up in @node_index. The keys which match no node are
+reported and ignored. @node_index is updated with the nested nodes that the
+override adds or replaces, so the next configurations override the nodes
+of the tree.
+
 @peripheral_parent (dict): a dictionary that have all of the peripherals
 @new_cfg (dict): new configuration to override the peripheral in @peripheral_parent.
+@node_index (dict): index of @peripheral_parent from get_node_index(). It is
+                    built if not given.
+@warnings (list): warnings of the generation, printed to stderr if None
+
+return (list): override keys which match no node
 """
-def override_peripherals(peripheral_parent, new_cfg):
+def override_peripherals(peripheral_parent, new_cfg, node_index=None, warnings=None):
+    unmatched = []
+
     if 'overrides' in new_cfg:
+        if node_index is None:
+            node_index = get_node_index(peripheral_parent)
+
         for key in new_cfg['overrides']:
-            cfg_overrides = new_cfg['overrides'][key]
-            update_dict(peripheral_parent, key, cfg_overrides)
-            node = find_key(peripheral_parent, key)
+            node = node_index.get(key)
+            if node is None:
+                warn(warnings, "override %s matches no device tree node, it is ignored" % key)
+                unmatched.append(key)
+                continue
+
+            override = new_cfg['overrides'][key]
+            replaced = {k: node[k] for k, v in override.items() if isinstance(node.get(k), dict)}
+
+            node.update(override)
+            node['header'] = get_node_header(node)
+
+            # the override could replace or add nested nodes
+            unindex_nodes(replaced, node_index)
+            index_nodes(node, node_index)
+
+    return unmatched
+
+"""
+index_nodes: add the nodes of a tree into a node index
+
+Every dict in the tree is indexed by its key. A key which appears several
+times is indexed to the node that a depth first search would find first,
+and an indexed key is never replaced.
+
+@tree (dict): tree of nodes such as the bus nodes
+@node_index (dict): index to update
+"""
+def index_nodes(tree, node_index):
+    children = []
+
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            node_index.setdefault(key, value)
+            children.append(value)
 
-            if node:
-                cfg_overrides['header'] = get_node_header(node)
-                update_dict(peripheral_parent, key, cfg_overrides)
+    for child in children:
+        index_nodes(child, node_index)
+
+"""
+unindex_nodes: remove the nodes of a tree from a node index
+
+Only the keys which are indexed to a node of the tree are removed, a key
+indexed to a node of another tree is kept.
+
+@tree (dict): tree of nodes which is no longer in the indexed tree
+@node_index (dict): index to update
+"""
+def unindex_nodes(tree, node_index):
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            if node_index.get(key) is value:
+                del node_index[key]
+            unindex_nodes(value, node_index)
+
+"""
+get_node_index: index the nodes of the bus tree by key
+
+The index is built once after create_bus_nodes(). It maps the keys of the
+buses, the peripherals and their child nodes, such as BMB, UART_0 or
+APB_SLAVE_0, to their node.
+
+@buses_node (dict): bus nodes
+
+return (dict): key -> node
+"""
+def get_node_index(buses_node):
+    node_index = {}
+    index_nodes(buses_node, node_index)
+
+    return node_index
 
 """
 get_os: get operating system
@@ -690,36 +762,62 @@ def get_child_node_header(node):
 """
 get_interrupts: get list of interrupts for each peripheral
 
-Some peripheral might have multiple interrupt number such as gpio.
-@cfg (str): raw content of soc.h
+Some peripheral might have multiple interrupt number such as gpio. The
+interrupt of UART_0 is SYSTEM_PLIC_SYSTEM_UART_0_IO_INTERRUPT, the
+interrupts of GPIO_0 are SYSTEM_PLIC_SYSTEM_GPIO_0_IO_INTERRUPTS_0, _1...
+The interrupt controllers get the interrupts of every peripheral.
+
+@cfg (SocHeader): indexed data of soc.h
 @periph_name (str): peripheral name include number such as SPI_0, UART_0
 
-return (str): list of interrupt number for the peripheral
+return (tuple): interrupt numbers (int) of the peripheral
 """
 def get_interrupts(cfg, periph_name):
     irqs = []
     interrupts = []
+    interrupt_name = 'SYSTEM_PLIC_SYSTEM_{}_IO_INTERRUPT'.format(periph_name)
 
-    for line in cfg:
-        lines = line.split()
-        if len(lines) < 3:
-            continue
-
-        if periph_name in lines[1]:
-            if 'IO_INTERRUPT' in lines[1]:
-                irqs.append(lines[2])
+    if periph_name in CONTROLLER:
+        for prop in get_peripheral_properties(cfg, periph_name):
+            if periph_name in prop.name and 'IO_INTERRUPT' in prop.name:
+                irqs.append(prop.value)
+    else:
+        for prop in cfg.find_peripheral(periph_name):
+            suffix = prop.name[len(interrupt_name):]
+            if prop.name.startswith(interrupt_name) and (not suffix or
+                    (suffix.startswith('S_') and suffix[2:].isdigit())):
+                irqs.append(prop.value)
 
-    # if the interrupts are not number, then we need to dereference it
+    # the interrupts could be other macros or expressions
     for irq in irqs:
-        if irq.isdigit():
-            interrupts.append(irq)
-        else:
-            irq_num = dereference_symbol(cfg, irq)
+        irq_num = cfg.evaluate(irq)
+        if irq_num is not None:
             interrupts.append(irq_num)
 
-    interrupts = ' '.join(interrupts)
+    return tuple(interrupts)
+
+"""
+get_interrupt_map: get the owners of each interrupt line
+
+The interrupt controllers are not owners, the PLIC peripheral lists the
+interrupts of every peripheral.
+
+@peripherals (dict): peripherals grouped by type, from get_peripheral_groups()
+
+return (InterruptMap): peripherals of each interrupt line
+"""
+def get_interrupt_map(peripherals):
+    interrupt_map = InterruptMap()
+
+    for _type, group in peripherals.items():
+        if _type in CONTROLLER:
+            continue
+
+        for name, peri in group.items():
+            for irq in peri.interrupts:
+                interrupt_map.add(irq, name)
 
-    return interrupts
+    return interrupt_map
 
 """
 get_buses: get bus list
@@ -730,7 +828,7 @@ def get_buses():
 """
 count_bus: count the number of the same bus type
 
-@cfg (str): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 bus (str): the bus name such as axi, bmb
 
 return: number of bus for the same type
@@ -745,9 +843,9 @@ def count_bus(cfg, bus):
     if 'AXI' in bus:
         bus_props = get_peripheral_properties(cfg, 'SYSTEM_AXI')
 
-    for line in bus_props:
-        lines = line.split()
-        if lines[1].endswith('BMB_PERIPHERAL_BMB_SIZE') or (lines[1].startswith('SYSTEM_AXI') and lines[1].endswith('BMB_SIZE')):
+    for prop in bus_props:
+        name = prop.name
+        if name.endswith('BMB_PERIPHERAL_BMB_SIZE') or (name.startswith('SYSTEM_AXI') and name.endswith('BMB_SIZE')):
             count += 1
 
     return count
@@ -755,10 +853,10 @@ def count_bus(cfg, bus):
 """
 get_bus_group: group of same bus type
 
-@cfg (str): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 bus (str): the bus name such as axi, bmb
 
-return (dict): the dict of the same bus group
+return (dict): the buses (Bus) of the same bus group
 """
 def get_bus_group(cfg, bus):
     bus = bus.upper()
@@ -769,7 +867,7 @@ def get_bus_group(cfg, bus):
     bus_group = {}
 
     props = get_peripheral_properties(cfg, bus)
-    count = count_bus(props, bus)
+    count = count_bus(cfg, bus)
 
     for i in range(count):
         if 'AXI' in bus:
@@ -784,31 +882,24 @@ def get_bus_group(cfg, bus):
             bus_name_keyword = 'BMB_PERIPHERAL_BMB'
             bus_size_keyword = 'BMB_PERIPHERAL_BMB_SIZE'
 
-        buses = {bus_name: {}}
-        for line in props:
-            lines = line.split()
+        for prop in get_peripheral_properties(cfg, bus_name_keyword):
+            if prop.name.endswith(bus_name_keyword):
+                addr = prop.value
 
-            if lines[1].endswith(bus_name_keyword):
-                addr = lines[2]
-            if lines[1].endswith(bus_size_keyword):
-                size = lines[2]
+        for prop in get_peripheral_properties(cfg, bus_size_keyword):
+            if prop.name.endswith(bus_size_keyword):
+                size = prop.value
 
-            buses[bus_name].update({
-                "name": bus_name.lower(),
-                "label": bus_label.lower(),
-                "addr": addr,
-                "size": size,
-                "type": "bus"
-            })
-
-        bus_group.update(buses)
+        if props:
+            bus_group[bus_name] = Bus(bus_name.lower(), bus_label.lower(),
+                                      cfg.evaluate(addr), cfg.evaluate(size))
 
     return bus_group
 
 """
 get_bus_groups: group together the different bus type
 
-@cfg (str): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 buses (list): list of the bus type
 
 return (dict): different bus type
@@ -825,10 +916,10 @@ def get_bus_groups(cfg, buses):
 """
 get_peripheral_group: group the same type of the peripheral
 
-@cfg (str): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripheral (str): the type of the peripheral such as UART, SPI, I2C
 
-return (dict): a group of the same type of the peripheral
+return (dict): a group of the same type of the peripheral (Peripheral)
 """
 def get_peripheral_group(cfg, peripheral):
     props = []
@@ -837,7 +928,6 @@ def get_peripheral_group(cfg, peripheral):
 
     peripheral = peripheral.upper()
     peripheral_lo = peripheral.lower()
-    props = get_peripheral_properties(cfg, peripheral)
 
     count = count_peripheral(cfg, peripheral)
     peripheral_group = {peripheral: {}}
@@ -851,40 +941,33 @@ def get_peripheral_group(cfg, peripheral):
             periph_name = peripheral
             name = peripheral_lo
             label = peripheral_lo
+            props = get_peripheral_properties(cfg, periph_name)
         else:
             periph_name = "{}_{}".format(peripheral, i)
             name = "{}{}".format(peripheral_lo, i)
             label = "{}{}".format(peripheral_lo, i)
+            props = cfg.find_peripheral(periph_name)
 
-        device = {periph_name: {}}
-        for line in props:
-            lines = line.split()
-
-            if periph_name in lines[1]:
-                if lines[1].endswith('CTRL') or lines[1].endswith('INPUT'):
-                    addr = lines[2]
+        for prop in props:
+            prop_name = prop.name
 
-                if lines[1].endswith('CTRL_SIZE') or lines[1].endswith('INPUT_SIZE'):
-                    size = lines[2]
+            if has_peripheral_name(prop_name, periph_name):
+                if prop_name.endswith('CTRL') or prop_name.endswith('INPUT'):
+                    addr = prop.value
 
-                device[periph_name].update({
-                    "name": name,
-                    "label": label,
-                    "addr": addr,
-                    "size": size,
-                    "type": peripheral
-                })
+                if prop_name.endswith('CTRL_SIZE') or prop_name.endswith('INPUT_SIZE'):
+                    size = prop.value
 
         interrupts = get_interrupts(cfg, periph_name)
-        device[periph_name].update({"interrupts": interrupts})
-        peripheral_group[peripheral].update(device)
+        peripheral_group[peripheral][periph_name] = Peripheral(peripheral, name, label,
+                cfg.evaluate(addr), cfg.evaluate(size), interrupts)
 
     return peripheral_group
 
 """
 get_peripheral_groups: get the mix types of peripherals
 
-@cfg (str): raw data of soc.h
+@cfg (SocHeader): indexed data of soc.h
 @peripherals (list): peripheral type such as UART, SPI, I2C in list
 
 return (dict): mix types of peripherals group
@@ -903,30 +986,77 @@ parse_soc_config: parsing the @filename to create a dictionary and
 group the peripherals based on its type.
 
 @filename(str): file name of soc configuration such as soc.h
+@warnings (list): warnings of the generation, printed to stderr if None
+
+return (dict): the parsed data in dictionary format. The peripherals, buses,
+memory and the interrupt map are model objects, see core/model.py.
+"""
+def parse_soc_config(filename, warnings=None):
+    with stats.stage("read soc.h"):
+        lines = read_file(filename)
+
+    return parse_soc_lines(lines, warnings)
+
+"""
+parse_soc_lines: parse the lines of a soc configuration, see parse_soc_config()
+
+@lines (list): lines of soc.h
+@warnings (list): warnings of the generation, printed to stderr if None
 
 return (dict): the parsed data in dictionary format
 """
-def parse_soc_config(filename):
+def parse_soc_lines(lines, warnings=None):
     soc_config = {}
     peripheral_groups = {'peripherals': {}}
     bus_groups = {'buses': {}}
     buses = get_buses()
 
-    cfg = read_file(filename)
-    peripherals = get_peripherals(cfg, PERIPHERALS)
+    with stats.stage("index soc.h"):
+        cfg = SocHeader(lines, warnings)
+
+    with stats.stage("cpu"):
+        cpu_config = get_cpu_metadata(cfg)
+
+    with stats.stage("memory"):
+        memory_config = get_memory_config(cfg)
+
+    with stats.stage("peripherals"):
+        peripherals = get_peripherals(cfg, PERIPHERALS)
+        peripheral_groups = get_peripheral_groups(cfg, peripherals)
+
+    with stats.stage("buses"):
+        bus_groups = get_bus_groups(cfg, buses)
 
-    cpu_config = get_cpu_metadata(cfg)
-    memory_config = get_memory_config(cfg)
-    peripheral_groups = get_peripheral_groups(cfg, peripherals)
-    bus_groups = get_bus_groups(cfg, buses)
+    with stats.stage("interrupts"):
+        interrupt_map = get_interrupt_map(peripheral_groups['peripherals'])
 
     soc_config.update({'root': cpu_config})
     soc_config.update(memory_config)
     soc_config.update(peripheral_groups)
     soc_config.update(bus_groups)
+    soc_config.update({'interrupt_map': interrupt_map})
 
     return soc_config
 
+"""
+copy_soc_config: copy a parsed soc configuration to build it again
+
+The nodes are added into the root dict, so it is copied. The groups of
+the peripherals, buses and memory are copied too, their model objects are
+shared since they are not modified after parse_soc_config().
+
+@soc_config (dict): soc configuration from parse_soc_config()
+
+return (dict): soc configuration which could be built
+"""
+def copy_soc_config(soc_config):
+    import copy
+
+    soc_copy = {k: dict(v) if isinstance(v, dict) else v for k, v in soc_config.items()}
+    soc_copy['root'] = copy.deepcopy(soc_config['root'])
+
+    return soc_copy
+
 def get_peripheral_data(config, name):
     for _type in config['peripherals']:
         if name in config['peripherals'][_type]:
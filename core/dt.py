@@ -87,11 +87,10 @@ def update_plic_node(soc_config, is_zephyr):
     }
 
     if is_zephyr:
-        node = get_peripheral_data(soc_config, PLIC)
-        addr = node['addr']
-        prio = hex(int(addr, 0))
-        irq_en = hex(int(addr, 0) + 0x2000)
-        regs = hex(int(addr,0) + 0x200000)
+        addr = get_peripheral_data(soc_config, PLIC).addr
+        prio = hex(addr)
+        irq_en = hex(addr + 0x2000)
+        regs = hex(addr + 0x200000)
         reg = "<{0} {1}\n\t\t\t\t{2} {3}\n\t\t\t\t{4} {5}>".format(
                 prio, '0x00001000', irq_en, '0x00002000', regs, '0x00010000')
         plic_node.update({"reg": reg})
@@ -168,7 +167,7 @@ def dt_create_peripheral_node(soc_config, peripheral):
     peri_node = None
 
     peri_node = get_peripheral_data(soc_config, peripheral)
-    node = dt_create_node(soc_config, peri_node)
+    node = dt_create_node(soc_config, peri_node.to_dict())
 
     return node
 
@@ -182,18 +181,15 @@ return (dict): bus node
 """
 def dt_create_bus_node(soc_config, bus):
     bus_node = get_bus_data(soc_config, bus)
-    node = dt_create_node(soc_config, bus_node)
-
-    addr = bus_node['addr']
-    size = bus_node['size']
-    label = bus_node['label']
+    node = dt_create_node(soc_config, bus_node.to_dict())
+    label = bus_node.label
 
     if check_is_zephyr(soc_config):
         header = "soc {"
         ranges = ''
     else:
-        header = "{0}: {1}@{2} {{".format(label, label, str(addr)[2:])
-        ranges = "0x0 {0} {1}".format(addr, size)
+        header = "{0}: {1}@{2:x} {{".format(label, label, bus_node.addr)
+        ranges = "0x0 {0} {1}".format(hex(bus_node.addr), hex(bus_node.size))
 
     node.update({
         "peripherals": {},
@@ -252,7 +248,7 @@ def dt_create_interrupt_controller_node(soc_config):
     node = {}
 
     compatible = dt_compatible(soc_config, 'plic', controller=True)
-    priv_data = get_driver_private_data(soc_config, 'plic', controller=True)
+    priv_data = list(get_driver_private_data(soc_config, 'plic', controller=True))
     priv_data.append(compatible)
 
     node = {
@@ -284,24 +280,30 @@ def dt_create_cpu_node(soc_config):
     return soc_config
 
 """
-dt_create_memory_node: create memory node
+memory_node: create a memory node
+
 @soc_config (dict): soc configuration after parse it
-@is_on_chip_ram (bool): enable on chip ram for zephyr setting
+@label (str): label of the node
+@addr (int): start address of the memory
+@size (int): size of the memory
+@addr_text (str): start address as written in the configuration, kept as is
+                  in the reg property such as 0x00400000
 
-return: a dictionary of memory node
+return (dict): memory node
 """
-def memory_node(soc_config, label, addr, size):
+def memory_node(soc_config, label, addr, size, addr_text=None):
     if check_is_zephyr(soc_config):
-        size = int(size, 16) // 1024
-        reg = "{0} DT_SIZE_K({1})".format(hex(int(addr, 16)), size)
+        size = size // 1024
+        reg = "{0} DT_SIZE_K({1})".format(hex(addr), size)
 
     else:
-        reg = "{0} {1}".format(addr, size)
+        size = hex(size)
+        reg = "{0} {1}".format(addr_text or hex(addr), size)
 
     mem_node = {
         "label": label,
         "name": "memory",
-        "addr": addr.lstrip('0x'),
+        "addr": format(addr, 'x'),
         "size": size,
         "reg": reg,
         "device_type": "memory"
@@ -309,12 +311,16 @@ def memory_node(soc_config, label, addr, size):
 
     return mem_node
 
+"""
+dt_create_memory_node: create memory node
+@soc_config (dict): soc configuration after parse it
+@is_on_chip_ram (bool): enable on chip ram for zephyr setting
+
+return: a dictionary of memory node
+"""
 def dt_create_memory_node(soc_config):
-    size = 0
-    addr = 0
     name = 'memory'
     label = ''
-    size = soc_config['memory']['external_memory']['size']
     mem_node = {}
 
     if check_is_zephyr(soc_config):
@@ -325,17 +331,17 @@ def dt_create_memory_node(soc_config):
         for l, t in zip(z_labels, memory_types):
             label = l
             name = 'memory{}'.format(i)
-            size = soc_config['memory'][t]['size']
-            addr = soc_config['memory'][t]['addr']
-            mem_node[name] = memory_node(soc_config, label, addr, size)
+            region = soc_config['memory'][t]
+            mem_node[name] = memory_node(soc_config, label, region.addr, region.size)
             i += 1
 
     else:
         conf = get_os_data(soc_config)
         # addr use linux start addr
-        addr = conf['memory_mapped']['uimage']
-        size = hex(int(size, 0) - int(addr, 0))
-        mem_node = memory_node(soc_config, label, addr, size)
+        addr_text = conf['memory_mapped']['uimage']
+        addr = parse_int(addr_text)
+        size = soc_config['memory']['external_memory'].size - addr
+        mem_node = memory_node(soc_config, label, addr, size, addr_text)
         mem_node = {name: mem_node}
 
     return mem_node
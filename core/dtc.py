@@ -0,0 +1,1153 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import re
+import bisect
+import struct
+
+from core.expression import evaluate_expression, parse_number, ExpressionError
+from core.stats import stats
+
+"""
+In process device tree compiler
+
+The generated dts and the dtsi it includes are compiled into a tree of
+nodes, like the C preprocessor then dtc would do: the '#include' and
+'/include/' files are read from memory, the macros of the binding headers
+are expanded, the '&label { }' nodes are merged into the labelled nodes,
+then the phandles and the paths are resolved.
+
+Only the part of the C preprocessor needed by the device tree sources is
+supported: '#include', object and function like '#define' and '#undef'.
+The binding headers are not read from the kernel or Zephyr tree, their
+constants are in DT_BINDINGS.
+"""
+
+MAX_INCLUDE_DEPTH = 32
+UINT64_MAX = (1 << 64) - 1
+
+# constants of the binding headers included by drivers.json
+DT_BINDINGS = {
+    "dt-bindings/gpio/gpio.h": {
+        "GPIO_ACTIVE_HIGH": "0",
+        "GPIO_ACTIVE_LOW": "1",
+        "GPIO_PUSH_PULL": "0",
+        "GPIO_SINGLE_ENDED": "2",
+        "GPIO_LINE_OPEN_SOURCE": "0",
+        "GPIO_LINE_OPEN_DRAIN": "4",
+        "GPIO_OPEN_DRAIN": "(GPIO_SINGLE_ENDED | GPIO_LINE_OPEN_DRAIN)",
+        "GPIO_OPEN_SOURCE": "(GPIO_SINGLE_ENDED | GPIO_LINE_OPEN_SOURCE)",
+        "GPIO_PERSISTENT": "0",
+        "GPIO_TRANSITORY": "8",
+        "GPIO_PULL_UP": "16",
+        "GPIO_PULL_DOWN": "32",
+        "GPIO_PULL_DISABLE": "64"
+    },
+    "zephyr/dt-bindings/gpio/gpio.h": {
+        "GPIO_ACTIVE_LOW": "(1 << 0)",
+        "GPIO_ACTIVE_HIGH": "(0 << 0)",
+        "GPIO_SINGLE_ENDED": "(1 << 1)",
+        "GPIO_PUSH_PULL": "(0 << 1)",
+        "GPIO_LINE_OPEN_DRAIN": "(1 << 2)",
+        "GPIO_LINE_OPEN_SOURCE": "(0 << 2)",
+        "GPIO_OPEN_DRAIN": "(GPIO_SINGLE_ENDED | GPIO_LINE_OPEN_DRAIN)",
+        "GPIO_OPEN_SOURCE": "(GPIO_SINGLE_ENDED | GPIO_LINE_OPEN_SOURCE)",
+        "GPIO_PULL_UP": "(1 << 4)",
+        "GPIO_PULL_DOWN": "(1 << 5)",
+        "GPIO_INT_WAKEUP": "(1 << 6)"
+    },
+    "mem.h": {
+        "DT_SIZE_K(x)": "((x) * 1024)",
+        "DT_SIZE_M(x)": "(DT_SIZE_K(x) * 1024)"
+    }
+}
+
+INCLUDE = re.compile(r'\s*(?:#\s*include\s*(?:<([^>]+)>|"([^"]+)")|/include/\s*"([^"]+)")\s*(?://.*|/\*.*?\*/)?\s*$')
+DEFINE = re.compile(r'\s*#\s*define\s+([A-Za-z_]\w*)(?:\(([^)]*)\))?(?:\s+(.*?))?\s*$')
+UNDEF = re.compile(r'\s*#\s*undef\s+([A-Za-z_]\w*)\s*$')
+MACRO_NAME = re.compile(r'([A-Za-z_]\w*)(?:\(([^)]*)\))?$')
+
+# tokens for the macro expansion, strings, comments and numbers are not expanded
+PP_TOKEN = re.compile(r'"(?:[^"\\\n]|\\.)*"?|\'(?:[^\'\\\n]|\\.)*\'?|/\*|//.*|[0-9][\w.]*|([A-Za-z_]\w*)')
+
+SKIP_START = frozenset(' \t\r\n\f\v/')
+WHITESPACE = re.compile(r'(?:\s+|/\*.*?\*/|//[^\n]*)*', re.DOTALL)
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)\s*:(?![:=])')
+NAME = re.compile(r'[a-zA-Z0-9,._+*#?@-]+')
+LABEL_REF = re.compile(r'&([a-zA-Z_][a-zA-Z0-9_]*)')
+PATH_REF = re.compile(r'&\{(/[a-zA-Z0-9,._+*#?@/-]*)\}')
+LITERAL = re.compile(r'(?:0[xX][0-9a-fA-F]+|[0-9]+)(?:[uU]?(?:ll|LL|l|L)?|(?:ll|LL|l|L)[uU])(?![\w])')
+CHAR_LITERAL = re.compile(r"'((?:[^'\\]|\\(?:x[0-9a-fA-F]{1,2}|[0-7]{1,3}|.)))'")
+STRING_ESCAPE = re.compile(r'\\(x[0-9a-fA-F]{1,2}|[0-7]{1,3}|.)', re.DOTALL)
+STRING_CHARS = re.compile(r'[^"\\\n]*')
+BYTES = re.compile(r'([0-9a-fA-F\s]*)\]')
+# tokens of the structure check, the braces and semicolons in strings,
+# character literals and comments are skipped
+STRUCTURE = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|/\*.*?\*/|//[^\n]*|/\*|["{};]', re.DOTALL)
+
+ESCAPES = {'a': 7, 'b': 8, 't': 9, 'n': 10, 'v': 11, 'f': 12, 'r': 13}
+
+class DtsError(ValueError):
+    def __init__(self, message, filename=None, line=None):
+        self.message = message
+        self.filename = filename
+        self.line = line
+
+        if filename:
+            message = "%s:%d: %s" % (filename, line, message)
+
+        super().__init__(message)
+
+"""
+Ref: reference to a node in a property value
+
+@kind (str): 'phandle' for a reference in a cell list, 'path' for the full
+             path string of the node
+@target (str): label, or path if it starts with '/'
+@pos (int): offset of the reference in the preprocessed source
+"""
+class Ref:
+    __slots__ = ('kind', 'target', 'pos')
+
+    def __init__(self, kind, target, pos):
+        self.kind = kind
+        self.target = target
+        self.pos = pos
+
+"""
+Property: property of a node
+
+The value is a list of pieces, bytes or Ref, until the references are
+resolved into the bytes of @value.
+"""
+class Property:
+    __slots__ = ('name', 'pieces', 'pos', 'deleted', 'value')
+
+    def __init__(self, name, pieces, pos, deleted=False):
+        self.name = name
+        self.pieces = pieces
+        self.pos = pos
+        self.deleted = deleted
+        self.value = None
+
+class Node:
+    __slots__ = ('name', 'labels', 'props', 'children', 'pos', 'deleted', 'phandle')
+
+    def __init__(self, name, labels, pos, deleted=False):
+        self.name = name
+        self.labels = labels
+        self.props = []
+        self.children = []
+        self.pos = pos
+        self.deleted = deleted
+        self.phandle = None
+
+    def get_property(self, name):
+        for p in self.props:
+            if p.name == name:
+                return p
+
+        return None
+
+    def get_child(self, name):
+        for c in self.children:
+            if c.name == name:
+                return c
+
+        return None
+
+"""
+DeviceTree: compiled device tree
+
+@root (Node): root node, the values of the properties are resolved
+@memreserve (list): (address, size) of the /memreserve/ entries
+@paths (dict): id of every node -> full path
+"""
+class DeviceTree:
+    def __init__(self, root, memreserve, paths):
+        self.root = root
+        self.memreserve = memreserve
+        self.paths = paths
+
+    """
+    boot_cpuid: physical id of the boot cpu, guessed like dtc does
+
+    return (int): first cell of the reg of the first node of /cpus
+    """
+    def boot_cpuid(self):
+        cpus = self.root.get_child('cpus')
+        if not cpus or not cpus.children:
+            return 0
+
+        reg = cpus.children[0].get_property('reg')
+        if not reg or len(reg.value) != 4:
+            return 0
+
+        return struct.unpack('>I', reg.value)[0]
+
+def parse_macro(name, body):
+    m = MACRO_NAME.match(name)
+    params = None
+    if m.group(2) is not None:
+        params = [p.strip() for p in m.group(2).split(',') if p.strip()]
+
+    return m.group(1), (params, body or '')
+
+def split_arguments(text, pos):
+    args = []
+    depth = 0
+    start = pos
+
+    while pos < len(text):
+        c = text[pos]
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            if depth == 0:
+                args.append(text[start:pos].strip())
+                return args, pos + 1
+            depth -= 1
+        elif c == ',' and depth == 0:
+            args.append(text[start:pos].strip())
+            start = pos + 1
+        pos += 1
+
+    return None, pos
+
+"""
+expand_macros: expand the macros of a line, like the C preprocessor
+
+@text (str): line of source
+@macros (dict): name -> (parameters or None, body)
+@comment (bool): the line starts inside a block comment
+@active (frozenset): macros being expanded, they are not expanded again
+
+return: (expanded line, True if the line ends inside a block comment)
+"""
+def expand_macros(text, macros, comment=False, active=frozenset()):
+    out = []
+    pos = 0
+
+    while pos < len(text):
+        if comment:
+            end = text.find('*/', pos)
+            if end < 0:
+                out.append(text[pos:])
+                return ''.join(out), True
+            out.append(text[pos:end + 2])
+            pos = end + 2
+            comment = False
+            continue
+
+        m = PP_TOKEN.search(text, pos)
+        if not m:
+            out.append(text[pos:])
+            break
+
+        out.append(text[pos:m.start()])
+        pos = m.end()
+        token = m.group(0)
+
+        if token == '/*':
+            out.append(token)
+            comment = True
+            continue
+
+        name = m.group(1)
+        if not name or name not in macros or name in active:
+            out.append(token)
+            continue
+
+        params, body = macros[name]
+        if params is None:
+            out.append(expand_macros(body, macros, False, active | {name})[0])
+            continue
+
+        # function like macro, only expanded when it is called
+        call = re.compile(r'\s*\(').match(text, pos)
+        if not call:
+            out.append(token)
+            continue
+
+        args, end = split_arguments(text, call.end())
+        if args is None:
+            out.append(token)
+            continue
+
+        if args == [''] and not params:
+            args = []
+
+        if len(args) != len(params):
+            raise ExpressionError("macro %s takes %d arguments, %d given" % (name, len(params), len(args)))
+
+        values = {p: expand_macros(a, macros, False, active)[0] for p, a in zip(params, args)}
+        body = re.sub(r'[A-Za-z_]\w*', lambda t: values.get(t.group(0), t.group(0)), body)
+        out.append(expand_macros(body, macros, False, active | {name})[0])
+        pos = end
+
+    return ''.join(out), comment
+
+"""
+Preprocessor: read a source with its include files into a single text
+
+The origin of every line is kept, so the errors point to the line of the
+file where it comes from.
+"""
+class Preprocessor:
+    def __init__(self, sources):
+        self.sources = sources or {}
+        self.macros = {}
+        self.lines = []
+        self.origins = []
+        self.includes = []
+        self.warnings = []
+
+    def find_source(self, name, current, system):
+        if not system:
+            path = os.path.join(os.path.dirname(current), name)
+            if path in self.sources:
+                return path, self.sources[path]
+
+        if name in self.sources:
+            return name, self.sources[name]
+
+        for path, text in self.sources.items():
+            if os.path.basename(path) == os.path.basename(name):
+                return path, text
+
+        candidates = [name]
+        if not system:
+            candidates.insert(0, os.path.join(os.path.dirname(current), name))
+
+        for path in candidates:
+            if os.path.isfile(path):
+                with open(path, 'r') as f:
+                    return path, f.read()
+
+        return None, None
+
+    def include(self, name, current, line, system, depth):
+        if name in DT_BINDINGS:
+            for macro, body in DT_BINDINGS[name].items():
+                n, definition = parse_macro(macro, body)
+                self.macros[n] = definition
+            self.includes.append(name)
+            return
+
+        path, text = self.find_source(name, current, system)
+        if text is None:
+            if system:
+                self.warnings.append("%s:%d: include file <%s> is not available, it is ignored" % (current, line, name))
+                return
+            raise DtsError("can not find include file %s" % name, current, line)
+
+        if depth >= MAX_INCLUDE_DEPTH:
+            raise DtsError("includes nested too deeply", current, line)
+
+        self.includes.append(path)
+        self.read(path, text, depth + 1)
+
+    def read(self, filename, text, depth=0):
+        comment = False
+
+        for n, line in enumerate(text.split('\n'), 1):
+            if not comment and line.lstrip().startswith(('#', '/include/')):
+                m = INCLUDE.match(line)
+                if m:
+                    self.include(m.group(1) or m.group(2) or m.group(3), filename, n,
+                                 m.group(1) is not None, depth)
+                    continue
+
+                m = DEFINE.match(line)
+                if m:
+                    name, definition = parse_macro(
+                            m.group(1) + ('(%s)' % m.group(2) if m.group(2) is not None else ''),
+                            m.group(3))
+                    self.macros[name] = definition
+                    continue
+
+                m = UNDEF.match(line)
+                if m:
+                    self.macros.pop(m.group(1), None)
+                    continue
+
+            if self.macros:
+                try:
+                    line, comment = expand_macros(line, self.macros, comment)
+                except ExpressionError as e:
+                    raise DtsError(str(e), filename, n)
+
+            self.lines.append(line)
+            self.origins.append((filename, n))
+
+        # the errors at the end of the source point to its last line
+        if depth == 0:
+            self.lines.append('')
+            self.origins.append((filename, n))
+
+"""
+Parser: parser of the preprocessed device tree source
+
+The grammar is the one of dtc: the headers, the /memreserve/ entries, then
+the root nodes and the '&label { }' nodes, which are merged into the tree
+as they are parsed.
+"""
+class Parser:
+    def __init__(self, preprocessor):
+        self.pp = preprocessor
+        self.text = '\n'.join(preprocessor.lines)
+        self.pos = 0
+        self.starts = [0]
+        for line in preprocessor.lines[:-1]:
+            self.starts.append(self.starts[-1] + len(line) + 1)
+
+        self.root = None
+        self.memreserve = []
+        self.labels = {}
+
+    def origin(self, pos):
+        i = bisect.bisect_right(self.starts, pos) - 1
+        return self.pp.origins[i]
+
+    def error(self, message, pos=None):
+        filename, line = self.origin(self.pos if pos is None else pos)
+        return DtsError(message, filename, line)
+
+    """
+    invalid_value: report a value which is parsed but can not be encoded
+
+    @message (str): error message
+    @pos (int): offset of the value
+    """
+    def invalid_value(self, message, pos):
+        raise self.error(message, pos)
+
+    def skip(self):
+        if self.text[self.pos:self.pos + 1] in SKIP_START:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+
+    def peek(self, s):
+        self.skip()
+        return self.text.startswith(s, self.pos)
+
+    def accept(self, s):
+        if self.peek(s):
+            self.pos += len(s)
+            return True
+
+        return False
+
+    def expect(self, s, what=None):
+        if not self.accept(s):
+            found = self.text[self.pos:self.pos + 16].split('\n')[0] or 'end of file'
+            raise self.error("expected '%s'%s, found '%s'" % (s, what or '', found))
+
+    def match(self, regex):
+        self.skip()
+        m = regex.match(self.text, self.pos)
+        if m:
+            self.pos = m.end()
+
+        return m
+
+    def parse(self):
+        if not self.peek('/dts-v1/'):
+            raise self.error("missing /dts-v1/ tag")
+
+        while self.accept('/dts-v1/'):
+            self.expect(';')
+            if self.peek('/plugin/'):
+                raise self.error("device tree overlays are not supported")
+
+        while self.peek('/memreserve/') or self.peek_label('/memreserve/'):
+            self.label_defs()
+            self.expect('/memreserve/')
+            addr = self.integer()
+            size = self.integer()
+            self.expect(';')
+            self.memreserve.append((addr, size))
+
+        while True:
+            self.skip()
+            if self.pos >= len(self.text):
+                break
+            self.top_level()
+
+        if self.root is None:
+            raise self.error("no root node")
+
+        return self.root
+
+    def peek_label(self, s):
+        save = self.pos
+        self.label_defs()
+        found = self.peek(s)
+        self.pos = save
+
+        return found
+
+    def top_level(self):
+        pos = self.pos
+
+        if self.accept('/delete-node/'):
+            target = self.reference()
+            self.expect(';')
+            node = self.find_reference(target, pos)
+            parent = self.find_parent(node)
+            if parent is None:
+                raise self.error("can not delete the root node", pos)
+            parent.children.remove(node)
+            return
+
+        labels = self.label_defs()
+
+        if self.peek('&'):
+            target = self.reference()
+            node = Node(None, labels, pos)
+            self.node_body(node)
+            old = self.find_reference(target, pos)
+            self.merge(old, node)
+            return
+
+        if self.peek('/memreserve/'):
+            raise self.error("/memreserve/ must be before the nodes")
+
+        if self.accept('/'):
+            node = Node('', labels, pos)
+            self.node_body(node)
+            if self.root is None:
+                self.root = node
+                self.index_labels(node)
+            else:
+                self.merge(self.root, node)
+            return
+
+        raise self.error("expected '/', '&label' or '/delete-node/'")
+
+    def reference(self):
+        pos = self.pos
+        m = self.match(PATH_REF)
+        if m:
+            return m.group(1)
+
+        m = self.match(LABEL_REF)
+        if m:
+            return m.group(1)
+
+        raise self.error("expected a reference such as &label", pos)
+
+    def find_reference(self, target, pos):
+        if target.startswith('/'):
+            node = find_node_by_path(self.root, target) if self.root else None
+        else:
+            node = self.labels.get(target)
+
+        if node is None:
+            raise self.error("label or path %s not found" % target, pos)
+
+        return node
+
+    def find_parent(self, node):
+        stack = [self.root]
+        while stack:
+            n = stack.pop()
+            if node in n.children:
+                return n
+            stack.extend(n.children)
+
+        return None
+
+    def index_labels(self, node):
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            for label in n.labels:
+                self.labels.setdefault(label, n)
+            stack.extend(n.children)
+
+    def merge(self, old, new):
+        merge_nodes(old, new)
+        self.index_labels(old)
+
+    def char(self):
+        self.skip()
+        return self.text[self.pos:self.pos + 1]
+
+    def label_defs(self):
+        labels = []
+        while self.char().isidentifier():
+            m = LABEL.match(self.text, self.pos)
+            if not m:
+                break
+            labels.append(m.group(1))
+            self.pos = m.end()
+
+        return labels
+
+    def node_body(self, node):
+        self.expect('{')
+        has_children = False
+
+        while True:
+            c = self.char()
+            pos = self.pos
+
+            if c == '}':
+                self.pos += 1
+                self.expect(';', " after '}'")
+                return
+
+            if c == '/':
+                if self.accept('/delete-property/'):
+                    name = self.name()
+                    self.expect(';')
+                    node.props = [p for p in node.props if p.name != name]
+                    node.props.append(Property(name, [], pos, deleted=True))
+                    continue
+
+                if self.accept('/delete-node/'):
+                    name = self.name()
+                    self.expect(';')
+                    node.children = [c for c in node.children if c.name != name]
+                    node.children.append(Node(name, [], pos, deleted=True))
+                    continue
+
+            labels = self.label_defs()
+            pos = self.pos
+            name = self.name()
+            c = self.char()
+
+            if c == '{':
+                child = Node(name, labels, pos)
+                self.node_body(child)
+                node.children.append(child)
+                has_children = True
+                continue
+
+            if has_children:
+                raise self.error("properties must precede subnodes", pos)
+
+            if c == ';':
+                self.pos += 1
+                node.props.append(Property(name, [], pos))
+                continue
+
+            if c == '=':
+                self.pos += 1
+                pieces = self.value()
+                self.expect(';', " after the value of %s" % name)
+                node.props.append(Property(name, pieces, pos))
+                continue
+
+            raise self.error("expected '=', ';' or '{' after %s" % name)
+
+    def name(self):
+        pos = self.pos
+        m = self.match(NAME)
+        if not m:
+            if self.pos >= len(self.text):
+                raise self.error("unexpected end of file, missing '};'", pos)
+            raise self.error("expected a property or node name, found '%s'" % self.text[self.pos], pos)
+
+        return m.group(0)
+
+    def value(self):
+        pieces = []
+
+        while True:
+            self.label_defs()
+            c = self.char()
+            pos = self.pos
+
+            if c == '"':
+                self.pos += 1
+                pieces.append(self.string(pos))
+            elif c == '<':
+                self.pos += 1
+                pieces.extend(self.cells(32))
+            elif c == '&':
+                pieces.append(Ref('path', self.reference(), pos))
+            elif c == '[':
+                m = BYTES.match(self.text, pos + 1)
+                digits = ''.join(m.group(1).split()) if m else None
+                if digits is None or len(digits) % 2:
+                    raise self.error("invalid byte string", pos)
+                pieces.append(bytes.fromhex(digits))
+                self.pos = m.end()
+            elif self.accept('/bits/'):
+                bits = self.integer()
+                if bits not in (8, 16, 32, 64):
+                    raise self.error("/bits/ must be 8, 16, 32 or 64", pos)
+                self.expect('<')
+                pieces.extend(self.cells(bits))
+            else:
+                raise self.error("expected a value")
+
+            self.label_defs()
+            if self.char() != ',':
+                return pieces
+            self.pos += 1
+
+    def string(self, pos):
+        out = bytearray()
+        end = pos + 1
+
+        while True:
+            i = STRING_CHARS.match(self.text, end).end()
+
+            out += self.text[end:i].encode('utf-8')
+            if i >= len(self.text) or self.text[i] == '\n':
+                raise self.error("unterminated string", pos)
+
+            if self.text[i] == '"':
+                self.pos = i + 1
+                out.append(0)
+                return bytes(out)
+
+            m = STRING_ESCAPE.match(self.text, i)
+            out.append(unescape(m.group(1)))
+            end = m.end()
+
+    def cells(self, bits):
+        pieces = []
+        data = bytearray()
+        fmt = {8: '>B', 16: '>H', 32: '>I', 64: '>Q'}[bits]
+        mask = (1 << bits) - 1
+
+        while True:
+            self.label_defs()
+            c = self.char()
+            pos = self.pos
+
+            if c == '>':
+                self.pos += 1
+                break
+
+            if c == '&':
+                if bits != 32:
+                    raise self.error("references are only allowed in arrays with 32-bit elements", pos)
+                if data:
+                    pieces.append(bytes(data))
+                    data = bytearray()
+                pieces.append(Ref('phandle', self.reference(), pos))
+                continue
+
+            if not c:
+                raise self.error("unexpected end of file, missing '>'")
+
+            value = self.integer()
+            # the bits above the element must be all zero, or all one for a negative value
+            if value > mask and (value | mask) != UINT64_MAX:
+                self.invalid_value("value out of range for %d-bit array element" % bits, pos)
+
+            data += struct.pack(fmt, value & mask)
+
+        if data or not pieces:
+            pieces.append(bytes(data))
+
+        return pieces
+
+    def integer(self):
+        self.skip()
+        pos = self.pos
+
+        m = LITERAL.match(self.text, pos)
+        if m:
+            self.pos = m.end()
+            try:
+                value = parse_number(m.group(0), octal=True)
+            except ExpressionError as e:
+                raise self.error(str(e), pos)
+            if value > UINT64_MAX:
+                self.invalid_value("integer literal out of range", pos)
+            return value
+
+        m = CHAR_LITERAL.match(self.text, pos)
+        if m:
+            self.pos = m.end()
+            c = m.group(1)
+            return unescape(c[1:]) if c.startswith('\\') else ord(c)
+
+        if self.text.startswith('(', pos):
+            end = self.matching_paren(pos)
+            try:
+                value = evaluate_expression(self.text[pos:end], undefined_macro, 64, octal=True)
+            except ExpressionError as e:
+                raise self.error(str(e), pos)
+            self.pos = end
+            return value
+
+        m = NAME.match(self.text, pos)
+        found = m.group(0) if m else self.text[pos:pos + 1]
+        raise self.error("expected an integer, found '%s'" % found, pos)
+
+    def matching_paren(self, pos):
+        depth = 0
+        for i in range(pos, len(self.text)):
+            c = self.text[i]
+            if c == '(':
+                depth += 1
+            elif c == ')':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            elif c in ';{}':
+                break
+
+        raise self.error("missing ')'", pos)
+
+def undefined_macro(name):
+    raise ExpressionError("%s is not defined, is a binding header missing?" % name)
+
+def unescape(escape):
+    c = escape[0]
+    if c == 'x':
+        return int(escape[1:], 16)
+
+    if c in '01234567':
+        return int(escape, 8) & 0xff
+
+    return ESCAPES.get(c, ord(c))
+
+"""
+merge_nodes: merge a node into another node, like dtc does
+
+The properties of @new replace the properties of @old with the same name,
+in place, the other ones are appended. The children with the same name
+are merged, the other ones are appended.
+
+@old (Node): node of the tree
+@new (Node): node to merge in
+"""
+def merge_nodes(old, new):
+    for label in new.labels:
+        if label not in old.labels:
+            old.labels.append(label)
+
+    for prop in new.props:
+        if prop.deleted:
+            old.props = [p for p in old.props if p.name != prop.name]
+            continue
+
+        existing = old.get_property(prop.name)
+        if existing:
+            existing.pieces = prop.pieces
+            existing.pos = prop.pos
+        else:
+            old.props.append(prop)
+
+    for child in new.children:
+        if child.deleted:
+            old.children = [c for c in old.children if c.name != child.name]
+            continue
+
+        existing = old.get_child(child.name)
+        if existing:
+            merge_nodes(existing, child)
+        else:
+            old.children.append(child)
+
+"""
+find_node_by_path: find a node by its full path
+
+@root (Node): root node
+@path (str): full path such as /soc/uart0@f8010000, with the unit addresses
+
+return (Node): the node, None if not found
+"""
+def find_node_by_path(root, path):
+    node = root
+    for component in [c for c in path.split('/') if c]:
+        node = node.get_child(component)
+        if node is None:
+            return None
+
+    return node
+
+"""
+Resolver: check the final tree and resolve the references
+
+The phandles are assigned in the order the references are found in a
+depth first walk of the tree, starting from 1, like dtc does. A 'phandle'
+property is appended to every referenced node.
+"""
+class Resolver:
+    def __init__(self, parser):
+        self.parser = parser
+        self.root = parser.root
+        self.paths = {}
+        self.labels = {}
+        self.phandles = {}
+
+    def walk(self, node, path):
+        yield node, path
+        for child in node.children:
+            yield from self.walk(child, (path.rstrip('/') + '/' + child.name))
+
+    def check(self):
+        for node, path in self.walk(self.root, '/'):
+            self.paths[id(node)] = path
+
+            names = set()
+            for p in node.props:
+                if p.name in names:
+                    raise self.parser.error("duplicate property name %s in %s" % (p.name, path), p.pos)
+                names.add(p.name)
+
+            names = set()
+            for c in node.children:
+                if c.name in names:
+                    raise self.parser.error("duplicate node name %s in %s" % (c.name, path), c.pos)
+                names.add(c.name)
+
+            for label in node.labels:
+                if label in self.labels and self.labels[label] is not node:
+                    other = self.paths[id(self.labels[label])]
+                    raise self.parser.error("duplicate label %s on %s and %s" % (label, other, path), node.pos)
+                self.labels[label] = node
+
+            p = node.get_property('phandle')
+            if p and len(p.pieces) == 1 and isinstance(p.pieces[0], bytes) and len(p.pieces[0]) == 4:
+                node.phandle = struct.unpack('>I', p.pieces[0])[0]
+                self.phandles[node.phandle] = node
+
+    def lookup(self, ref):
+        if ref.target.startswith('/'):
+            node = find_node_by_path(self.root, ref.target)
+        else:
+            node = self.labels.get(ref.target)
+
+        if node is None:
+            raise self.parser.error("reference to non-existent node or label %s" % ref.target, ref.pos)
+
+        return node
+
+    def get_phandle(self, node):
+        if node.phandle is None:
+            phandle = 1
+            while phandle in self.phandles:
+                phandle += 1
+
+            node.phandle = phandle
+            self.phandles[phandle] = node
+            node.props.append(Property('phandle', [struct.pack('>I', phandle)], node.pos))
+
+        return node.phandle
+
+    def resolve(self):
+        self.check()
+
+        for node, _ in self.walk(self.root, '/'):
+            for p in list(node.props):
+                for piece in p.pieces:
+                    if isinstance(piece, Ref) and piece.kind == 'phandle':
+                        self.get_phandle(self.lookup(piece))
+
+        for node, _ in self.walk(self.root, '/'):
+            for p in node.props:
+                value = bytearray()
+                for piece in p.pieces:
+                    if not isinstance(piece, Ref):
+                        value += piece
+                    elif piece.kind == 'phandle':
+                        value += struct.pack('>I', self.lookup(piece).phandle)
+                    else:
+                        value += self.paths[id(self.lookup(piece))].encode('utf-8') + b'\0'
+                p.value = bytes(value)
+
+        return self.root
+
+"""
+compile_dts: compile a device tree source
+
+The include files are searched in @sources, by path then by file name, then
+on the disk.
+
+@filename (str): path of the dts
+@sources (dict): content of the generated files by path, the dts itself
+                 is read from it if present
+@warnings (list): the warnings are appended to it if given
+
+return (DeviceTree): compiled device tree
+
+raise DtsError: the source is invalid, the message gives the file and the line
+"""
+def compile_dts(filename, sources=None, warnings=None):
+    sources = sources or {}
+    pp = Preprocessor(sources)
+
+    if filename in sources:
+        text = sources[filename]
+    else:
+        with open(filename, 'r') as f:
+            text = f.read()
+
+    pp.read(filename, text)
+    if warnings is not None:
+        warnings.extend(pp.warnings)
+    stats.count('dts_lines', len(pp.lines))
+
+    parser = Parser(pp)
+    parser.parse()
+
+    resolver = Resolver(parser)
+    root = resolver.resolve()
+
+    return DeviceTree(root, parser.memreserve, resolver.paths)
+
+"""
+CheckParser: parser which keeps going when a '&label { }' node refers to a
+missing label or a value is out of range
+
+These errors are appended to @errors. The body of a node with a missing
+label is parsed into a detached node.
+"""
+class CheckParser(Parser):
+    def __init__(self, preprocessor):
+        super().__init__(preprocessor)
+        self.errors = []
+        self.missing = set()
+
+    def invalid_value(self, message, pos):
+        self.errors.append(self.error(message, pos))
+
+    def find_reference(self, target, pos):
+        try:
+            return super().find_reference(target, pos)
+        except DtsError as e:
+            self.errors.append(e)
+
+        node = Node(None, [], pos)
+        self.missing.add(id(node))
+
+        return node
+
+    def find_parent(self, node):
+        if id(node) in self.missing:
+            parent = Node(None, [], node.pos)
+            parent.children.append(node)
+            return parent
+
+        return super().find_parent(node)
+
+"""
+check_structure: check that the nodes are balanced and the statements are
+terminated
+
+The braces are matched on the tokens of the source, before it is parsed, so
+a node which is not closed is reported at the line of its '{', not at the
+end of the file.
+
+@parser (Parser): parser of the preprocessed source
+
+return (list): DtsError of each unbalanced brace, missing ';' after '}',
+unterminated string or comment
+"""
+def check_structure(parser):
+    errors = []
+    opened = []
+    text = parser.text
+    closed = None
+
+    for m in STRUCTURE.finditer(text):
+        token = m.group(0)
+        if closed is not None and token != ';' and not token.startswith(('/*', '//')):
+            errors.append(parser.error("expected ';' after '}'", closed))
+        closed = None
+
+        if token == '{':
+            opened.append(m.start())
+        elif token == '}':
+            if opened:
+                opened.pop()
+            else:
+                errors.append(parser.error("'}' without a matching '{'", m.start()))
+            closed = m.start()
+        elif token == '"':
+            # the rest of the source can not be tokenized
+            errors.append(parser.error("unterminated string", m.start()))
+            return errors
+        elif token == '/*':
+            errors.append(parser.error("unterminated comment", m.start()))
+            return errors
+
+    if closed is not None:
+        errors.append(parser.error("expected ';' after '}'", closed))
+
+    for pos in opened:
+        errors.append(parser.error("'{' is not closed by '};'", pos))
+
+    return errors
+
+"""
+check_dts: check the syntax and the references of a device tree source
+
+The source is checked without being compiled: the nodes must be balanced,
+the properties and nodes terminated by ';', and every '&label' reference,
+in a value or as a '&label { }' node, must be a label of the tree. The
+labels are looked up in the label index of the tree. Unlike compile_dts(),
+the errors of the structure and of the references are all reported, not
+only the first one.
+
+The nodes of the slave configurations are put by the templates under the
+node of their parent_label, a slave whose parent_label is not a label of
+the tree is left out of it. These labels are given in @labels, the missing
+ones are warnings.
+
+@filename (str): path of the dts
+@sources (dict): content of the generated files by path, see compile_dts()
+@warnings (list): the warnings are appended to it if given
+@labels (list): (label, node name) of the slave nodes with a parent_label
+
+return (list): DtsError of each error, empty if the source is valid
+"""
+def check_dts(filename, sources=None, warnings=None, labels=()):
+    sources = sources or {}
+    pp = Preprocessor(sources)
+
+    if filename in sources:
+        text = sources[filename]
+    else:
+        with open(filename, 'r') as f:
+            text = f.read()
+
+    try:
+        pp.read(filename, text)
+    except DtsError as e:
+        return [e]
+    finally:
+        if warnings is not None:
+            warnings.extend(pp.warnings)
+    stats.count('dts_lines', len(pp.lines))
+
+    parser = CheckParser(pp)
+    errors = check_structure(parser)
+    if errors:
+        return errors
+
+    try:
+        parser.parse()
+        resolver = Resolver(parser)
+        resolver.check()
+    except DtsError as e:
+        return parser.errors + [e]
+
+    errors = parser.errors
+    for node, _ in resolver.walk(parser.root, '/'):
+        for p in node.props:
+            for piece in p.pieces:
+                if isinstance(piece, Ref):
+                    stats.count('dts_references')
+                    try:
+                        resolver.lookup(piece)
+                    except DtsError as e:
+                        errors.append(e)
+
+    for label, name in labels:
+        if label not in resolver.labels and warnings is not None:
+            warnings.append("parent_label %s of %s matches no label of the device tree, %s is ignored" %
+                            (label, name, name))
+
+    return errors
@@ -0,0 +1,270 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import re
+
+from core.stats import stats
+
+"""
+Evaluator of C integer constant expressions
+
+The values of the '#define' of soc.h could be expressions such as
+(SYSTEM_BMB_PERIPHERAL_BMB + 0x10000) or (1u << 12). They are evaluated
+in process, like the C preprocessor would, so soc.h does not need to be
+preprocessed before the generation.
+
+Supported: decimal, hex and binary integers with u/l suffixes, macro names,
+parentheses, the unary + - ~ !, the binary * / % + - << >> < <= > >= == !=
+& ^ | && || and the ?: conditional. The values are unbounded python int, the
+width of the C types is not emulated. As in C, the operand which is not
+taken by && || and ?: is not evaluated, so its macros need not be defined.
+
+A number with a leading zero such as 010 is decimal, as parse_int() reads
+it, for compatibility with the previous versions. The dts compiler reads it
+as octal, like dtc, with the octal option.
+"""
+
+class ExpressionError(ValueError):
+    pass
+
+TOKEN = re.compile(r'''\s*(?:
+    (?P<number>(?:0[xX][0-9a-fA-F]+|0[bB][01]+|[0-9]+)(?:[uU](?:ll|LL|l|L)?|(?:ll|LL|l|L)[uU]?)?(?![\w]))
+    |(?P<name>[A-Za-z_]\w*)
+    |(?P<op><<|>>|<=|>=|==|!=|&&|\|\||[-+*/%&|^~!<>()?:])
+    )''', re.VERBOSE)
+
+BINARY_OPERATORS = {
+    '*': 10, '/': 10, '%': 10,
+    '+': 9, '-': 9,
+    '<<': 8, '>>': 8,
+    '<': 7, '<=': 7, '>': 7, '>=': 7,
+    '==': 6, '!=': 6,
+    '&': 5,
+    '^': 4,
+    '|': 3,
+    '&&': 2,
+    '||': 1
+}
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+
+    while pos < len(text):
+        m = TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise ExpressionError("unexpected '%s' in '%s'" % (text[pos:].strip()[:1], text))
+
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind)))
+        pos = m.end()
+
+    return tokens
+
+"""
+parse_number: get the value of an integer literal
+
+@literal (str): decimal, hex or binary integer with an optional u/l suffix
+@octal (bool): read a number with a leading zero as octal, like C and dtc,
+               instead of decimal like parse_int()
+
+return (int): value of the literal
+
+raise ExpressionError: @literal is not a valid octal number with @octal
+"""
+def parse_number(literal, octal=False):
+    stats.count('int_conversions')
+    digits = literal.rstrip('uUlL')
+
+    if digits[:2] in ('0x', '0X'):
+        return int(digits, 16)
+
+    if digits[:2] in ('0b', '0B'):
+        return int(digits[2:], 2)
+
+    if octal and len(digits) > 1 and digits[0] == '0':
+        try:
+            return int(digits, 8)
+        except ValueError:
+            raise ExpressionError("invalid octal number %s" % literal)
+
+    return int(digits, 10)
+
+def divide(a, b, op):
+    if b == 0:
+        raise ExpressionError("division by zero")
+
+    # C division truncates toward zero
+    q = abs(a) // abs(b)
+    if (a < 0) != (b < 0):
+        q = -q
+
+    return q if op == '/' else a - b * q
+
+def apply_operator(op, a, b):
+    if op in ('/', '%'):
+        return divide(a, b, op)
+
+    if op in ('<<', '>>'):
+        if b < 0:
+            raise ExpressionError("negative shift count %d" % b)
+        return a << b if op == '<<' else a >> b
+
+    return {
+        '*': lambda: a * b,
+        '+': lambda: a + b,
+        '-': lambda: a - b,
+        '<': lambda: int(a < b),
+        '<=': lambda: int(a <= b),
+        '>': lambda: int(a > b),
+        '>=': lambda: int(a >= b),
+        '==': lambda: int(a == b),
+        '!=': lambda: int(a != b),
+        '&': lambda: a & b,
+        '^': lambda: a ^ b,
+        '|': lambda: a | b,
+        '&&': lambda: int(bool(a) and bool(b)),
+        '||': lambda: int(bool(a) or bool(b))
+    }[op]()
+
+class Parser:
+    def __init__(self, text, lookup, width=None, octal=False):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.lookup = lookup
+        self.mask = (1 << width) - 1 if width else None
+        self.octal = octal
+        # depth of the operands which are parsed but not evaluated
+        self.skip = 0
+
+    def wrap(self, value):
+        if self.mask is None:
+            return value
+
+        return value & self.mask
+
+    """
+    skipped: parse an operand which is evaluated only if it is taken
+
+    An operand which is not taken is parsed for its syntax only: its macros
+    are not looked up and its operators raise no error.
+
+    @taken (bool): evaluate the operand
+    @parse (function): parse the operand
+
+    return (int): value of the operand, 0 if it is not taken
+    """
+    def skipped(self, taken, parse):
+        if taken:
+            return parse()
+
+        self.skip += 1
+        try:
+            parse()
+        finally:
+            self.skip -= 1
+
+        return 0
+
+    def apply(self, op, a, b):
+        if self.skip:
+            return 0
+
+        return self.wrap(apply_operator(op, a, b))
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+
+        return (None, None)
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise ExpressionError("unexpected end of '%s'" % self.text)
+
+        self.pos += 1
+
+        return token
+
+    def expect(self, op):
+        kind, value = self.next()
+        if kind != 'op' or value != op:
+            raise ExpressionError("expected '%s' instead of '%s' in '%s'" % (op, value, self.text))
+
+    def parse(self):
+        value = self.conditional()
+        if self.peek()[0] is not None:
+            raise ExpressionError("unexpected '%s' in '%s'" % (self.peek()[1], self.text))
+
+        return value
+
+    def conditional(self):
+        cond = self.binary(1)
+
+        if self.peek() == ('op', '?'):
+            self.next()
+            a = self.skipped(cond, self.conditional)
+            self.expect(':')
+            b = self.skipped(not cond, self.conditional)
+            return a if cond else b
+
+        return cond
+
+    def binary(self, min_prec):
+        left = self.unary()
+
+        while True:
+            kind, op = self.peek()
+            prec = BINARY_OPERATORS.get(op) if kind == 'op' else None
+            if prec is None or prec < min_prec:
+                return left
+
+            self.next()
+            # the right operand of && and || is not evaluated if the left one
+            # gives the result
+            taken = not (op == '&&' and not left or op == '||' and left)
+            right = self.skipped(taken, lambda: self.binary(prec + 1))
+            left = self.apply(op, left, right)
+
+    def unary(self):
+        kind, value = self.next()
+
+        if kind == 'number':
+            return self.wrap(parse_number(value, self.octal))
+
+        if kind == 'name':
+            if self.skip:
+                return 0
+            return self.wrap(self.lookup(value))
+
+        if value == '(':
+            result = self.conditional()
+            self.expect(')')
+            return result
+
+        if value in ('+', '-', '~', '!'):
+            operand = self.unary()
+            return self.wrap({'+': operand, '-': -operand, '~': ~operand, '!': int(not operand)}[value])
+
+        raise ExpressionError("unexpected '%s' in '%s'" % (value, self.text))
+
+"""
+evaluate_expression: evaluate a C integer constant expression
+
+@text (str): expression such as (SYSTEM_BMB_PERIPHERAL_BMB + 0x10000)
+@lookup (function): get the int value of a macro name, raise ExpressionError
+                    if it can not be evaluated
+@width (int): evaluate with unsigned integers of this width in bits, like
+              dtc does for the cells. By default the values are signed.
+@octal (bool): read the numbers with a leading zero as octal, see parse_number()
+
+return (int): value of the expression
+
+raise ExpressionError: the expression is invalid
+"""
+def evaluate_expression(text, lookup, width=None, octal=False):
+    return Parser(text, lookup, width, octal).parse()
@@ -0,0 +1,259 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import struct
+
+"""
+Flattened device tree (DTB) writer and reader
+
+The blob has the layout of the dtc output with the default options:
+version 17, the memory reservation block right after the header, then
+the structure block and the strings block, without padding. The property
+names are stored in the strings block in the order they are first used,
+a name which is the tail of a stored name is not stored again. So the
+blob of a tree compiled by compile_dts() has the same bytes as the blob
+compiled by dtc from the same sources.
+"""
+
+FDT_MAGIC = 0xd00dfeed
+FDT_VERSION = 17
+FDT_LAST_COMP_VERSION = 16
+FDT_HEADER_SIZE = 40
+
+FDT_BEGIN_NODE = 1
+FDT_END_NODE = 2
+FDT_PROP = 3
+FDT_NOP = 4
+FDT_END = 9
+
+class FdtError(ValueError):
+    pass
+
+def align(data, size=4):
+    data += b'\0' * (-len(data) % size)
+
+def add_string(strings, name):
+    s = name.encode('utf-8') + b'\0'
+    offset = strings.find(s)
+    if offset < 0:
+        offset = len(strings)
+        strings += s
+
+    return offset
+
+def flatten_node(node, structure, strings):
+    structure += struct.pack('>I', FDT_BEGIN_NODE)
+    structure += node.name.encode('utf-8') + b'\0'
+    align(structure)
+
+    for p in node.props:
+        if p.deleted:
+            continue
+        structure += struct.pack('>III', FDT_PROP, len(p.value), add_string(strings, p.name))
+        structure += p.value
+        align(structure)
+
+    for child in node.children:
+        if not child.deleted:
+            flatten_node(child, structure, strings)
+
+    structure += struct.pack('>I', FDT_END_NODE)
+
+"""
+flatten: serialize a device tree into a flattened device tree blob
+
+@tree (DeviceTree): device tree from compile_dts()
+
+return (bytes): blob
+"""
+def flatten(tree):
+    structure = bytearray()
+    strings = bytearray()
+
+    flatten_node(tree.root, structure, strings)
+    structure += struct.pack('>I', FDT_END)
+
+    reserve = bytearray()
+    for addr, size in tree.memreserve + [(0, 0)]:
+        reserve += struct.pack('>QQ', addr, size)
+
+    off_rsvmap = FDT_HEADER_SIZE
+    off_struct = off_rsvmap + len(reserve)
+    off_strings = off_struct + len(structure)
+    total = off_strings + len(strings)
+
+    header = struct.pack('>10I', FDT_MAGIC, total, off_struct, off_strings, off_rsvmap,
+                         FDT_VERSION, FDT_LAST_COMP_VERSION, tree.boot_cpuid(),
+                         len(strings), len(structure))
+
+    return header + bytes(reserve) + bytes(structure) + bytes(strings)
+
+"""
+unflatten: read a flattened device tree blob
+
+@blob (bytes): blob, from flatten() or from dtc
+
+return (dict): {"header": header fields, "memreserve": list of (address, size),
+"root": (name, [(property, value)], [children])}
+
+raise FdtError: the blob is invalid
+"""
+def unflatten(blob):
+    if len(blob) < FDT_HEADER_SIZE:
+        raise FdtError("blob is too small")
+
+    fields = struct.unpack_from('>10I', blob)
+    names = ['magic', 'totalsize', 'off_dt_struct', 'off_dt_strings', 'off_mem_rsvmap',
+             'version', 'last_comp_version', 'boot_cpuid_phys', 'size_dt_strings',
+             'size_dt_struct']
+    header = dict(zip(names, fields))
+
+    if header['magic'] != FDT_MAGIC:
+        raise FdtError("bad magic 0x%08x" % header['magic'])
+
+    if header['totalsize'] > len(blob):
+        raise FdtError("truncated blob, %d bytes of %d" % (len(blob), header['totalsize']))
+
+    def unpack(fmt, offset):
+        try:
+            return struct.unpack_from(fmt, blob, offset)
+        except struct.error:
+            raise FdtError("truncated blob at offset %d" % offset)
+
+    def get_string(offset):
+        end = blob.find(b'\0', offset)
+        if end < 0:
+            raise FdtError("unterminated string at offset %d" % offset)
+        try:
+            return blob[offset:end].decode('utf-8')
+        except UnicodeDecodeError:
+            raise FdtError("invalid string at offset %d" % offset)
+
+    memreserve = []
+    pos = header['off_mem_rsvmap']
+    while True:
+        addr, size = unpack('>QQ', pos)
+        pos += 16
+        if addr == 0 and size == 0:
+            break
+        memreserve.append((addr, size))
+
+    strings = header['off_dt_strings']
+
+    pos = header['off_dt_struct']
+    stack = []
+    root = None
+
+    while True:
+        token = unpack('>I', pos)[0]
+        pos += 4
+
+        if token == FDT_BEGIN_NODE:
+            node = (get_string(pos), [], [])
+            pos += len(node[0].encode('utf-8')) + 1
+            pos += -pos % 4
+            if stack:
+                stack[-1][2].append(node)
+            elif root is None:
+                root = node
+            else:
+                raise FdtError("several root nodes")
+            stack.append(node)
+        elif token == FDT_PROP:
+            if not stack:
+                raise FdtError("property outside of a node")
+            length, nameoff = unpack('>II', pos)
+            pos += 8
+            stack[-1][1].append((get_string(strings + nameoff), bytes(blob[pos:pos + length])))
+            pos += length + (-length % 4)
+        elif token == FDT_END_NODE:
+            if not stack:
+                raise FdtError("unbalanced end of node")
+            stack.pop()
+        elif token == FDT_NOP:
+            continue
+        elif token == FDT_END:
+            break
+        else:
+            raise FdtError("bad token %d at offset %d" % (token, pos - 4))
+
+    if stack or root is None:
+        raise FdtError("unterminated structure block")
+
+    return {"header": header, "memreserve": memreserve, "root": root}
+
+def format_value(value):
+    if len(value) % 4 == 0 and value:
+        return '<' + ' '.join('0x%x' % c for c in struct.unpack('>%dI' % (len(value) // 4), value)) + '>'
+
+    return '[' + value.hex(' ') + ']'
+
+def compare_nodes(a, b, path, differences):
+    props_a = dict(a[1])
+    props_b = dict(b[1])
+
+    for name, value in a[1]:
+        if name not in props_b:
+            differences.append("%s: property %s is missing" % (path, name))
+        elif props_b[name] != value:
+            differences.append("%s: property %s is %s instead of %s" %
+                               (path, name, format_value(props_b[name]), format_value(value)))
+
+    for name, _ in b[1]:
+        if name not in props_a:
+            differences.append("%s: unexpected property %s" % (path, name))
+
+    if [n for n, _ in a[1] if n in props_b] != [n for n, _ in b[1] if n in props_a]:
+        differences.append("%s: properties are in a different order" % path)
+
+    children_b = {c[0]: c for c in b[2]}
+    names_a = set(c[0] for c in a[2])
+
+    for child in a[2]:
+        child_path = path.rstrip('/') + '/' + child[0]
+        if child[0] not in children_b:
+            differences.append("%s: node is missing" % child_path)
+        else:
+            compare_nodes(child, children_b[child[0]], child_path, differences)
+
+    for child in b[2]:
+        if child[0] not in names_a:
+            differences.append("%s: unexpected node" % (path.rstrip('/') + '/' + child[0]))
+
+    if [c[0] for c in a[2] if c[0] in children_b] != [c[0] for c in b[2] if c[0] in names_a]:
+        differences.append("%s: nodes are in a different order" % path)
+
+"""
+compare_blobs: compare two flattened device tree blobs
+
+The nodes, the properties and their order are compared, then the header
+and the layout if the trees are the same.
+
+@expected (bytes): reference blob, such as the dtc output
+@actual (bytes): blob to check
+
+return (list): description of each difference, empty if the blobs are the same
+"""
+def compare_blobs(expected, actual):
+    if expected == actual:
+        return []
+
+    a = unflatten(expected)
+    b = unflatten(actual)
+    differences = []
+
+    if a['memreserve'] != b['memreserve']:
+        differences.append("/memreserve/ entries are %s instead of %s" % (b['memreserve'], a['memreserve']))
+
+    compare_nodes(a['root'], b['root'], '/', differences)
+
+    if not differences:
+        for field in ['version', 'last_comp_version', 'boot_cpuid_phys']:
+            if a['header'][field] != b['header'][field]:
+                differences.append("header %s is %d instead of %d" % (field, b['header'][field], a['header'][field]))
+
+    if not differences:
+        differences.append("same tree with a different layout, %d bytes instead of %d" % (len(actual), len(expected)))
+
+    return differences
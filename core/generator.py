@@ -0,0 +1,493 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import copy
+
+from core.core import *
+from core.utils import *
+from core.dt import *
+from core.interval import *
+from core.stats import stats
+
+"""
+Device tree generation API
+
+generate() builds and renders the device tree of a SoC from inputs in
+memory and returns the dtsi, the dts and the model, without reading or
+writing output files. It is build() followed by render(). The command line
+script calls build() and adds the file handling on top of it: the output
+directory, the output cache, the streaming and the incremental writes.
+
+    from core.generator import generate
+
+    result = generate(soc_h_text, 'ti180', 'linux', user_configs=[spi_cfg])
+    print(result.dts)
+    for w in result.warnings:
+        print("Warning: %s" % w)
+"""
+
+templates = {}
+
+# bytecode cache of the templates, see set_template_cache()
+template_cache = {'enabled': True, 'directory': None}
+
+class GenerationError(ValueError):
+    pass
+
+class Result:
+    __slots__ = ('dtsi', 'dts', 'model', 'dtsi_name', 'dts_name', 'board', 'warnings')
+
+    def __init__(self, dtsi, dts, model, dtsi_name, dts_name, board, warnings=None):
+        self.dtsi = dtsi
+        self.dts = dts
+        self.model = model
+        self.dtsi_name = dtsi_name
+        self.dts_name = dts_name
+        self.board = board
+        self.warnings = warnings if warnings is not None else []
+
+"""
+set_template_cache: set the bytecode cache of the compiled templates
+
+The templates are loaded again by the next get_templates() if the cache
+changed.
+
+@cache_dir (str): cache directory, the compiled templates are stored in its
+                  templates directory. By default is get_cache_dir().
+@enabled (bool): load and store the compiled templates in the cache
+"""
+def set_template_cache(cache_dir=None, enabled=True):
+    directory = os.path.join(cache_dir, "templates") if cache_dir else None
+
+    if template_cache != {'enabled': enabled, 'directory': directory}:
+        template_cache.update(enabled=enabled, directory=directory)
+        templates.clear()
+
+"""
+get_templates: get the compiled dtsi and dts templates
+
+jinja2 is imported and the templates are loaded on the first call only, so
+the command line and error paths do not pay for it. The templates are loaded
+again if a template file changed, for long running processes.
+
+return: (dtsi template, dts template)
+"""
+def get_templates():
+    if not templates or not all(t.is_up_to_date for t in templates.values()):
+        from core.template import get_template_env
+
+        env = get_template_env(template_cache['enabled'], template_cache['directory'])
+        templates['dtsi'] = env.get_template("soc.jinja2")
+        templates['dts'] = env.get_template("dts.jinja2")
+
+    return templates['dtsi'], templates['dts']
+
+"""
+update_peripheral_nodes: update the reg and offset of peripheral
+
+The offset of a peripheral is calculate by minus the peripheral address
+from the bus address. It is unknown during dt_create_peripheral_node().
+This is because of the bus address is not define for the said peripheral.
+We only know the bus address during connect_peripheral_to_bus(). Thus,
+the offset, reg and header property get updated at very late stage.
+
+@peripheral_node (dict): peripheral node of a device
+@reg_addr (int): start address of the peripheral
+@peri_size (int): size of the peripheral
+@offset (int): offset of the peripheral
+
+return (dict): updated peripheral node with offset, reg and header property
+"""
+def update_peripheral_nodes(peripheral_node, reg_addr, peri_size, offset):
+    if 'reg' in peripheral_node and peripheral_node['reg']:
+        reg = peripheral_node['reg']
+    else:
+        reg = "<{0} {1}>".format(reg_addr, peri_size)
+
+    peripheral_node.update({
+        "offset": offset,
+        "reg": reg
+    })
+    header = get_node_header(peripheral_node)
+    peripheral_node.update({"header": header})
+
+    return peripheral_node
+
+"""
+connect_peripheral_to_bus: connect the peripherals to its own bus
+
+This function create a data structure to connect the peripherals
+to its own bus based on the bus address range and peripherals addresses.
+This will create a complete bus architecture and the set of peripherals.
+
+Each peripheral is placed with a single lookup in @bus_index. A peripheral
+is connected to the innermost bus which contains its whole address range.
+For Zephyr, every peripheral is connected to the BMB bus.
+
+@soc_config (dict): soc configuration after parse it
+@buses_node (dict): bus nodes
+@bus_index (IntervalIndex): address windows of the buses, None for Zephyr
+
+return (dict): placement report, the bus of each peripheral. The bus is None
+if the peripheral is outside of every bus.
+"""
+def connect_peripheral_to_bus(soc_config, buses_node, bus_index):
+    available_peripherals = get_supported_peripherals(soc_config)
+    peri_config = soc_config['peripherals']
+    is_zephyr = check_is_zephyr(soc_config)
+    peripheral_node = {}
+    placement = {}
+
+    for peripheral in available_peripherals:
+        for pp, peri in peri_config[peripheral].items():
+            peri_size = hex(peri.size)
+
+            if is_zephyr:
+                bus = 'BMB'
+                peri_addr = hex(peri.addr)
+                peripheral_node = dt_create_peripheral_node(soc_config, pp)
+                peripheral_node = update_peripheral_nodes(peripheral_node, peri_addr, peri_size, peri_addr)
+
+            else:
+                bus = bus_index.find(peri.addr, peri.size)
+                if bus is None:
+                    placement[pp] = None
+                    continue
+
+                offset = hex(peri.addr - bus_index.start(bus))
+                peripheral_node = dt_create_peripheral_node(soc_config, pp)
+                peripheral_node = update_peripheral_nodes(peripheral_node, offset, peri_size, offset)
+
+            buses_node[bus]['peripherals'].update({pp: peripheral_node})
+            placement[pp] = bus
+
+    return placement
+
+"""
+create_bus_nodes: create the bus nodes and connect the peripherals to them
+
+A peripheral outside of every bus is reported in @warnings and has no node.
+
+@soc_config (dict): soc configuration after parse it
+@warnings (list): warnings of the generation, printed to stderr if None
+
+return (dict): bus nodes under the "buses" key
+"""
+def create_bus_nodes(soc_config, warnings=None):
+    buses_node = {}
+    bus_cfg = soc_config['buses']
+    bus_index = None
+
+    if check_is_zephyr(soc_config):
+        bus = 'BMB'
+        buses_node[bus] = dt_create_bus_node(soc_config, bus)
+
+    else:
+        for bus in bus_cfg:
+            buses_node[bus] = dt_create_bus_node(soc_config, bus)
+
+        bus_index = IntervalIndex((bus, b.addr, b.size) for bus, b in bus_cfg.items())
+
+    placement = connect_peripheral_to_bus(soc_config, buses_node, bus_index)
+    for pp, bus in placement.items():
+        if bus is None:
+            peri = get_peripheral_data(soc_config, pp)
+            warn(warnings, "%s at %s size %s is outside of every bus, the node is not created" %
+                 (pp, hex(peri.addr), hex(peri.size)))
+
+    buses_node = {"buses": buses_node}
+
+    return buses_node
+
+"""
+create_root_nodes: create the root, memory, cpu and clock nodes
+
+@soc_config (dict): soc configuration after parse it, updated in place
+@metadata (dict): model, os, device_family, board and soc_name of the root node
+@dtsi_name (str): file name of the soc dtsi, included by the Zephyr dts
+@extmemory (bool): use the external memory as Zephyr sram
+
+return (dict): root node
+"""
+def create_root_nodes(soc_config, metadata, dtsi_name='', extmemory=False):
+    is_zephyr = metadata['os'] == "zephyr"
+
+    with stats.stage("root"):
+        root_node = dt_create_root_node(soc_config, **metadata)
+        os_data = get_os_data(root_node)
+        misc_node = {
+                "include_headers": thaw(os_data['include_headers']),
+                "chosen": thaw(os_data['chosen']),
+                "aliases": thaw(os_data['aliases'])
+        }
+        if is_zephyr:
+            if not 'dts' in misc_node['include_headers']:
+                misc_node['include_headers']['dts'] = {'include': []}
+
+            misc_node['include_headers']['dts']['include'].append(
+                    "#include <efinix/{}>".format(dtsi_name))
+
+        root_node = dt_insert_child_node(root_node, misc_node)
+        soc_config['root'].update(root_node['root'])
+
+    with stats.stage("memory"):
+        mem_node = dt_create_memory_node(soc_config)
+        soc_config['root'].update({'memory': mem_node})
+
+        if 'reserved_memory' in os_data:
+            soc_config['root']['reserved_memory'] = thaw(os_data['reserved_memory'])
+
+    if is_zephyr :
+        if extmemory:
+            soc_config['root']['chosen']['private_data'].append("zephyr,sram = &external_ram;")
+        else:
+            soc_config['root']['chosen']['private_data'].append("zephyr,sram = &ram0;")
+
+    with stats.stage("cpu"):
+        dt_create_cpu_node(soc_config)
+
+    with stats.stage("clock"):
+        clk_node = dt_create_clock_node(soc_config, 'apb_clock')
+        if clk_node and not is_zephyr:
+            soc_config['root'].update(clk_node)
+
+    return root_node
+
+def append_chosen_node(soc_config, root_node, user_cfg):
+    for key in user_cfg['append']:
+        # check if key is 'chosen', 'alias' or any peripheral name.
+        if 'aliases' in key or 'chosen' in key:
+            if 'bootargs' in root_node['root'][key]:
+                append_chosen_data(soc_config, key, 'bootargs', user_cfg['append'][key]['bootargs'])
+
+            if 'stdout_path' in root_node['root'][key]:
+                append_chosen_data(soc_config, key, 'stdout_path', user_cfg['append'][key]['stdout_path'], sep=",")
+
+            if 'private_data' in root_node['root'][key]:
+                append_chosen_data(soc_config, key, 'private_data', user_cfg['append'][key]['private_data'])
+
+"""
+get_metadata: get the metadata of the root node of a board
+
+@board (str): development kit name such as t120, ti60
+@os (str): operating system name such as linux, uboot or zephyr
+
+return (dict): model, os, device family, board and soc name of the root node
+
+raise GenerationError: the development kit is not supported
+"""
+def get_metadata(board, os):
+    conf = load_config_file()
+    devkit = ''
+    device_family = ''
+
+    for dev_family, devs in conf['devkits'].items():
+        for dev in devs:
+            if board in dev.lower():
+                devkit = dev
+                device_family = dev_family
+
+    if not devkit:
+        raise GenerationError("%s development kit is not supported" % board)
+
+    if "ti375" in devkit.lower():
+        soc_name = conf['soc_name']['hard']
+    else:
+        soc_name = conf['soc_name']['soft']
+
+    return {
+        'model': conf['model'],
+        'os': os,
+        'device_family': device_family,
+        'board': devkit,
+        'soc_name': soc_name
+    }
+
+"""
+get_output_names: get the file names of the dtsi and of the dts
+
+@os (str): operating system name such as linux, uboot or zephyr
+@socname (str): custom soc name of the Zephyr SoC dtsi
+@zephyrboard (str): Zephyr board name
+
+return: (dtsi file name, dts file name)
+"""
+def get_output_names(os, socname=None, zephyrboard=None):
+    if os == "zephyr":
+        return "sapphire_soc_{}.dtsi".format(socname), "{}.dts".format(zephyrboard)
+
+    return "sapphire.dtsi", "{}.dts".format(os)
+
+"""
+build_soc_config: add the nodes of the board and of the user configurations
+into a parsed soc configuration
+
+The user configurations and the slaves are inserted into the device tree,
+pass copies if they are used again.
+
+@soc_config (dict): soc configuration from parse_soc_config(), it is modified
+@metadata (dict): root node metadata from get_metadata()
+@dtsi_name (str): file name of the Zephyr SoC dtsi
+@extmemory (bool): use the external memory as Zephyr sram
+@user_configs (list): content of the user configuration files
+@slaves (list): content of the slave configuration files
+@warnings (list): warnings of the generation, printed to stderr if None
+
+return (dict): soc configuration to render
+"""
+def build_soc_config(soc_config, metadata, dtsi_name='', extmemory=False, user_configs=(), slaves=(),
+                     warnings=None):
+    with stats.stage("root nodes"):
+        root_node = create_root_nodes(soc_config, metadata, dtsi_name, extmemory)
+
+    # bus
+    with stats.stage("bus nodes"):
+        buses_node = create_bus_nodes(soc_config, warnings)
+
+    merged_child = {"child": {}}
+    if user_configs:
+        with stats.stage("user config"):
+            node_index = get_node_index(buses_node)
+
+            for user_cfg in user_configs:
+                override_peripherals(buses_node, user_cfg, node_index, warnings)
+
+                # add child node
+                if 'child' in user_cfg:
+                    child_node = get_child_node_header(user_cfg)
+                    for k, v in child_node['child'].items():
+                        merged_child['child'][k] = v
+
+                # append items into 'aliases' or 'chosen' node if specify
+                if 'append' in user_cfg:
+                    append_chosen_node(soc_config, root_node, user_cfg)
+
+    soc_config['root'].update(merged_child)
+    soc_config['root'].update(buses_node)
+
+    if slaves:
+        with stats.stage("slaves"):
+            slaves_node = {}
+            for slave_node in slaves:
+                slaves_node = {**slaves_node, **slave_node['child']}
+
+            slaves_node = {'child': slaves_node}
+            slaves_node = get_child_node_header(slaves_node)
+
+            if not 'child' in soc_config['root']:
+                soc_config = dt_insert_child_node(soc_config, slaves_node)
+            else:
+                soc_config['root']['child'].update(slaves_node['child'])
+
+    return soc_config
+
+"""
+load_soc: get the parsed soc configuration of soc.h
+
+@soc (str or dict): content of soc.h, path to soc.h, or soc configuration
+                    from parse_soc_config() which is copied
+@warnings (list): warnings of the generation, printed to stderr if None
+
+return (dict): soc configuration which could be built
+"""
+def load_soc(soc, warnings=None):
+    if isinstance(soc, dict):
+        return copy_soc_config(soc)
+
+    if '\n' in soc or '#define' in soc:
+        with stats.stage("parse"):
+            return parse_soc_lines(soc.splitlines(keepends=True), warnings)
+
+    with stats.stage("parse"):
+        return parse_soc_config(soc, warnings)
+
+"""
+build: build the device tree model of a SoC in memory, without rendering it
+
+The user configurations and the slaves given as dict are copied, and a
+parsed soc configuration is not modified, so they could be used again. The
+warnings of soc.h are only returned if soc.h is parsed by build(), the
+warnings of a parsed soc configuration are reported by parse_soc_config().
+
+@soc (str or dict): content of soc.h, path to soc.h, or soc configuration
+                    from parse_soc_config()
+@board (str): development kit name such as t120, ti60
+@os (str): operating system name such as linux, uboot or zephyr
+@user_configs (list): user configurations, dict or path to json file
+@slaves (list): slave device configurations, dict or path to json file
+@socname (str): custom soc name of the Zephyr SoC dtsi
+@zephyrboard (str): Zephyr board name
+@extmemory (bool): use the external memory as Zephyr sram
+
+return (Result): built soc configuration as model, file names of the dtsi
+and of the dts, development kit name and warnings, the dtsi and the dts
+are None until render()
+
+raise GenerationError: the board is not supported or the Zephyr names are missing
+"""
+def build(soc, board, os, user_configs=None, slaves=None, socname=None, zephyrboard=None,
+          extmemory=False):
+    if os not in ('linux', 'uboot', 'zephyr'):
+        raise GenerationError("unknown os %s, expected linux, uboot or zephyr" % os)
+
+    if os == 'zephyr' and not (socname and zephyrboard):
+        raise GenerationError("zephyr needs a socname and a zephyrboard")
+
+    metadata = get_metadata(board, os)
+    dtsi_name, dts_name = get_output_names(os, socname, zephyrboard)
+
+    def load(configs):
+        return [load_json_file(c) if isinstance(c, str) else copy.deepcopy(c) for c in configs or []]
+
+    warnings = []
+    soc_config = build_soc_config(load_soc(soc, warnings), metadata, dtsi_name, extmemory,
+                                  load(user_configs), load(slaves), warnings)
+
+    return Result(None, None, soc_config, dtsi_name, dts_name, metadata['board'], warnings)
+
+"""
+render: render the dtsi and the dts of a built device tree
+
+@result (Result): result of build(), updated with the rendered text
+@roles (list): outputs to render, dtsi and dts by default
+
+return (Result): @result
+"""
+def render(result, roles=('dtsi', 'dts')):
+    with stats.stage("load templates"):
+        templates = dict(zip(('dtsi', 'dts'), get_templates()))
+
+    for role in roles:
+        with stats.stage("render %s" % role):
+            setattr(result, role, templates[role].render(result.model))
+
+    return result
+
+"""
+generate: generate the device tree of a SoC in memory
+
+Only soc.h and the user configurations given by path are read, the outputs
+are returned instead of written. To generate several device trees of the
+same SoC, parse soc.h once with parse_soc_config() and pass the parsed soc
+configuration, it is not modified.
+
+@soc (str or dict): content of soc.h, path to soc.h, or soc configuration
+                    from parse_soc_config()
+@board (str): development kit name such as t120, ti60
+@os (str): operating system name such as linux, uboot or zephyr
+@user_configs (list): user configurations, dict or path to json file
+@slaves (list): slave device configurations, dict or path to json file
+@socname (str): custom soc name of the Zephyr SoC dtsi
+@zephyrboard (str): Zephyr board name
+@extmemory (bool): use the external memory as Zephyr sram
+
+return (Result): dtsi and dts text, built soc configuration as model, file
+names of the dtsi and of the dts, development kit name and warnings
+
+raise GenerationError: the board is not supported or the Zephyr names are missing
+"""
+def generate(soc, board, os, user_configs=None, slaves=None, socname=None, zephyrboard=None,
+             extmemory=False):
+    return render(build(soc, board, os, user_configs, slaves, socname, zephyrboard, extmemory))
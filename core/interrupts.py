@@ -0,0 +1,94 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import re
+
+from core.core import get_os_data, get_supported_peripherals, check_is_zephyr
+from core.utils import parse_int
+from core.stats import stats
+
+"""
+Validation of the interrupt map
+
+The interrupt map of soc.h, see get_interrupt_map(), is checked against the
+PLIC of the OS: a line must have a single owner, and must be between 1 and
+the number of sources of the PLIC, "riscv,ndev" in drivers.json. The
+interrupts which are not in the device tree are reported as warnings, the
+Zephyr gpio driver only takes the first interrupt of a GPIO.
+"""
+
+NDEV = re.compile(r'\s*riscv,ndev\s*=\s*<\s*(\w+)\s*>\s*;')
+
+class InterruptReport:
+    __slots__ = ('sources', 'interrupt_map', 'errors', 'warnings')
+
+    def __init__(self, sources, interrupt_map, errors, warnings):
+        self.sources = sources
+        self.interrupt_map = interrupt_map
+        self.errors = errors
+        self.warnings = warnings
+
+    def to_dict(self):
+        return {
+            "sources": self.sources,
+            "lines": self.interrupt_map.to_dict(),
+            "errors": list(self.errors),
+            "warnings": list(self.warnings)
+        }
+
+"""
+get_plic_sources: get the number of interrupt sources of the PLIC of the OS
+
+@soc_config (dict): soc configuration built for an OS
+
+return (int): riscv,ndev of the PLIC in drivers.json, None if it is not set
+"""
+def get_plic_sources(soc_config):
+    os_data = get_os_data(soc_config)
+
+    for section in ['drivers', 'controller']:
+        plic = os_data.get(section, {}).get('plic', {})
+        for data in plic.get('private_data', ()):
+            m = NDEV.match(data)
+            if m:
+                return parse_int(m.group(1))
+
+    return None
+
+"""
+check_interrupts: check the interrupt map of a soc configuration
+
+@soc_config (dict): soc configuration built for an OS
+
+return (InterruptReport): number of PLIC sources, interrupt map, errors and
+warnings
+"""
+def check_interrupts(soc_config):
+    interrupt_map = soc_config['interrupt_map']
+    sources = get_plic_sources(soc_config)
+    errors = []
+    warnings = []
+
+    for irq, owners in interrupt_map.items():
+        stats.count('interrupt_lines')
+        if len(owners) > 1:
+            errors.append("interrupt %d is shared by %s" % (irq, ', '.join(owners)))
+
+        if irq == 0:
+            errors.append("interrupt 0 of %s is not a PLIC source, 0 means no interrupt" % ', '.join(owners))
+        elif sources is not None and irq > sources:
+            errors.append("interrupt %d of %s is above the %d sources of the PLIC" %
+                          (irq, ', '.join(owners), sources))
+
+    if check_is_zephyr(soc_config):
+        for _type in get_supported_peripherals(soc_config):
+            if _type != 'GPIO':
+                continue
+
+            for name, peri in soc_config['peripherals'][_type].items():
+                if len(peri.interrupts) > 1:
+                    warnings.append("interrupts %s of %s are not in the device tree, the Zephyr gpio driver takes one interrupt" %
+                                    (' '.join(str(irq) for irq in peri.interrupts[1:]), name))
+
+    return InterruptReport(sources, interrupt_map, errors, warnings)
@@ -0,0 +1,65 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+from bisect import bisect_right
+
+"""
+IntervalIndex: sorted index of address windows
+
+The windows are sorted by start address once. A lookup is a binary search
+for the last window starting at or before the address, so placing a region
+costs O(log n) when the windows do not overlap. Nested windows are supported,
+the innermost window is returned.
+
+@intervals (iterable): (key, start, size) of each window, start and size in int
+"""
+class IntervalIndex:
+    def __init__(self, intervals):
+        items = sorted((start, start + size, key) for key, start, size in intervals)
+
+        self.starts = [start for start, _, _ in items]
+        self.ends = [end for _, end, _ in items]
+        self.keys = [key for _, _, key in items]
+        self.windows = {key: (start, end) for start, end, key in items}
+
+        # highest end address of the windows up to each index, to stop the
+        # backward search as soon as no earlier window can contain the region
+        self.max_ends = []
+        max_end = None
+        for end in self.ends:
+            max_end = end if max_end is None else max(max_end, end)
+            self.max_ends.append(max_end)
+
+    def __len__(self):
+        return len(self.keys)
+
+    """
+    find: find the window which contains a region
+
+    @start (int): start address of the region
+    @size (int): size of the region
+
+    return: key of the innermost window which contains the whole region, None
+    if the region is outside of every window
+    """
+    def find(self, start, size=0):
+        end = start + size
+        i = bisect_right(self.starts, start) - 1
+
+        while i >= 0 and self.max_ends[i] >= end:
+            if self.ends[i] >= end:
+                return self.keys[i]
+            i -= 1
+
+        return None
+
+    """
+    start: get the start address of a window
+
+    @key: key of the window
+
+    return (int): start address
+    """
+    def start(self, key):
+        return self.windows[key][0]
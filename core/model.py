@@ -0,0 +1,207 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+"""
+Typed model of the SoC parsed from soc.h
+
+The addresses and sizes are parsed into int once, when soc.h is parsed, so
+the bus placement and the node creation do arithmetic on them directly. The
+objects have __slots__, a soc.h with thousands of peripherals does not
+allocate a dict per peripheral. They are converted to the dict shape used by
+the device tree nodes and the templates with to_dict().
+"""
+
+"""
+hex_or_empty: format an optional int in hex
+
+@value (int): value, None if it is not defined in soc.h
+
+return (str): value in hex such as 0x1000, empty string if None
+"""
+def hex_or_empty(value):
+    if value is None:
+        return ''
+
+    return hex(value)
+
+def str_or_empty(value):
+    if value is None:
+        return ''
+
+    return str(value)
+
+class Cpu:
+    __slots__ = ('cores', 'isa', 'i_cache_size', 'i_cache_sets', 'i_cache_block_size',
+                 'd_cache_size', 'd_cache_sets', 'd_cache_block_size', 'frequency',
+                 'clock_frequency', 'mmu_type')
+
+    def __init__(self, cores, isa, i_cache_size=None, i_cache_sets=None, i_cache_block_size=None,
+                 d_cache_size=None, d_cache_sets=None, d_cache_block_size=None, frequency=None,
+                 clock_frequency=0, mmu_type=None):
+        self.cores = cores
+        self.isa = isa
+        self.i_cache_size = i_cache_size
+        self.i_cache_sets = i_cache_sets
+        self.i_cache_block_size = i_cache_block_size
+        self.d_cache_size = d_cache_size
+        self.d_cache_sets = d_cache_sets
+        self.d_cache_block_size = d_cache_block_size
+        self.frequency = frequency
+        self.clock_frequency = clock_frequency
+        self.mmu_type = mmu_type
+
+    def to_dict(self):
+        cpu = {
+            "label": "cpus",
+            "name": "cpu",
+            "cores": self.cores,
+            "arch": "riscv",
+            "isa": self.isa,
+            "tlb": True,
+            "i_cache_size": str_or_empty(self.i_cache_size),
+            "i_cache_sets": str_or_empty(self.i_cache_sets),
+            "i_cache_block_size": str_or_empty(self.i_cache_block_size),
+            "d_cache_size": str_or_empty(self.d_cache_size),
+            "d_cache_sets": str_or_empty(self.d_cache_sets),
+            "d_cache_block_size": str_or_empty(self.d_cache_block_size),
+            "frequency": str_or_empty(self.frequency),
+            "clock_frequency": self.clock_frequency
+        }
+
+        if self.mmu_type:
+            cpu["mmu_type"] = self.mmu_type
+
+        return cpu
+
+class MemoryRegion:
+    __slots__ = ('label', 'addr', 'size')
+
+    def __init__(self, label, addr=None, size=None):
+        self.label = label
+        self.addr = addr
+        self.size = size
+
+    @property
+    def end(self):
+        return self.addr + self.size
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "name": "memory",
+            "addr": format(self.addr, 'x') if self.addr else '',
+            "size": hex_or_empty(self.size),
+            "device_type": "memory"
+        }
+
+class Bus:
+    __slots__ = ('name', 'label', 'addr', 'size')
+
+    def __init__(self, name, label, addr=0, size=0):
+        self.name = name
+        self.label = label
+        self.addr = addr
+        self.size = size
+
+    @property
+    def end(self):
+        return self.addr + self.size
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "label": self.label,
+            "addr": hex(self.addr),
+            "size": hex(self.size),
+            "type": "bus"
+        }
+
+class Peripheral:
+    __slots__ = ('type', 'name', 'label', 'addr', 'size', 'interrupts')
+
+    def __init__(self, type, name, label, addr=0, size=0, interrupts=()):
+        self.type = type
+        self.name = name
+        self.label = label
+        self.addr = addr
+        self.size = size
+        self.interrupts = interrupts
+
+    @property
+    def end(self):
+        return self.addr + self.size
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "label": self.label,
+            "addr": hex(self.addr),
+            "size": hex(self.size),
+            "type": self.type,
+            "interrupts": ' '.join(str(irq) for irq in self.interrupts)
+        }
+
+# highest interrupt source number of a RISC-V PLIC
+PLIC_MAX_SOURCES = 1023
+
+"""
+InterruptMap: owners of each interrupt line of the PLIC
+
+The owners are stored in an array indexed by the interrupt number, so a
+lookup or an insertion is a list access. The numbers above the highest
+PLIC source, which are invalid, are kept aside in a dict.
+"""
+class InterruptMap:
+    __slots__ = ('lines', 'extra')
+
+    def __init__(self):
+        self.lines = [()] * (PLIC_MAX_SOURCES + 1)
+        self.extra = {}
+
+    def add(self, irq, owner):
+        if 0 <= irq <= PLIC_MAX_SOURCES:
+            self.lines[irq] += (owner,)
+        else:
+            self.extra[irq] = self.extra.get(irq, ()) + (owner,)
+
+    """
+    get: get the owners of an interrupt line
+
+    @irq (int): interrupt number
+
+    return (tuple): name of the peripherals which use the line
+    """
+    def get(self, irq):
+        if 0 <= irq <= PLIC_MAX_SOURCES:
+            return self.lines[irq]
+
+        return self.extra.get(irq, ())
+
+    """
+    items: get the interrupt lines which are used
+
+    return (list): (interrupt number, owners) sorted by interrupt number
+    """
+    def items(self):
+        used = [(irq, owners) for irq, owners in enumerate(self.lines) if owners]
+
+        return used + sorted(self.extra.items())
+
+    def to_dict(self):
+        return {str(irq): list(owners) for irq, owners in self.items()}
+
+"""
+model_to_dict: convert a model object for json.dumps
+
+@obj: Cpu, MemoryRegion, Bus, Peripheral or InterruptMap
+
+return (dict): dict shape of the object
+
+raise TypeError: @obj is not a model object
+"""
+def model_to_dict(obj):
+    if isinstance(obj, (Cpu, MemoryRegion, Bus, Peripheral, InterruptMap)):
+        return obj.to_dict()
+
+    raise TypeError("Object of type %s is not JSON serializable" % type(obj).__name__)
@@ -0,0 +1,166 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import sys
+import json
+import signal
+import socket
+import tempfile
+import threading
+import socketserver
+import concurrent.futures
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool
+
+from core.variables import *
+
+"""
+get_socket_path: get the default path of the generator daemon socket
+
+return (str): $XDG_RUNTIME_DIR/sapphire-soc-dt-generator.sock, or a socket
+in the temporary directory named after the user id
+"""
+def get_socket_path():
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, "{}.sock".format(CACHE_NAME))
+
+    return os.path.join(tempfile.gettempdir(), "{}-{}.sock".format(CACHE_NAME, os.getuid()))
+
+"""
+send_request: send a request to the generator daemon
+
+The request and the response are one line of json each.
+
+@socket_path (str): path to daemon socket
+@request (dict): request to send
+
+return (dict): response of the daemon
+
+raise OSError: the daemon is not running
+"""
+def send_request(socket_path, request):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(socket_path)
+        s.sendall((json.dumps(request) + '\n').encode())
+
+        with s.makefile('rb') as f:
+            line = f.readline()
+
+    if not line:
+        raise ConnectionResetError("generator daemon closed the connection")
+
+    return json.loads(line)
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"status": "failed", "time": 0.0, "log": "Error: invalid request: %s\n" % e}
+        else:
+            response = self.server.submit(request)
+
+        self.wfile.write((json.dumps(response) + '\n').encode())
+
+"""
+GeneratorServer: generator daemon listening on a unix socket
+
+Each connection is handled by a thread which runs the request on a pool of
+worker processes. The workers are forked after the warm up, so they start
+with the configuration and the templates already loaded.
+
+@socket_path (str): path to daemon socket
+@run (function): function to run a request in a worker, return a response
+@jobs (int): number of worker processes
+"""
+class GeneratorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, run, jobs):
+        self.run = run
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.pool = None
+        self.__new_pool()
+
+        super().__init__(socket_path, RequestHandler)
+
+    def __new_pool(self):
+        mp_context = None
+        if 'fork' in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context('fork')
+
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs, mp_context=mp_context)
+
+    def submit(self, request):
+        if request.get('ping'):
+            return {"status": "ok", "time": 0.0, "log": ""}
+
+        with self.lock:
+            pool = self.pool
+
+        try:
+            return pool.submit(self.run, request).result()
+        except BrokenProcessPool as e:
+            # a worker died, replace the pool for the next requests
+            with self.lock:
+                if self.pool is pool:
+                    self.__new_pool()
+            error = e
+        except Exception as e:
+            error = e
+
+        return {"status": "failed", "time": 0.0,
+                "log": "Error: %s: %s\n" % (type(error).__name__, error)}
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+"""
+serve: run the generator daemon until it is interrupted or terminated
+
+@socket_path (str): path to daemon socket
+@run (function): function to run a request in a worker, return a response
+@jobs (int): number of requests handled in parallel
+
+return (int): exit status
+"""
+def serve(socket_path, run, jobs):
+    if os.path.exists(socket_path):
+        try:
+            send_request(socket_path, {"ping": True})
+            print("Error: generator daemon is already running on %s" % socket_path)
+            return 1
+        except OSError:
+            # stale socket of a daemon which did not exit cleanly
+            os.unlink(socket_path)
+
+    server = GeneratorServer(socket_path, run, jobs)
+
+    def terminate(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, terminate)
+    print("Info: generator daemon listening on %s" % socket_path)
+    sys.stdout.flush()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+    print("Info: generator daemon stopped")
+
+    return 0
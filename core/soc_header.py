@@ -0,0 +1,255 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import re
+from collections import namedtuple
+
+from core.stats import stats
+from core.utils import parse_int, warn
+from core.expression import *
+
+"""
+Define: a '#define' entry of soc.h
+
+@name (str): macro name such as SYSTEM_UART_0_IO_CTRL
+@value (str): replacement text of the define without comments, such as
+              0xf8010000 or (SYSTEM_BMB_PERIPHERAL_BMB + 0x10000)
+@line (str): name and value joined by a single space. Keyword lookups match
+             against this string. The value of an expression is left out,
+             so the lookups do not match the macros it refers to.
+"""
+Define = namedtuple('Define', ['name', 'value', 'line'])
+
+IDENTIFIER = re.compile(r'[A-Za-z_]\w*$')
+NUMBER = re.compile(r'(0[xX][0-9a-fA-F]+|[0-9]+)$')
+COMMENT = re.compile(r'/\*.*?\*/|//.*')
+
+# most tokens of a peripheral type, such as APB_SLAVE
+PERIPHERAL_TOKENS = 2
+
+"""
+SocHeader: symbol table of soc.h
+
+soc.h is scanned once when the object is created. Every '#define NAME VALUE'
+line becomes a Define entry, kept in file order. The accessors in core.py
+look up keywords such as 'UART', 'SPI_0' or 'CTRL ' through find() instead
+of scanning all the lines of soc.h for every query.
+
+The line of each entry is split on '_' and ' ' into tokens and every token
+keeps a posting list of the entries it appears in. Each distinct token is
+also stored in a prefix and a suffix table. A keyword is split the same
+way, so a matching entry must contain:
+
+- every inner piece of the keyword as a whole token, or
+- a token ending with the first piece followed by a token starting with
+  the second piece, for a keyword with one separator, or
+- a token containing the keyword, for a keyword without separator.
+
+Only the candidates from the index are compared with the keyword, so
+find() returns the same entries as a substring scan over soc.h. Results
+are memoized per keyword.
+
+The entries of a numbered peripheral such as UART_1 are also indexed by
+the peripheral name, see find_peripheral(), so a soc.h with thousands of
+peripherals costs one dict lookup per peripheral instead of a scan of the
+entries with a token starting with 1.
+
+@lines (list): raw data of soc.h
+@warnings (list): warnings of the generation, printed to stderr if None
+"""
+class SocHeader:
+    def __init__(self, lines, warnings=None):
+        self.lines = lines
+        self.warnings = warnings
+        self.entries = []
+        self.defines = {}
+        self._postings = {}
+        self._prefixes = {}
+        self._suffixes = {}
+        self._found = {}
+        self._peripherals = {}
+        self._values = {}
+
+        stats.count('soc_lines_read', len(lines))
+        for line in lines:
+            if '#define' not in line:
+                continue
+
+            tokens = COMMENT.sub(' ', line).split()
+            if len(tokens) < 3 or tokens[0] != '#define':
+                continue
+
+            if len(tokens) == 3:
+                entry = Define(tokens[1], tokens[2], ' '.join(tokens[1:]))
+            else:
+                entry = Define(tokens[1], ' '.join(tokens[2:]), tokens[1] + ' ')
+
+            self.__add_entry(entry)
+
+    def __add_entry(self, entry):
+        i = len(self.entries)
+        self.entries.append(entry)
+        self.defines[entry.name] = entry.value
+
+        for token in re.split(r'[_ ]', entry.line):
+            if not token:
+                continue
+
+            if token not in self._postings:
+                self._postings[token] = []
+                for n in range(1, len(token) + 1):
+                    self._prefixes.setdefault(token[:n], []).append(token)
+                    self._suffixes.setdefault(token[-n:], []).append(token)
+
+            posting = self._postings[token]
+            if not posting or posting[-1] != i:
+                posting.append(i)
+
+        # the names which end with a number token, such as UART_1 and
+        # APB_SLAVE_1 in IO_APB_SLAVE_1_INPUT
+        tokens = entry.name.split('_')
+        names = set()
+        for j, token in enumerate(tokens):
+            if token.isdigit():
+                for k in range(max(0, j - PERIPHERAL_TOKENS), j):
+                    names.add('_'.join(tokens[k:j + 1]))
+
+        for name in names:
+            self._peripherals.setdefault(name, []).append(entry)
+
+    def __postings(self, tokens):
+        candidates = set()
+        for token in tokens:
+            candidates.update(self._postings[token])
+
+        return candidates
+
+    def __candidates(self, keyword):
+        pieces = re.split(r'[_ ]', keyword)
+
+        if len(pieces) > 2 and all(pieces[1:-1]):
+            postings = [self._postings.get(p, []) for p in pieces[1:-1]]
+            return set(min(postings, key=len))
+
+        if len(pieces) == 2:
+            sides = []
+            if pieces[0]:
+                sides.append(self._suffixes.get(pieces[0], []))
+            if pieces[1]:
+                sides.append(self._prefixes.get(pieces[1], []))
+
+            if sides:
+                tokens = min(sides, key=lambda t: sum(len(self._postings[x]) for x in t))
+                return self.__postings(tokens)
+
+        if len(pieces) == 1 and keyword:
+            tokens = [t for t in self._postings if keyword in t]
+            return self.__postings(tokens)
+
+        return range(len(self.entries))
+
+    """
+    find: get the entries which contain the keyword
+
+    @keyword (str): keyword such as UART, SYSTEM_CORES_0 or 'CTRL '
+
+    return (list): Define entries in soc.h order
+    """
+    def find(self, keyword):
+        stats.count('soc_lookups')
+        if keyword not in self._found:
+            candidates = self.__candidates(keyword)
+            stats.count('soc_lines_scanned', len(candidates))
+            self._found[keyword] = [self.entries[i] for i in sorted(candidates)
+                                    if keyword in self.entries[i].line]
+
+        return self._found[keyword]
+
+    """
+    find_peripheral: get the entries of a numbered peripheral
+
+    The peripheral name must be whole tokens of the macro name, so UART_1
+    matches SYSTEM_UART_1_IO_CTRL and SYSTEM_PLIC_SYSTEM_UART_1_IO_INTERRUPT,
+    not SYSTEM_UART_11_IO_CTRL.
+
+    @name (str): peripheral type and number such as UART_1 or APB_SLAVE_0
+
+    return (list): Define entries in soc.h order
+    """
+    def find_peripheral(self, name):
+        stats.count('soc_lookups')
+        entries = self._peripherals.get(name, [])
+        stats.count('soc_lines_scanned', len(entries))
+
+        return entries
+
+    """
+    evaluate: get the integer value of a macro or of an expression
+
+    The value of a macro is evaluated as a C integer constant expression,
+    following the macros it refers to. The values are cached, each macro is
+    evaluated once. A number with a leading zero such as 010 is decimal, as
+    parse_int() reads it, see core.expression.
+
+    @value (str): macro name, number or expression. An int is returned as is.
+
+    return (int): value, None if @value is empty or can not be evaluated
+    """
+    def evaluate(self, value):
+        if isinstance(value, int) or value is None:
+            return value
+
+        if value in self._values:
+            return self._values[value]
+
+        if NUMBER.match(value):
+            result = parse_int(value)
+
+        elif not value.strip():
+            result = None
+
+        else:
+            try:
+                result = self.__evaluate(value, [])
+            except ExpressionError as e:
+                warn(self.warnings, "can not evaluate %s in soc.h: %s" % (value, e))
+                result = None
+
+        self._values[value] = result
+
+        return result
+
+    def __evaluate(self, value, stack):
+        if value in self._values and self._values[value] is not None:
+            return self._values[value]
+
+        lookup = lambda name: self.__evaluate(name, stack)
+
+        if IDENTIFIER.match(value):
+            if value in stack:
+                raise ExpressionError("recursive #define %s" % ' -> '.join(stack + [value]))
+
+            if value not in self.defines:
+                raise ExpressionError("%s is not defined" % value)
+
+            stack.append(value)
+            result = evaluate_expression(self.defines[value], lookup)
+            stack.pop()
+        else:
+            result = evaluate_expression(value, lookup)
+
+        self._values[value] = result
+
+        return result
+
+    """
+    get: get the value of a define by its exact name
+
+    @name (str): macro name
+    @default: value to return if @name is not defined
+
+    return (str): value of the last define of @name
+    """
+    def get(self, name, default=''):
+        return self.defines.get(name, default)
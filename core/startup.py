@@ -0,0 +1,98 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import sys
+import time
+import atexit
+
+"""
+ImportTimer: measure the time to import each module
+
+The timer is installed first in sys.meta_path. It finds the spec of a module
+with the other finders and wraps its loader, so the execution of every module
+imported after start_import_profile() is timed. The self time of a module
+excludes the time of the modules it imports.
+"""
+class ImportTimer:
+    def __init__(self):
+        self.records = []
+        self.stack = []
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = TimedLoader(self, spec.loader)
+                return spec
+
+        return None
+
+    def exec_module(self, loader, module):
+        record = {"module": module.__name__, "self": 0.0, "cumulative": 0.0,
+                  "depth": len(self.stack)}
+        self.records.append(record)
+        self.stack.append(0.0)
+
+        start = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self.stack.pop()
+            record['cumulative'] = elapsed
+            record['self'] = elapsed - children
+            if self.stack:
+                self.stack[-1] += elapsed
+
+    """
+    report: print the import time of each module to stderr
+
+    The modules are listed in import order, nested modules are indented.
+    """
+    def report(self):
+        total = sum(r['cumulative'] for r in self.records if r['depth'] == 0)
+
+        print("Info: startup profile, import time in ms", file=sys.stderr)
+        print("{:>10} {:>10}  {}".format("self", "cumulative", "module"), file=sys.stderr)
+        for r in self.records:
+            print("{:10.2f} {:10.2f}  {}{}".format(r['self'] * 1000, r['cumulative'] * 1000,
+                  '  ' * r['depth'], r['module']), file=sys.stderr)
+
+        print("Info: %d modules imported in %.2f ms" % (len(self.records), total * 1000),
+              file=sys.stderr)
+
+class TimedLoader:
+    def __init__(self, timer, loader):
+        self.timer = timer
+        self.loader = loader
+
+    def create_module(self, spec):
+        if hasattr(self.loader, 'create_module'):
+            return self.loader.create_module(spec)
+
+        return None
+
+    def exec_module(self, module):
+        self.timer.exec_module(self.loader, module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+"""
+start_import_profile: time the imports until the process exits
+
+The report is printed to stderr when the process exits.
+
+return (ImportTimer): the installed timer
+"""
+def start_import_profile():
+    timer = ImportTimer()
+    sys.meta_path.insert(0, timer)
+    atexit.register(timer.report)
+
+    return timer
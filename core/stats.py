@@ -0,0 +1,91 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import sys
+import time
+import json
+import contextlib
+
+"""
+Stats: time of the generation stages and counters of the hot paths
+
+The stages are recorded in the order they start. A stage started inside
+another stage is nested in it, its time is included in the time of the
+outer stage. The counters count events such as the soc.h lines scanned,
+the configuration files loaded and the integer conversions.
+
+The process wide instance is reset at the start of each generation.
+"""
+class Stats:
+    def __init__(self):
+        self.stages = []
+        self.counters = {}
+        self._depth = 0
+
+    def reset(self):
+        self.stages = []
+        self.counters = {}
+        self._depth = 0
+
+    """
+    stage: time a stage of the generation
+
+    with stats.stage("parse"):
+        soc_config = parse_soc_config(filename)
+
+    @name (str): name of the stage
+    """
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = {"stage": name, "depth": self._depth, "time": 0.0}
+        self.stages.append(record)
+        self._depth += 1
+
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['time'] = time.perf_counter() - start
+            self._depth -= 1
+
+    """
+    count: increase a counter
+
+    @name (str): name of the counter
+    @n (int): value to add
+    """
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self):
+        return {
+            "stages": [dict(r) for r in self.stages],
+            "total": sum(r['time'] for r in self.stages if r['depth'] == 0),
+            "counters": dict(sorted(self.counters.items()))
+        }
+
+    """
+    report: print the stages and the counters
+
+    @fmt (str): 'table' for a human readable table, 'json' for json
+    @file: output stream, stderr by default
+    """
+    def report(self, fmt='table', file=None):
+        file = file or sys.stderr
+        data = self.to_dict()
+
+        if fmt == 'json':
+            print(json.dumps(data, indent=4), file=file)
+            return
+
+        print("Info: generation stages, time in ms", file=file)
+        for r in data['stages']:
+            print("{:10.2f}  {}{}".format(r['time'] * 1000, '  ' * r['depth'], r['stage']), file=file)
+        print("{:10.2f}  total".format(data['total'] * 1000), file=file)
+
+        print("Info: counters", file=file)
+        for name, value in data['counters'].items():
+            print("{:10d}  {}".format(value, name), file=file)
+
+stats = Stats()
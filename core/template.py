@@ -0,0 +1,52 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+from core.cache import get_cache_dir
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../templates")
+
+"""
+get_bytecode_cache: get the cache of the compiled templates
+
+Jinja2 stores the compiled python code of each template in the cache
+directory together with the checksum of the template source. A template is
+compiled again when its .jinja2 file changes.
+
+@directory (str): cache directory. By default is the templates directory in
+                  the output cache directory.
+
+return (FileSystemBytecodeCache): bytecode cache, None if the directory is not
+writable
+"""
+def get_bytecode_cache(directory=None):
+    if not directory:
+        directory = os.path.join(get_cache_dir(), "templates")
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return None
+
+    if not os.access(directory, os.W_OK | os.X_OK):
+        return None
+
+    return FileSystemBytecodeCache(directory, "%s.jinja2.cache")
+
+"""
+get_template_env: create the jinja2 environment of the device tree templates
+
+@bytecode_cache (bool): load the compiled templates from the bytecode cache
+@directory (str): bytecode cache directory, see get_bytecode_cache()
+
+return (Environment): jinja2 environment
+"""
+def get_template_env(bytecode_cache=True, directory=None):
+    bcc = None
+    if bytecode_cache:
+        bcc = get_bytecode_cache(directory)
+
+    return Environment(loader=FileSystemLoader(TEMPLATE_DIR), bytecode_cache=bcc)
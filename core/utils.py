@@ -3,9 +3,12 @@
 # Copyright (C) 2023 Efinix, Inc.
 
 import os
+import sys
 import json
 
 from core.variables import *
+from core.config import *
+from core.stats import stats
 
 def read_file(filename):
     with open(filename, 'r') as f:
@@ -15,17 +18,86 @@ def read_file(filename):
 
 
 def save_file(filename, data):
-    with open(filename, 'w') as f:
+    with open(filename, 'wb' if isinstance(data, bytes) else 'w') as f:
         f.write(data)
 
+"""
+write_if_changed: write the data into a file unless it already has the same content
 
-def load_config_file():
-    with open(DRIVER_FILE, 'r') as f:
-        cfg = json.load(f)
+The file is written into a temporary file then renamed, so a reader never
+sees a partially written file.
 
-    return cfg
+@filename (str): path to file
+@data (str or bytes): content of the file, bytes for a binary file
+
+return (bool): True if the file was written
+"""
+def write_if_changed(filename, data):
+    import tempfile
+
+    binary = 'b' if isinstance(data, bytes) else ''
+
+    if os.path.isfile(filename):
+        with open(filename, 'r' + binary) as f:
+            if f.read() == data:
+                return False
+
+    d = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(d, exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=d, prefix='.tmp-', suffix=os.path.basename(filename))
+    try:
+        with os.fdopen(fd, 'w' + binary) as f:
+            f.write(data)
+        os.replace(tmp, filename)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    return True
+
+"""
+prune_stale_files: remove the files of a directory which are not in the list
+
+Empty sub directories are removed too, @directory itself is kept.
+
+@directory (str): output directory
+@keep (list): path of the files to keep
+
+return (list): path of the removed files
+"""
+def prune_stale_files(directory, keep):
+    removed = []
+    keep = set(os.path.abspath(f) for f in keep)
+
+    if not os.path.isdir(directory):
+        return removed
+
+    for root, dirs, files in os.walk(directory, topdown=False):
+        for name in files:
+            f = os.path.abspath(os.path.join(root, name))
+            if f not in keep:
+                os.remove(f)
+                removed.append(f)
+
+        for name in dirs:
+            d = os.path.join(root, name)
+            if not os.path.islink(d) and not os.listdir(d):
+                os.rmdir(d)
+
+    return removed
+
+
+"""
+load_config_file: get the content of drivers.json
+
+return: read-only view of drivers.json. Use thaw() to get a copy to modify.
+"""
+def load_config_file():
+    return load_config(DRIVER_FILE)
 
 def load_json_file(filename):
+    stats.count('config_loads')
     with open(filename, 'r') as f:
         cfg = json.load(f)
 
@@ -44,52 +116,38 @@ def indent(lines, level=1):
 
     return out
 
-def __dereference_symbol(cfg):
-    l = []
-    s = []
-    v = []
-
-    for line in cfg:
-        l = line.split()
-        if len(l) > 2:
-            s.append(l[1])
-            v.append(l[2])
-
-    return s, v
-
-def dereference_symbol(cfg, symbol):
-    s, v = __dereference_symbol(cfg)
-    i = 0
-    value = 0
-
-    for line in s:
-        if symbol in line:
-            value = v[i]
-        i = i + 1
-
-    return value
-
-def find_key(nested_dict, target_key):
-    if target_key in nested_dict:
-        return nested_dict[target_key]
-
-    for key, value in nested_dict.items():
-        if isinstance(value, dict):
-            result = find_key(value, target_key)
-            if result is not None:
-                return result
-
-    return None
-
-def update_dict(nested_dict, target_key, new_value):
-    if target_key in nested_dict:
-        nested_dict[target_key].update(new_value)
-        return True
-
-    for key, value in nested_dict.items():
-        if isinstance(value, dict):
-            if update_dict(value, target_key, new_value):
-                return True
-
-    return False
+"""
+parse_int: parse an integer value of soc.h
+
+@value (str): value in decimal or in hex with 0x prefix
+
+return (int): parsed value, None if @value is empty or is not a number
+"""
+def parse_int(value):
+    if isinstance(value, int):
+        return value
+
+    stats.count('int_conversions')
+    try:
+        return int(value, 0)
+    except ValueError:
+        pass
+
+    # decimal with leading zero such as 08
+    try:
+        return int(value, 10)
+    except ValueError:
+        return None
+
+"""
+warn: report a warning of the device tree generation
+
+@warnings (list): list to append the warning to, None to print it to stderr
+@message (str): warning message
+"""
+def warn(warnings, message):
+    if warnings is None:
+        print("Warning: %s" % message, file=sys.stderr)
+    else:
+        warnings.append(message)
 
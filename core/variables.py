@@ -4,7 +4,14 @@
 
 import os
 
-DRIVER_FILE = os.path.join(os.path.relpath(os.path.dirname(__file__)), "../config/drivers.json")
+GENERATOR_VERSION = "v2.4"
+CACHE_NAME = "sapphire-soc-dt-generator"
+# size limit of the cache of the parsed soc.h, in bytes
+PARSE_CACHE_SIZE = 64 * 1024 * 1024
+# size limit of the cache of the generated outputs, in bytes
+OUTPUT_CACHE_SIZE = 256 * 1024 * 1024
+
+DRIVER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../config/drivers.json")
 
 # search keyword in soc.h
 INTERRUPT = "IO_INTERRUPT"
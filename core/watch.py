@@ -0,0 +1,215 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+
+"""
+File watchers for the watch mode
+
+The inotify watcher watches the directories of the files, so the files
+which editors save by writing a new file and renaming it over the old one
+are seen too. The polling watcher compares the modification time and the
+size of the files, it is used where inotify is not available, such as on
+other platforms or on some network file systems.
+
+wait() returns the files changed by a burst of events: it waits for a first
+change, then until no more change is seen for @debounce seconds.
+"""
+
+# seconds without event which end a burst of events
+WATCH_DEBOUNCE = 0.2
+
+# interval of the polling watcher in seconds
+POLL_INTERVAL = 0.5
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+INOTIFY_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                IN_CREATE | IN_DELETE)
+INOTIFY_EVENT = struct.Struct('iIII')
+
+class PollingWatcher:
+    def __init__(self, files, debounce=WATCH_DEBOUNCE, interval=POLL_INTERVAL):
+        self.files = [os.path.abspath(f) for f in files]
+        self.debounce = debounce
+        self.interval = interval
+        self.stamps = {f: self.stamp(f) for f in self.files}
+
+    def stamp(self, filename):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+
+        return (st.st_mtime_ns, st.st_size)
+
+    def poll(self):
+        changed = set()
+        for f in self.files:
+            stamp = self.stamp(f)
+            if stamp != self.stamps[f]:
+                self.stamps[f] = stamp
+                changed.add(f)
+
+        return changed
+
+    """
+    wait: wait for a burst of changes
+
+    The burst ends when a poll after the debounce delay finds no change of
+    the watched files. The other files of the directories are not polled.
+
+    @timeout (float): seconds to wait for a first change, None to wait forever
+
+    return (set): absolute path of the changed files, empty on timeout
+    """
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = self.poll()
+
+        while not changed:
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed
+            time.sleep(self.interval)
+            changed = self.poll()
+
+        while True:
+            time.sleep(max(self.debounce, self.interval))
+            more = self.poll()
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    def __init__(self, files, debounce=WATCH_DEBOUNCE):
+        import ctypes
+        import ctypes.util
+
+        self.files = set(os.path.abspath(f) for f in files)
+        self.debounce = debounce
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, "inotify_init1: %s" % os.strerror(e))
+
+        self.dirs = {}
+        try:
+            for d in sorted(set(os.path.dirname(f) for f in self.files)):
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(d), INOTIFY_MASK)
+                if wd < 0:
+                    e = ctypes.get_errno()
+                    raise OSError(e, "inotify_add_watch %s: %s" % (d, os.strerror(e)))
+                self.dirs[wd] = d
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    """
+    read: read the pending events
+
+    @timeout (float): seconds to wait for an event, None to wait forever
+
+    return (set): absolute path of the changed watched files, empty if the
+    events are about other files of the directories, None if no event came
+    """
+    def read(self, timeout):
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return None
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return None
+            raise
+
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, pos)
+            pos += INOTIFY_EVENT.size
+            name = data[pos:pos + length].rstrip(b'\0')
+            pos += length
+
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, consider every file as changed
+                return set(self.files)
+
+            if wd in self.dirs and name:
+                f = os.path.join(self.dirs[wd], os.fsdecode(name))
+                if f in self.files:
+                    changed.add(f)
+
+        return changed
+
+    """
+    wait: wait for a burst of changes
+
+    The burst ends after a quiet period without any event, also on the other
+    files of the watched directories, such as the temporary file of an editor
+    save.
+
+    @timeout (float): seconds to wait for a first change, None to wait forever
+
+    return (set): absolute path of the changed files, empty on timeout
+    """
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+
+        while not changed:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return changed
+            changed = self.read(remaining) or set()
+
+        while True:
+            more = self.read(self.debounce)
+            if more is None:
+                return changed
+            changed |= more
+
+    def close(self):
+        os.close(self.fd)
+
+"""
+get_watcher: get a watcher of a list of files
+
+inotify is used on Linux, polling otherwise or if inotify can not be used.
+
+@files (list): path of the files to watch
+@poll (bool): use polling even if inotify is available
+
+return: InotifyWatcher or PollingWatcher
+"""
+def get_watcher(files, poll=False):
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(files)
+        except (OSError, AttributeError) as e:
+            print("Warning: inotify is not available (%s), polling the files instead" % e)
+
+    return PollingWatcher(files)
@@ -3,314 +3,1118 @@
 #
 # Copyright (C) 2023 Efinix, Inc.
 
+import sys
+
+# install the import timer before any other import
+if '--startup-profile' in sys.argv:
+    from core.startup import start_import_profile
+    start_import_profile()
+
 import argparse
 import os
-import sys
-import shutil
-import pprint
+import io
+import time
+import contextlib
+import glob
 from core.core import *
 from core.utils import *
 from core.dt import *
-from jinja2 import Environment, FileSystemLoader
+from core.cache import *
+from core.interval import *
+from core.model import *
+from core.stats import stats
+from core.generator import (GenerationError, get_templates, get_metadata, get_output_names,
+                            set_template_cache, build, render, create_bus_nodes, create_root_nodes)
 
 pwd = os.path.dirname(os.path.realpath(__file__))
-env = Environment(loader=FileSystemLoader(os.path.join(pwd, "templates")))
-dtsi_template = env.get_template("soc.jinja2")
-dts_template = env.get_template("dts.jinja2")
+
+# number of template chunks joined before a write when streaming
+STREAM_BUFFER_SIZE = 64
 
 """
-update_peripheral_nodes: update the reg and offset of peripheral
+parse_targets: parse the value of --targets
+
+@value (str): comma separated list of targets such as
+              linux,uboot,zephyr:socname:zephyrboard[:extmemory]
 
-The offset of a peripheral is calculate by minus the peripheral address
-from the bus address. It is unknown during dt_create_peripheral_node().
-This is because of the bus address is not define for the said peripheral.
-We only know the bus address during connect_peripheral_to_bus(). Thus,
-the offset, reg and header property get updated at very late stage.
+return (list): list of dict with the os, socname, zephyrboard and extmemory
+of each target
+"""
+def parse_targets(value):
+    targets = []
+
+    for spec in value.split(','):
+        fields = spec.strip().split(':')
+        target = {'os': fields[0], 'socname': None, 'zephyrboard': None, 'extmemory': False}
+
+        if fields[0] in ('linux', 'uboot') and len(fields) == 1:
+            pass
+        elif fields[0] == 'zephyr' and len(fields) in (3, 4) and all(fields[1:3]):
+            target['socname'], target['zephyrboard'] = fields[1:3]
+            if len(fields) == 4:
+                if fields[3] != 'extmemory':
+                    raise argparse.ArgumentTypeError("unknown zephyr option '%s', expected extmemory" % fields[3])
+                target['extmemory'] = True
+        else:
+            raise argparse.ArgumentTypeError("invalid target '%s', expected linux, uboot or zephyr:socname:zephyrboard" % spec)
 
-@peripheral_node (dict): peripheral node of a device
-@reg_addr (int): start address of the peripheral
-@peri_size (int): size of the peripheral
-@offset (int): offset of the peripheral
+        if any(t['os'] == target['os'] for t in targets):
+            raise argparse.ArgumentTypeError("target %s is given twice" % target['os'])
+
+        targets.append(target)
+
+    return targets
 
-return (dict): updated peripheral node with offset, reg and header property
 """
-def update_peripheral_nodes(peripheral_node, reg_addr, peri_size, offset):
-    if 'reg' in peripheral_node and peripheral_node['reg']:
-        reg = peripheral_node['reg']
-    else:
-        reg = "<{0} {1}>".format(reg_addr, peri_size)
+get_targets: get the arguments of each target of a generation
+
+@args (Namespace): arguments from get_parser()
 
-    peripheral_node.update({
-        "offset": offset,
-        "reg": reg
-    })
-    header = get_node_header(peripheral_node)
-    peripheral_node.update({"header": header})
+return (list): arguments of each target with --targets, with the os and
+the output directory of the target, else [args]
+"""
+def get_targets(args):
+    if not getattr(args, 'targets', None):
+        return [args]
+
+    targets = []
+    for target in args.targets:
+        t = argparse.Namespace(**vars(args))
+        t.targets = None
+        t.dir = os.path.join(args.dir or os.path.join(pwd, 'dts'), target['os'])
+        for k, v in target.items():
+            setattr(t, k, v)
+        targets.append(t)
+
+    return targets
+
+def get_parser():
+    dt_parse = argparse.ArgumentParser(description='Device Tree Generator',
+            epilog='Run "%(prog)s batch -h" to generate several device trees from a manifest. '
+                   'Run "%(prog)s serve -h" to start a generator daemon and '
+                   '"%(prog)s client ARGS" to send it a request.')
+
+    dt_parse.add_argument('soc', type=str, help='path to soc.h')
+    dt_parse.add_argument('board', type=str, help='development kit name such as t120, ti60')
+    dt_parse.add_argument('-c', '--user-config', action='append', type=str,
+            help='Specify path to user configuration json file to override the APB slave device property')
+    dt_parse.add_argument('-d', '--dir', type=str, help='Output generated output directory. By default is dts')
+    dt_parse.add_argument('-o', '--outfile', type=str, help='Override output filename. By default is sapphire.dtsi')
+    dt_parse.add_argument('-j', '--json', action='store_true', help='Save output file as json format')
+    dt_parse.add_argument('-s', '--slave', action='append', type=str, help='Specify path to slave device configuration json file. This file is a slave node for the master device which appear in DTS file.')
+    dt_parse.add_argument('--cache-dir', type=str, help='Directory of the output, parse and template caches, could be shared between builds. By default is %s' % get_cache_dir())
+    dt_parse.add_argument('--no-cache', action='store_true', help='Always parse soc.h and generate the outputs, do not use the output, parse and template caches')
+    dt_parse.add_argument('-u', '--incremental', action='store_true', help='Only write the output files which content changed and remove stale files, instead of recreating the output directory')
+    dt_parse.add_argument('--startup-profile', action='store_true', help='Print the import time of each module on exit')
+    dt_parse.add_argument('--stream', action='store_true', help='Write the dtsi and dts while they are rendered, without keeping them in memory. The outputs are not stored in the output cache.')
+    dt_parse.add_argument('--stdout', choices=['dtsi', 'dts'], help='Stream this output to stdout instead of a file, for example to pipe the dts into dtc. The messages are printed to stderr.')
+    dt_parse.add_argument('--stats', nargs='?', const='table', choices=['table', 'json'], help='Print the time of each generation stage and the counters to stderr, as a table by default or as json')
+    dt_parse.add_argument('--profile', type=str, metavar='FILE', help='Save the cProfile data of the generation in FILE, to read with pstats or snakeviz')
+    dt_parse.add_argument('--dtb', action='store_true', help='Also compile the dts into a flattened device tree blob, next to the dts, without cpp and dtc')
+    dt_parse.add_argument('--check-dtb', type=str, metavar='FILE', help='Compile the dtb like --dtb and compare it with FILE, a dtb compiled by dtc from the same outputs. Fail if they differ.')
+    dt_parse.add_argument('--check-dts', action='store_true', help='Check the syntax of the generated dtsi and dts and that every &label reference is defined, without dtc. Fail if they are invalid.')
+    dt_parse.add_argument('--validate', action='store_true', help='Check the address map: overlapping regions, peripherals outside of every bus, reserved memory and images outside of the memory, and the interrupt map: shared interrupt lines, interrupts above the PLIC sources. Fail if it is invalid.')
+    dt_parse.add_argument('--report', type=str, metavar='FILE', help='Save the address map with its gaps, the interrupt map and their errors in FILE in json format')
+    dt_parse.add_argument('--targets', type=parse_targets, metavar='TARGETS', help='Generate for several OS in one run, soc.h is parsed once. Comma separated list of linux, uboot and zephyr:socname:zephyrboard[:extmemory]. The outputs of each OS are stored in a subdirectory of the output directory, such as dts/linux.')
+    dt_parse.add_argument('-MD', dest='md', action='store_true', help='Write a Make and Ninja dependency file of the outputs on every file read by the generation: soc.h, drivers.json, peripherals.json, the templates, the user config and slave files. By default is the dtsi path with .d appended')
+    dt_parse.add_argument('-MF', dest='depfile', type=str, metavar='FILE', help='Write the dependency file to FILE, implies -MD')
+    dt_parse.add_argument('--watch', action='store_true', help='Generate again each time soc.h, a configuration, a template or a user config or slave file changes, until Ctrl-C')
+    dt_parse.add_argument('--poll', action='store_true', help='With --watch, poll the files instead of using inotify, for example on network file systems')
+    subparsers = dt_parse.add_subparsers(title='os', dest='os')
+    os_linux_parser = subparsers.add_parser('linux', help='Target OS, Linux')
+    os_uboot_parser = subparsers.add_parser('uboot', help='Target OS, U-Boot')
+    os_zephyr_parser = subparsers.add_parser('zephyr', help='Target OS, Zephyr')
+    os_zephyr_parser.add_argument('socname', type=str, help='Custom soc name for Zephyr SoC dtsi')
+    os_zephyr_parser.add_argument('zephyrboard', type=str, help='Zephyr board name')
+    os_zephyr_parser.add_argument('-em', '--extmemory', action="store_true", help='Use external memory. If no external memory enabled on the SoC, internal memory will be used instead.')
 
-    return peripheral_node
+    return dt_parse
 
 """
-connect_peripheral_to_bus: connect the peripherals to its own bus
+get_input_files: get the list of files read to generate the device tree
 
-This function create a data structure to connect the peripherals
-to its own bus based on the bus address range and peripherals addresses.
-This will create a complete bus architecture and the set of peripherals.
+@args (Namespace): arguments from get_parser()
 
-@soc_config (dict): soc configuration after parse it
-@buses_node (dict): bus node
-@bus (str): bus name
-@bus_addr (int): start address of the @bus
-@bus_range (int): range address of the @bus
+return (list): list of (role, path) of every input file
+"""
+def get_input_files(args):
+    files = [
+        ('soc', args.soc),
+        ('drivers', DRIVER_FILE)
+    ]
+
+    for target in get_targets(args):
+        files.append(('peripherals', get_peripherals_file(target.os)))
+
+    for t in sorted(glob.glob(os.path.join(pwd, 'templates', '*.jinja2'))):
+        files.append(('template:{}'.format(os.path.basename(t)), t))
+
+    for uc in args.user_config or []:
+        files.append(('user_config', uc))
+
+    for slave in args.slave or []:
+        files.append(('slave', slave))
+
+    return files
 
-return (dict): bus node with the peripherals attach to it
 """
-def connect_peripheral_to_bus(soc_config, buses_node, bus, bus_addr, bus_range):
-    available_peripherals = get_supported_peripherals(soc_config)
-    peri_config = soc_config['peripherals']
-    peripheral_node = {}
+get_output_files: get the files written by a generation
 
-    for peripheral in available_peripherals:
-        for pp in peri_config[peripheral]:
-            peri_addr = peri_config[peripheral][pp]['addr']
-            peri_size = peri_config[peripheral][pp]['size']
-            peri_range = hex(int(peri_addr, 16) + int(peri_size, 16))
+@args (Namespace): arguments from get_parser() of one os
 
-            if check_is_zephyr(soc_config):
-                peripheral_node = dt_create_peripheral_node(soc_config, pp)
-                peripheral_node = update_peripheral_nodes(peripheral_node, peri_addr, peri_size, peri_addr)
-                buses_node[bus]['peripherals'].update({pp: peripheral_node})
+return (dict): path of the dtsi and dts, the json with --json and the dtb
+with --dtb or --check-dtb
+"""
+def get_output_files(args):
+    path_dts = args.dir or os.path.join(pwd, 'dts')
+    dtsi_name, dts_name = get_output_names(args.os, getattr(args, 'socname', None),
+                                           getattr(args, 'zephyrboard', None))
+    outputs = {
+        'dtsi': os.path.join(path_dts, dtsi_name),
+        'dts': os.path.join(path_dts, dts_name)
+    }
 
-            else:
-                if (peri_range <= bus_range) and (bus_addr <= peri_addr):
-                    offset = hex(int(peri_addr, 16) - int(bus_addr, 16))
-                    peripheral_node = dt_create_peripheral_node(soc_config, pp)
-                    peripheral_node = update_peripheral_nodes(peripheral_node, offset, peri_size, offset)
-                    buses_node[bus]['peripherals'].update({pp: peripheral_node})
+    if args.outfile and args.os != "zephyr":
+        outputs['dtsi'] = args.outfile
 
-    return buses_node
+    if args.json:
+        outputs['json'] = 'sapphire.json'
 
-def __create_bus_nodes(soc_config, buses_node, bus, bus_addr, bus_range):
-    bus_node = dt_create_bus_node(soc_config, bus)
-    buses_node.update({bus: bus_node})
-    buses_node = connect_peripheral_to_bus(soc_config, buses_node, bus, bus_addr, bus_range)
+    if args.dtb or args.check_dtb:
+        outputs['dtb'] = os.path.splitext(outputs['dts'])[0] + '.dtb'
 
-    return buses_node
+    return outputs
 
-def create_bus_nodes(soc_config):
-    buses_node = {}
-    bus_cfg = soc_config['buses']
+"""
+escape_depfile_path: escape a path for a Make dependency rule
 
-    if check_is_zephyr(soc_config):
-        bus = 'BMB'
-        buses_node = __create_bus_nodes(soc_config, buses_node, bus, '', '')
+@path (str): file path
 
-    else:
-        for bus in bus_cfg:
-            bus_addr = bus_cfg[bus]['addr']
-            bus_size = bus_cfg[bus]['size']
-            bus_range = hex(int(bus_addr, 16) + int(bus_size, 16))
-            buses_node = __create_bus_nodes(soc_config, buses_node, bus, bus_addr, bus_range)
+return (str): path with the spaces, # and $ escaped, Ninja reads the same
+escapes
+"""
+def escape_depfile_path(path):
+    return path.replace('$', '$$').replace('#', '\\#').replace(' ', '\\ ')
 
-    buses_node = {"buses": buses_node}
+"""
+write_depfile: write the dependency file of a generation, see -MD and -MF
 
-    return buses_node
+The outputs of every target depend on every input file, so Make and Ninja
+run the generator again only when one of them changed. An output written to
+stdout is not a target.
 
-def append_chosen_node(soc_config, root_node, user_cfg):
-    for key in user_cfg['append']:
-        # check if key is 'chosen', 'alias' or any peripheral name.
-        if 'aliases' in key or 'chosen' in key:
-            if 'bootargs' in root_node['root'][key]:
-                append_chosen_data(soc_config, key, 'bootargs', user_cfg['append'][key]['bootargs'])
+@args (Namespace): arguments from get_parser(), with depfile set
+"""
+def write_depfile(args):
+    targets = []
+    for target in get_targets(args):
+        targets += [f for role, f in get_output_files(target).items() if role != args.stdout]
 
-            if 'stdout_path' in root_node['root'][key]:
-                append_chosen_data(soc_config, key, 'stdout_path', user_cfg['append'][key]['stdout_path'], sep=",")
+    deps = [os.path.normpath(f) for _, f in get_input_files(args)]
+    if args.check_dtb:
+        deps.append(args.check_dtb)
 
-            if 'private_data' in root_node['root'][key]:
-                append_chosen_data(soc_config, key, 'private_data', user_cfg['append'][key]['private_data'])
+    rule = "{}: {}\n".format(' '.join(escape_depfile_path(f) for f in targets),
+                             ' \\\n  '.join(escape_depfile_path(f) for f in dict.fromkeys(deps)))
+    write_if_changed(args.depfile, rule)
 
-def main():
+"""
+open_output_cache: get the output cache and the key of this generation
 
-    out = ''
-    board = ''
-    path_dts = 'dts'
-    path_dts = os.path.join(pwd, path_dts)
-    dt_parse = argparse.ArgumentParser(description='Device Tree Generator')
+@args (Namespace): arguments from get_parser()
+@board (str): development kit name from drivers.json
 
-    dt_parse.add_argument('soc', type=str, help='path to soc.h')
-    dt_parse.add_argument('board', type=str, help='development kit name such as t120, ti60')
-    dt_parse.add_argument('-c', '--user-config', action='append', type=str,
-            help='Specify path to user configuration json file to override the APB slave device property')
-    dt_parse.add_argument('-d', '--dir', type=str, help='Output generated output directory. By default is dts')
-    dt_parse.add_argument('-o', '--outfile', type=str, help='Override output filename. By default is sapphire.dtsi')
-    dt_parse.add_argument('-j', '--json', action='store_true', help='Save output file as json format')
-    dt_parse.add_argument('-s', '--slave', action='append', type=str, help='Specify path to slave device configuration json file. This file is a slave node for the master device which appear in DTS file.')
-    subparsers = dt_parse.add_subparsers(title='os', dest='os')
-    os_linux_parser = subparsers.add_parser('linux', help='Target OS, Linux')
-    os_uboot_parser = subparsers.add_parser('uboot', help='Target OS, U-Boot')
-    os_zephyr_parser = subparsers.add_parser('zephyr', help='Target OS, Zephyr')
-    os_zephyr_parser.add_argument('socname', type=str, help='Custom soc name for Zephyr SoC dtsi')
-    os_zephyr_parser.add_argument('zephyrboard', type=str, help='Zephyr board name')
-    os_zephyr_parser.add_argument('-em', '--extmemory', action="store_true", help='Use external memory. If no external memory enabled on the SoC, internal memory will be used instead.')
-    args = dt_parse.parse_args()
+return: (OutputCache, key), or (None, None) if the cache is disabled or
+an input file is missing
+"""
+def open_output_cache(args, board):
+    # the report is written from the built soc configuration
+    if args.no_cache or args.report:
+        return None, None
+
+    input_files = get_input_files(args)
+    for _, f in input_files:
+        if not os.path.isfile(f):
+            return None, None
+
+    options = {
+        "board": board,
+        "os": args.os,
+        "json": args.json,
+        "socname": getattr(args, 'socname', None),
+        "zephyrboard": getattr(args, 'zephyrboard', None),
+        "extmemory": getattr(args, 'extmemory', False),
+        "validate": args.validate
+    }
 
-    if args.dir:
-        path_dts = args.dir
+    cache = OutputCache(args.cache_dir or get_cache_dir())
+    key = cache_key(input_files, options)
 
-    if args.os == "zephyr":
-        is_zephyr = True
-    else:
-        is_zephyr = False
+    return cache, key
 
-    soc_path = args.soc
-    soc_config = parse_soc_config(soc_path)
-
-    conf = load_config_file()
-    device_family = ""
-    devkits = conf['devkits']
-    for dev_family, devs in devkits.items():
-        for dev in devs:
-            if args.board in dev.lower():
-                board = dev
-                device_family = dev_family
-
-    if "ti375" in board.lower():
-        soc_name = conf['soc_name']['hard']
-    else:
-        soc_name = conf['soc_name']['soft']
+"""
+save_output: save an output file
+
+@filename (str): path to output file
+@data (str or bytes): content of the file
+@incremental (bool): only write the file if its content changed
+
+return (bool): True if the file was written
+"""
+def save_output(filename, data, incremental):
+    if incremental:
+        return write_if_changed(filename, data)
+
+    save_file(filename, data)
+
+    return True
+
+"""
+stream_output: render a template chunk by chunk into a file
+
+@template (Template): jinja2 template
+@soc_config (dict): soc configuration to render
+@fp: file object to write to
+"""
+def stream_output(template, soc_config, fp):
+    stream = template.stream(soc_config)
+    stream.enable_buffering(STREAM_BUFFER_SIZE)
+    stream.dump(fp)
+    fp.flush()
+
+"""
+write_output: write an output file of a built device tree
+
+The output is rendered by render() before, unless it is streamed with
+--stream or --stdout.
+
+@role (str): dtsi or dts
+@result (Result): result of build()
+@filename (str): path to output file
+@args (Namespace): arguments from get_parser()
+@stdout: stream for --stdout
+
+return (bool): True if the file was written, False if it is unchanged,
+None if it was streamed to stdout
+"""
+def write_output(role, result, filename, args, stdout):
+    if args.stdout == role or args.stream:
+        template = dict(zip(('dtsi', 'dts'), get_templates()))[role]
+
+    if args.stdout == role:
+        with stats.stage("stream %s" % role):
+            stream_output(template, result.model, stdout)
+        return None
+
+    if args.stream:
+        with stats.stage("stream %s" % role):
+            with open(filename, 'w') as f:
+                stream_output(template, result.model, f)
+        return True
+
+    with stats.stage("write %s" % role):
+        return save_output(filename, getattr(result, role), args.incremental)
+
+"""
+validate: check the address map and the interrupt map of a built soc configuration
+
+The errors are printed, as warnings without --validate. With --report, the
+address map and the interrupt map are saved in json format.
 
-    if not board:
-        print("Error: %s development kit is not supported\n" % args.board)
+@args (Namespace): arguments from get_parser()
+@soc_config (dict): soc configuration from build_soc_config()
+@warnings (list): warnings of the generation, the printed warnings are added
+
+return (int): 0 on success, -1 if --validate is given and a map is invalid
+"""
+def validate(args, soc_config, warnings):
+    from core.address_map import check_address_map
+    from core.interrupts import check_interrupts
+
+    address_map = check_address_map(soc_config)
+    interrupts = check_interrupts(soc_config)
+    errors = address_map.errors + interrupts.errors
+
+    level = "Error" if args.validate else "Warning"
+    for e in errors:
+        print("%s: %s" % (level, e))
+        if not args.validate:
+            warnings.append(e)
+
+    for w in interrupts.warnings:
+        print("Warning: %s" % w)
+        warnings.append(w)
+
+    if args.report:
+        report = {
+            "address_map": address_map.to_dict(),
+            "interrupts": interrupts.to_dict()
+        }
+        save_output(args.report, json.dumps(report, indent=4), args.incremental)
+        print("Info: validation report stored in %s" % args.report)
+
+    if args.validate and errors:
         return -1
 
-    output_json = 'sapphire.json'
-    output_filename_standalone = ""
+    return 0
+
+"""
+get_parent_labels: get the parent labels of the nodes of the user config and
+slave files
+
+@args (Namespace): arguments from get_parser()
+
+return (list): (parent_label, node name), without the nodes put under the
+root node
+"""
+def get_parent_labels(args):
+    labels = []
+    for config in load_config_files((args.user_config or []) + (args.slave or [])):
+        for name, node in config.get('child', {}).items():
+            if node.get('parent_label', 'root') != 'root':
+                labels.append((node['parent_label'], name))
+
+    return labels
+
+"""
+check_outputs: check the generated dtsi and dts, see --check-dts
+
+@args (Namespace): arguments from get_parser()
+@sources (dict): content of the generated dtsi and dts by path
+@dts_filename (str): path to the dts
+
+return (int): 0 if they are valid, -1 otherwise
+"""
+def check_outputs(args, sources, dts_filename):
+    from core.dtc import check_dts
+
+    warnings = []
+    with stats.stage("check dts"):
+        errors = check_dts(dts_filename, sources, warnings, get_parent_labels(args))
+
+    for w in warnings:
+        print("Warning: %s" % w)
+
+    for e in errors:
+        print("Error: %s" % e)
+
+    if errors:
+        return -1
+
+    print("Info: %s checked" % dts_filename)
+
+    return 0
+
+"""
+build_dtb: compile the generated dts into a flattened device tree blob
+
+The dts and the dtsi it includes are compiled in memory. With --check-dtb,
+the blob is compared with a blob compiled by dtc.
+
+@args (Namespace): arguments from get_parser()
+@sources (dict): content of the generated dtsi and dts by path
+@dts_filename (str): path to the dts
+@dtb_filename (str): path to the dtb to write
+
+return (int): 0 on success, -1 if the dts can not be compiled or the blob
+differs from the dtc blob
+"""
+def build_dtb(args, sources, dts_filename, dtb_filename):
+    from core.dtc import compile_dts, DtsError
+    from core.fdt import flatten, compare_blobs, FdtError
+
+    warnings = []
+    try:
+        with stats.stage("compile dts"):
+            tree = compile_dts(dts_filename, sources, warnings)
+    except DtsError as e:
+        print("Error: %s" % e)
+        return -1
+    finally:
+        for w in warnings:
+            print("Warning: %s" % w)
+
+    with stats.stage("flatten"):
+        blob = flatten(tree)
+
+    written = save_output(dtb_filename, blob, args.incremental)
+    print("Info: device tree blob stored in %s%s" % (dtb_filename, '' if written else ' (unchanged)'))
 
-    if is_zephyr:
-        output_filename_standalone = "sapphire_soc_{soc_name}.dtsi".format(soc_name=args.socname)
-        output_filename = os.path.join(path_dts, output_filename_standalone)
-        dts_filename = '{}.dts'.format(args.zephyrboard)
+    if args.check_dtb:
+        with open(args.check_dtb, 'rb') as f:
+            expected = f.read()
+
+        try:
+            differences = compare_blobs(expected, blob)
+        except FdtError as e:
+            print("Error: %s is not a valid dtb: %s" % (args.check_dtb, e))
+            return -1
+
+        for d in differences:
+            print("Error: dtb differs from %s: %s" % (args.check_dtb, d))
+
+        if differences:
+            return -1
+
+        print("Info: device tree blob is identical to %s" % args.check_dtb)
+
+    return 0
+
+"""
+load_config_files: load the user configuration or slave files
+
+@filenames (list): path to json files, None if there is none
+
+return (list): content of each file
+"""
+def load_config_files(filenames):
+    configs = []
+
+    for filename in filenames or []:
+        if not os.path.exists(filename):
+            print("Error: file %s does not exists" % filename)
+            sys.exit(1)
+
+        configs.append(load_json_file(filename))
+
+    return configs
+
+"""
+run: generate the device tree files for a parsed command line
+
+With --stdout, the selected output is written to stdout and the messages
+are printed to stderr. With --targets, the outputs of each target are
+generated, see run_targets().
+
+@args (Namespace): arguments from get_parser()
+@warm (dict): parsed soc configuration and built device tree of each os,
+              kept between the generations of the watch mode and of the
+              targets, None otherwise
+
+return (int): 0 on success, -1 if the board is not supported
+"""
+def run(args, warm=None):
+    stats.reset()
+    set_template_cache(args.cache_dir, not args.no_cache)
+
+    if args.md and not args.depfile:
+        args.depfile = get_output_files(get_targets(args)[0])['dtsi'] + '.d'
+
+    if args.targets:
+        ret = run_targets(args, warm)
+    elif args.stdout:
+        stdout = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            ret = run_outputs(args, stdout, warm)
     else:
-        output_filename = 'sapphire.dtsi'
-        output_filename = os.path.join(path_dts, output_filename)
-        dts_filename = "{}.dts".format(args.os)
-
-    if (os.path.exists(path_dts)):
-            shutil.rmtree(path_dts)
-
-    os.makedirs(path_dts)
-    dts_filename = os.path.join(path_dts, dts_filename)
-
-    if args.outfile and not is_zephyr:
-        output_filename = args.outfile
-
-    # root
-    model = conf['model']
-    metadata = {
-        'model': model,
-        'os': args.os,
-        'device_family': device_family,
-        'board': board,
-        'soc_name': soc_name
-    }
+        ret = run_outputs(args, None, warm)
 
-    root_node = dt_create_root_node(soc_config, **metadata)
-    os_data = get_os_data(root_node)
-    misc_node = {
-            "include_headers": os_data['include_headers'],
-            "chosen": os_data['chosen'],
-            "aliases": os_data['aliases']
-    }
-    if is_zephyr:
-        if not 'dts' in misc_node['include_headers']:
-            misc_node['include_headers']['dts'] = {'include': []}
+    if ret == 0 and args.depfile:
+        write_depfile(args)
 
-        misc_node['include_headers']['dts']['include'].append(
-                "#include <efinix/{}>".format(output_filename_standalone))
+    return ret
 
-    root_node = dt_insert_child_node(root_node, misc_node)
+"""
+run_targets: generate the device tree files of each target of --targets
 
-    soc_config['root'].update(root_node['root'])
-    mem_node = dt_create_memory_node(soc_config)
-    soc_config['root'].update({'memory': mem_node})
+soc.h is parsed once. Each target builds its nodes from a copy of the root
+node, the parsed cpu, memory, peripheral and bus models are shared.
 
-    if 'reserved_memory' in os_data:
-        soc_config['root']['reserved_memory'] = os_data['reserved_memory']
+@args (Namespace): arguments from get_parser()
+@warm (dict): see run()
 
-    if is_zephyr :
-        if args.extmemory:
-            soc_config['root']['chosen']['private_data'].append("zephyr,sram = &external_ram;")
-        else:
-            soc_config['root']['chosen']['private_data'].append("zephyr,sram = &ram0;")
+return (int): 0 if the outputs of every target are generated, -1 otherwise
+"""
+def run_targets(args, warm=None):
+    if args.os:
+        print("Error: --targets can not be used with the %s os argument" % args.os)
+        return -1
 
+    for option in ['outfile', 'stdout', 'json', 'check_dtb', 'report']:
+        if getattr(args, option):
+            print("Error: --%s can not be used with --targets" % option.replace('_', '-'))
+            return -1
 
-    # cpu
-    soc_config = dt_create_cpu_node(soc_config)
+    if warm is None:
+        warm = {}
 
-    # clock
-    clk_node = dt_create_clock_node(soc_config, 'apb_clock')
-    if clk_node and not is_zephyr:
-        soc_config['root'].update(clk_node)
+    ret = 0
+    for target in get_targets(args):
+        with stats.stage("target %s" % target.os):
+            if run_outputs(target, None, warm) != 0:
+                ret = -1
 
-    # bus
-    buses_node = create_bus_nodes(soc_config)
+    return ret
 
-    merged_child = {"child": {}}
-    if args.user_config:
-        for uc in args.user_config:
-            if not os.path.exists(uc):
-                print("Error: file %s does not exists" % uc)
-                sys.exit(1)
+"""
+run_outputs: generate the device tree files of one os
 
-            user_cfg = load_json_file(uc)
-            override_peripherals(buses_node, user_cfg)
+The device tree is built by core.generator.build(), this function reads
+the inputs and the output cache, and writes or streams the outputs.
 
-            # add child node
-            if 'child' in user_cfg:
-                child_node = get_child_node_header(user_cfg)
-                for k, v in child_node['child'].items():
-                    merged_child['child'][k] = v
+@args (Namespace): arguments from get_parser()
+@stdout: stream for --stdout, None otherwise
+@warm (dict): see run()
 
-            # append items into 'aliases' or 'chosen' node if specify
-            if 'append' in user_cfg:
-                append_chosen_node(soc_config, root_node, user_cfg)
+return (int): 0 on success, -1 on error
+"""
+def run_outputs(args, stdout, warm=None):
+    if args.stream and args.incremental:
+        print("Error: --stream can not be used with --incremental, the outputs are compared in memory")
+        return -1
 
-    soc_config['root'].update(merged_child)
-    soc_config['root'].update(buses_node)
+    if args.check_dtb and not os.path.isfile(args.check_dtb):
+        print("Error: file %s does not exists" % args.check_dtb)
+        return -1
 
-    if args.slave:
-        slaves_node = {}
-        for slave_cfg in args.slave:
-            if os.path.exists(slave_cfg):
-                slave_node = load_json_file(slave_cfg)
-                slaves_node = {**slaves_node, **slave_node['child']}
+    path_dts = args.dir or os.path.join(pwd, 'dts')
+    soc_path = args.soc
 
+    try:
+        board = get_metadata(args.board, args.os)['board']
+    except GenerationError as e:
+        print("Error: %s\n" % e)
+        return -1
+
+    outputs = get_output_files(args)
+    dtb_filename = outputs.pop('dtb', None)
+    output_filename = outputs['dtsi']
+    dts_filename = outputs['dts']
+    output_json = outputs.get('json')
+
+    keep = list(outputs.values())
+    for f in [args.report, dtb_filename, args.depfile]:
+        if f:
+            keep.append(f)
+
+    # skip parsing and rendering if the same inputs are already in cache
+    cache, key = open_output_cache(args, board)
+    if cache:
+        with stats.stage("cache lookup"):
+            entry = cache.lookup(key)
+        cached, warnings = entry or (None, [])
+        if cached and set(cached) == set(outputs):
+            # the warnings of the generation which stored the outputs
+            for w in warnings:
+                print("Warning: %s" % w)
+
+            os.makedirs(path_dts, exist_ok=True)
+            for role, filename in outputs.items():
+                if role == args.stdout:
+                    stdout.write(cached[role])
+                    stdout.flush()
+                else:
+                    write_if_changed(filename, cached[role])
+
+            prune_stale_files(path_dts, keep)
+            if args.stdout == 'dtsi':
+                print("Info: SoC device tree source written to stdout")
+            else:
+                print("Info: SoC device tree source stored in %s (cached)" % output_filename)
+
+            if args.stdout == 'dts':
+                print("Info: dts of board %s written to stdout" % board)
             else:
-                print("Error: file %s does not exists" % slave_cfg)
-                sys.exit(1)
+                print("Info: save dts of board %s in %s (cached)" % (board, dts_filename))
+
+            sources = {output_filename: cached['dtsi'], dts_filename: cached['dts']}
+            ret = 0
+            if args.check_dts:
+                ret = check_outputs(args, sources, dts_filename)
+
+            if dtb_filename and ret == 0:
+                with stats.stage("dtb"):
+                    ret = build_dtb(args, sources, dts_filename, dtb_filename)
+
+            return ret
+
+    # the watch mode keeps the parsed soc configuration and the built device
+    # tree between the generations, without the stages of the inputs which
+    # changed
+    result = warm.get('built', {}).get(args.os) if warm else None
+    if result is None:
+        parsed = warm.get('parsed') if warm else None
+        parse_warnings = []
+        if parsed is None:
+            with stats.stage("parse"):
+                if args.no_cache:
+                    parsed = parse_soc_config(soc_path, parse_warnings)
+                else:
+                    parsed = ParseCache(args.cache_dir or get_cache_dir()).parse(soc_path, parse_warnings)
+            if warm is not None:
+                warm['parsed'] = parsed
+
+        try:
+            # the parsed soc configuration is copied, it is shared with the next builds
+            result = build(parsed, args.board, args.os, load_config_files(args.user_config),
+                           load_config_files(args.slave), getattr(args, 'socname', None),
+                           getattr(args, 'zephyrboard', None), getattr(args, 'extmemory', False))
+        except GenerationError as e:
+            print("Error: %s" % e)
+            return -1
+
+        result.warnings[:0] = parse_warnings
+        for w in result.warnings:
+            print("Warning: %s" % w)
+
+        if warm is not None:
+            warm.setdefault('built', {})[args.os] = result
+
+    if args.incremental:
+        os.makedirs(path_dts, exist_ok=True)
+    else:
+        import shutil
 
-        slaves_node = {'child': slaves_node}
-        slaves_node = get_child_node_header(slaves_node)
+        if (os.path.exists(path_dts)):
+                shutil.rmtree(path_dts)
 
-        if not 'child' in soc_config['root']:
-            soc_config = dt_insert_child_node(soc_config, slaves_node)
-        else:
-            soc_config['root']['child'].update(slaves_node['child'])
+        os.makedirs(path_dts)
 
-    out = dtsi_template.render(soc_config)
-    save_file(output_filename, out)
-    print("Info: SoC device tree source stored in %s" % output_filename)
+    warnings = list(result.warnings)
+    if args.validate or args.report:
+        with stats.stage("validate"):
+            if validate(args, result.model, warnings) != 0:
+                return -1
+
+    # the templates could have changed since the last generation of the watch mode
+    result.dtsi = result.dts = None
+    roles = ['dtsi', 'dts']
+    render(result, [r for r in roles if not (args.stream or args.stdout == r)])
+
+    unchanged = {True: '', False: ' (unchanged)'}
+    written = write_output('dtsi', result, output_filename, args, stdout)
+    if written is None:
+        print("Info: SoC device tree source written to stdout")
+    else:
+        print("Info: SoC device tree source stored in %s%s" % (output_filename, unchanged[written]))
 
     # create dts file
-    out = dts_template.render(soc_config)
-    save_file(dts_filename, out)
-    print("Info: save dts of board %s in %s" % (board, dts_filename))
+    written = write_output('dts', result, dts_filename, args, stdout)
+    if written is None:
+        print("Info: dts of board %s written to stdout" % board)
+    else:
+        print("Info: save dts of board %s in %s%s" % (board, dts_filename, unchanged[written]))
+
+    # the streamed outputs are not kept in memory
+    rendered = {r: getattr(result, r) for r in roles if getattr(result, r) is not None}
 
     # save in json format
     if args.json:
-        with open(output_json, 'w') as f:
-            json.dump(soc_config, f, indent=4, sort_keys=False)
+        with stats.stage("json"):
+            out = json.dumps(result.model, indent=4, sort_keys=False, default=model_to_dict)
+            written = save_output(output_json, out, args.incremental)
+        rendered['json'] = out
+
+        print("Info: device tree json format stored in %s%s" % (output_json, unchanged[written]))
+
+    ret = 0
+    if args.check_dts or dtb_filename:
+        # the streamed outputs are rendered again in memory
+        render(result, [r for r in roles if r not in rendered])
+        sources = {output_filename: result.dtsi, dts_filename: result.dts}
+
+    if args.check_dts:
+        ret = check_outputs(args, sources, dts_filename)
+
+    if dtb_filename and ret == 0:
+        with stats.stage("dtb"):
+            ret = build_dtb(args, sources, dts_filename, dtb_filename)
+
+    if args.incremental:
+        with stats.stage("prune"):
+            for f in prune_stale_files(path_dts, keep):
+                print("Info: remove stale file %s" % f)
+
+    if cache and set(rendered) == set(outputs):
+        with stats.stage("cache store"):
+            cache.store(key, rendered, warnings)
+
+    return ret
+
+# stage of the generation to run again when an input file of this role changed
+WATCH_STAGES = {
+    'soc': 'parse',
+    'drivers': 'parse',
+    'peripherals': 'parse',
+    'user_config': 'build',
+    'slave': 'build',
+    'template': 'render'
+}
+
+"""
+watch_run: run one generation of the watch mode
+
+An error does not stop the watch mode, the generation runs again at the
+next change of the inputs.
+
+@args (Namespace): arguments from get_parser()
+@warm (dict): parsed and built soc configuration kept between the generations
+
+return (int): 0 on success, -1 on error
+"""
+def watch_run(args, warm):
+    try:
+        ret = run(args, warm)
+    except SystemExit as e:
+        ret = 0 if not e.code else -1
+    except Exception as e:
+        print("Error: %s: %s" % (type(e).__name__, e))
+        ret = -1
+
+    if args.stats:
+        stats.report(args.stats)
+
+    return ret
+
+"""
+watch: generate the device tree files, then again after each change of
+an input file
+
+The parsed soc.h and the built nodes are kept in memory. A change of soc.h,
+drivers.json or of the peripherals list parses soc.h again, a change of a
+user configuration or of a slave file builds the nodes again and a change
+of a template only renders the outputs again. The burst of events of an
+editor save is handled as one change, and a file saved with the same
+content is ignored.
+
+@args (Namespace): arguments from get_parser()
+
+return (int): 0 when interrupted by Ctrl-C
+"""
+def watch(args):
+    from core.watch import get_watcher
+
+    stages = {}
+    for role, f in get_input_files(args):
+        stages[os.path.abspath(f)] = WATCH_STAGES[role.split(':')[0]]
+
+    def digest(f):
+        try:
+            return file_digest(f)
+        except OSError:
+            return None
+
+    digests = {f: digest(f) for f in stages}
+    watcher = get_watcher(list(stages), args.poll)
+    warm = {}
+
+    try:
+        while True:
+            watch_run(args, warm)
+            print("Info: watching %d input files, press Ctrl-C to stop" % len(stages))
+            sys.stdout.flush()
+
+            changed = set()
+            while not changed:
+                for f in watcher.wait():
+                    d = digest(f)
+                    if d != digests[f]:
+                        digests[f] = d
+                        changed.add(f)
+
+            for f in sorted(changed):
+                print("Info: %s changed" % f)
+
+            rerun = set(stages[f] for f in changed)
+            if 'parse' in rerun:
+                warm.clear()
+            elif 'build' in rerun:
+                warm.pop('built', None)
+    except KeyboardInterrupt:
+        print("Info: stop watching")
+    finally:
+        watcher.close()
+
+    return 0
+
+"""
+load_manifest: load the list of jobs for batch generation
+
+The manifest is a json file with a list of jobs. Each job takes the same
+inputs as a single run of this script. Relative paths are resolved from
+the directory of the manifest.
+
+{
+    "jobs": [
+        {
+            "name": "ti180-linux",
+            "soc": "samples/multicores/soc.h",
+            "board": "ti180",
+            "os": "linux",
+            "user_config": ["config/linux/spi.json"],
+            "slave": ["config/linux/slaves.json"],
+            "dir": "out/ti180-linux"
+        },
+        {
+            "soc": "samples/multicores/soc.h",
+            "board": "ti180",
+            "os": "zephyr",
+            "socname": "zoro",
+            "zephyrboard": "zero-one",
+            "extmemory": true,
+            "dir": "out/ti180-zephyr"
+        }
+    ]
+}
+
+@filename (str): path to manifest file
+
+return (list): list of (job name, command line arguments)
+"""
+def load_manifest(filename):
+    base = os.path.dirname(os.path.abspath(filename))
+    manifest = load_json_file(filename)
+    jobs = []
+    out_dirs = {}
+
+    def path(p):
+        return os.path.join(base, os.path.expanduser(p))
+
+    for i, job in enumerate(manifest.get('jobs', [])):
+        missing = [k for k in ['soc', 'board'] if k not in job]
+        if 'os' not in job and 'targets' not in job:
+            missing.append('os')
+        if job.get('os') == 'zephyr':
+            missing += [k for k in ['socname', 'zephyrboard'] if k not in job]
+
+        name = job.get('name', "job{}".format(i))
+        if missing:
+            print("Error: %s in %s is missing %s" % (name, filename, ', '.join(missing)))
+            sys.exit(1)
+
+        argv = []
+        for uc in job.get('user_config', []):
+            argv += ['-c', path(uc)]
+
+        for slave in job.get('slave', []):
+            argv += ['-s', path(slave)]
+
+        out_dir = path(job.get('dir', os.path.join(pwd, 'dts')))
+        argv += ['-d', out_dir]
+
+        if 'outfile' in job:
+            argv += ['-o', path(job['outfile'])]
+
+        if job.get('dtb'):
+            argv.append('--dtb')
+
+        if job.get('validate'):
+            argv.append('--validate')
+
+        if job.get('check_dts'):
+            argv.append('--check-dts')
+
+        if 'targets' in job:
+            argv += ['--targets', job['targets']]
+
+        argv += [path(job['soc']), job['board']]
+        if 'os' in job:
+            argv.append(job['os'])
+
+        if job.get('os') == 'zephyr':
+            argv += [job['socname'], job['zephyrboard']]
+            if job.get('extmemory'):
+                argv.append('-em')
+
+        if out_dir in out_dirs:
+            print("Error: %s and %s write to the same directory %s" % (out_dirs[out_dir], name, out_dir))
+            sys.exit(1)
+
+        out_dirs[out_dir] = name
+        jobs.append((name, argv))
+
+    return jobs
+
+"""
+run_job: run one job of a batch and capture its output
+
+@name (str): job name
+@argv (list): command line arguments of the job
+
+return (dict): job name, status, time in seconds and captured log
+"""
+def run_job(name, argv):
+    log = io.StringIO()
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(log):
+        try:
+            args = get_parser().parse_args(argv)
+            ret = run(args)
+            status = 'ok' if ret == 0 else 'failed'
+        except SystemExit as e:
+            status = 'ok' if not e.code else 'failed'
+        except Exception as e:
+            print("Error: %s: %s" % (type(e).__name__, e))
+            status = 'failed'
+
+    return {
+        "name": name,
+        "status": status,
+        "time": time.perf_counter() - start,
+        "log": log.getvalue()
+    }
+
+"""
+warm_up: load the configuration shared by every job
+
+The worker processes are forked after this, so they start with drivers.json,
+the peripherals whitelists and the compiled templates already loaded.
+"""
+def warm_up():
+    load_config_file()
+    for os_name in ['linux', 'uboot', 'zephyr']:
+        load_config(os.path.join(pwd, 'config', os_name, 'peripherals.json'))
+
+    get_templates()
+
+def batch_main(argv):
+    batch_parse = argparse.ArgumentParser(prog='device_tree_generator.py batch',
+            description='Generate device trees for every job in a manifest')
+    batch_parse.add_argument('manifest', type=str, help='path to manifest json file')
+    batch_parse.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+            help='Number of jobs to run in parallel. By default is the number of cpus')
+    batch_parse.add_argument('-v', '--verbose', action='store_true', help='Print the output of each job')
+    batch_parse.add_argument('--startup-profile', action='store_true', help='Print the import time of each module on exit')
+    args = batch_parse.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    warm_up()
+
+    results = []
+    start = time.perf_counter()
+
+    if args.jobs <= 1 or len(jobs) <= 1:
+        for name, job_argv in jobs:
+            results.append(run_job(name, job_argv))
+
+    else:
+        import concurrent.futures
+        import multiprocessing
+
+        mp_context = None
+        if 'fork' in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context('fork')
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs, mp_context=mp_context) as pool:
+            futures = [pool.submit(run_job, name, job_argv) for name, job_argv in jobs]
+            for (name, _), future in zip(jobs, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append({"name": name, "status": "failed", "time": 0.0,
+                                    "log": "Error: %s: %s\n" % (type(e).__name__, e)})
+
+    failed = 0
+    for result in results:
+        if result['status'] != 'ok':
+            failed += 1
+
+        print("%-6s %8.3fs  %s" % (result['status'], result['time'], result['name']))
+        if args.verbose or result['status'] != 'ok':
+            print(indent(result['log'].rstrip('\n')), end='')
+
+    print("Info: %d jobs, %d failed in %.3fs" % (len(results), failed, time.perf_counter() - start))
+
+    return 1 if failed else 0
+
+"""
+run_request: run a request of the generator daemon in a worker process
+
+@request (dict): command line arguments 'argv' and working directory 'cwd'
+                 of the client
+
+return (dict): job status, time and captured log
+"""
+def run_request(request):
+    os.chdir(request.get('cwd', '/'))
+
+    return run_job(request.get('name', 'request'), request['argv'])
+
+def serve_main(argv):
+    from core.server import get_socket_path, serve
+
+    serve_parse = argparse.ArgumentParser(prog='device_tree_generator.py serve',
+            description='Run a generator daemon which handles generate requests from "device_tree_generator.py client"')
+    serve_parse.add_argument('--socket', type=str, default=get_socket_path(),
+            help='Path to unix socket. By default is %(default)s')
+    serve_parse.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+            help='Number of requests handled in parallel. By default is the number of cpus')
+    serve_parse.add_argument('--startup-profile', action='store_true', help='Print the import time of each module on exit')
+    args = serve_parse.parse_args(argv)
+
+    warm_up()
+
+    return serve(args.socket, run_request, args.jobs)
+
+def client_main(argv):
+    from core.server import get_socket_path, send_request
+
+    client_parse = argparse.ArgumentParser(prog='device_tree_generator.py client', allow_abbrev=False,
+            add_help=False)
+    client_parse.add_argument('--socket', type=str, default=get_socket_path())
+    client_args, argv = client_parse.parse_known_args(argv)
+
+    # check the arguments here, so usage errors do not need the daemon
+    parser = get_parser()
+    parser.prog = 'device_tree_generator.py client [--socket SOCKET]'
+    args = parser.parse_args(argv)
+
+    # the daemon only returns the log of a generation
+    for option in ['watch', 'stats', 'profile']:
+        if getattr(args, option):
+            print("Error: --%s can not be used with client" % option)
+            return 1
+
+    request = {
+        "name": args.soc,
+        "argv": argv,
+        "cwd": os.getcwd()
+    }
+
+    try:
+        response = send_request(client_args.socket, request)
+    except OSError:
+        # no daemon running, generate in this process
+        return 0 if run(args) == 0 else 1
+
+    print(response['log'], end='')
+
+    return 0 if response['status'] == 'ok' else 1
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(batch_main(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        sys.exit(serve_main(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'client':
+        sys.exit(client_main(sys.argv[2:]))
+
+    args = get_parser().parse_args()
+
+    if args.watch:
+        if args.profile:
+            print("Error: --profile can not be used with --watch")
+            return 1
+
+        return watch(args)
+
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        ret = profiler.runcall(run, args)
+        profiler.dump_stats(args.profile)
+        print("Info: cProfile data stored in %s" % args.profile)
+    else:
+        ret = run(args)
+
+    if args.stats:
+        stats.report(args.stats)
 
-        print("Info: device tree json format stored in %s" % output_json)
+    return 0 if ret == 0 else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
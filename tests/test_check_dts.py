@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.generator import generate
+from core.dtc import check_dts
+
+CHECK = os.path.join(ROOT, 'tests', 'data', 'check')
+
+# source of tests/data/check, (file, line, error message) of each error
+ERRORS = [
+    ('valid.dts', []),
+    ('unbalanced.dts', [('unbalanced.dtsi', 1, "'{' is not closed by '};'")]),
+    ('extra.dts', [('extra.dts', 8, "'}' without a matching '{'")]),
+    ('semicolon.dts', [('semicolon.dts', 6, "expected ';' after '}'"),
+                       ('semicolon.dts', 11, "expected ';' after '}'")]),
+    ('string.dts', [('string.dts', 5, "unterminated string")]),
+    ('comment.dts', [('comment.dts', 5, "unterminated comment")]),
+    # every reference is reported, the node references before the value references
+    ('references.dts', [('references.dts', 11, "label or path spi0 not found"),
+                        ('references.dts', 17, "reference to non-existent node or label clk"),
+                        ('references.dts', 7, "reference to non-existent node or label uart1")]),
+    ('range.dts', [('range.dts', 6, "value out of range for 32-bit array element"),
+                   ('range.dts', 7, "value out of range for 8-bit array element")]),
+    ('labels.dts', [('labels.dts', 6, "duplicate label uart0 on /soc/serial@f8010000 and /serial@0")])
+]
+
+"""
+check: check a source of tests/data/check
+
+@name (str): file name of the dts
+@labels (list): (label, node name) of the slave nodes with a parent_label
+
+return (tuple): error messages and warnings
+"""
+def check(name, labels=()):
+    warnings = []
+    errors = check_dts(os.path.join(CHECK, name), None, warnings, labels)
+
+    return [str(e) for e in errors], warnings
+
+class CheckDtsTest(unittest.TestCase):
+    def test_errors(self):
+        for name, expected in ERRORS:
+            with self.subTest(name=name):
+                errors, warnings = check(name)
+
+                self.assertEqual(errors, ["%s:%d: %s" % (os.path.join(CHECK, f), line, message)
+                                          for f, line, message in expected])
+                self.assertEqual(warnings, [])
+
+    def test_parent_labels(self):
+        errors, warnings = check('valid.dts', [('soc', 'eth@0'), ('spi', 'flash@0')])
+
+        self.assertEqual(errors, [])
+        self.assertEqual(warnings, ["parent_label spi of flash@0 matches no label of the device tree, "
+                                    "flash@0 is ignored"])
+
+    def test_system_include(self):
+        warnings = []
+        errors = check_dts('board.dts', {'board.dts': '/dts-v1/;\n#include <config.h>\n/ {\n};\n'}, warnings)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(warnings, ["board.dts:2: include file <config.h> is not available, it is ignored"])
+
+    def test_sample(self):
+        result = generate(os.path.join(ROOT, 'samples', 'singlecore', 'soc.h'), 't120', 'linux')
+        sources = {result.dtsi_name: result.dtsi, result.dts_name: result.dts}
+
+        self.assertEqual(check_dts(result.dts_name, sources), [])
+
+        # the last '};' of the dtsi closes its root node
+        lines = result.dtsi.rstrip('\n').split('\n')
+        self.assertEqual(lines[-1], '};')
+        sources[result.dtsi_name] = '\n'.join(lines[:-1]) + '\n'
+        root = next(n for n, line in enumerate(lines, 1) if line.startswith('/ {'))
+
+        self.assertEqual([str(e) for e in check_dts(result.dts_name, sources)],
+                         ["%s:%d: '{' is not closed by '};'" % (result.dtsi_name, root)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.generator import generate
+from core.dtc import compile_dts, Preprocessor, DtsError
+from core.fdt import flatten, unflatten, compare_blobs, FdtError
+
+DATA = os.path.join(ROOT, 'tests', 'data')
+
+# golden blob, soc, board, os, socname, zephyrboard, extmemory
+SAMPLES = [
+    ('singlecore_t120_linux.dtb', 'singlecore', 't120', 'linux', None, None, False),
+    ('multicores_ti180_zephyr.dtb', 'multicores', 'ti180', 'zephyr', 'zoro', 'zero-one', False),
+    ('singlecore_ti180_zephyr_em.dtb', 'singlecore', 'ti180', 'zephyr', 'zoro', 'zero-one', True)
+]
+
+# dts, error message
+ERRORS = [
+    # range errors
+    ('/dts-v1/;\n/ {\n\ta = <0x100000000>;\n};\n',
+     "test.dts:3: value out of range for 32-bit array element"),
+    ('/dts-v1/;\n/ {\n\ta = <(1 << 32)>;\n};\n',
+     "test.dts:3: value out of range for 32-bit array element"),
+    ('/dts-v1/;\n/ {\n\ta = /bits/ 8 <256>;\n};\n',
+     "test.dts:3: value out of range for 8-bit array element"),
+    ('/dts-v1/;\n/ {\n\ta = <0x10000000000000000>;\n};\n',
+     "test.dts:3: integer literal out of range"),
+    # labels
+    ('/dts-v1/;\n/ {\n\tl: n1 {\n\t};\n\tl: n2 {\n\t};\n};\n',
+     "test.dts:5: duplicate label l on /n1 and /n2"),
+    ('/dts-v1/;\n/ {\n\tn {\n\t\tp = <&nolabel>;\n\t};\n};\n',
+     "test.dts:4: reference to non-existent node or label nolabel"),
+    ('/dts-v1/;\n&nolabel {\n};\n',
+     "test.dts:2: label or path nolabel not found"),
+    ('/ {\n};\n',
+     "test.dts:1: missing /dts-v1/ tag")
+]
+
+# dts, root node of the blob
+TREES = [
+    # the values are sign extended
+    ('/dts-v1/;\n/ {\n\ta = <(-1)>;\n\tb = /bits/ 16 <(-1)>;\n\tc = /bits/ 64 <0xffffffffffffffff>;\n};\n',
+     ('', [('a', b'\xff\xff\xff\xff'), ('b', b'\xff\xff'), ('c', b'\xff' * 8)], [])),
+    # a reference in cells is the phandle of the node, a reference out of cells is its path
+    ('/dts-v1/;\n/ {\n\tl: n1 {\n\t};\n\tn2 {\n\t\tp = <&l 1>;\n\t\tq = &l;\n\t\tr = &{/n2};\n\t};\n};\n',
+     ('', [], [('n1', [('phandle', b'\0\0\0\x01')], []),
+               ('n2', [('p', b'\0\0\0\x01\0\0\0\x01'), ('q', b'/n1\0'), ('r', b'/n2\0')], [])])),
+    # the lowest free phandle is assigned, an explicit phandle is kept
+    ('/dts-v1/;\n/ {\n\ta: n1 {\n\t\tphandle = <1>;\n\t};\n\tb: n2 {\n\t};\n\tn3 {\n\t\tp = <&b &a>;\n\t};\n};\n',
+     ('', [], [('n1', [('phandle', b'\0\0\0\x01')], []),
+               ('n2', [('phandle', b'\0\0\0\x02')], []),
+               ('n3', [('p', b'\0\0\0\x02\0\0\0\x01')], [])])),
+    # the phandle is appended after the properties of every fragment of the node
+    ('/dts-v1/;\n/ {\n\ta: n1 {\n\t};\n};\n&a {\n\tx = <1>;\n};\n/ {\n\tn2 {\n\t\tp = <&a>;\n\t};\n};\n',
+     ('', [], [('n1', [('x', b'\0\0\0\x01'), ('phandle', b'\0\0\0\x01')], []),
+               ('n2', [('p', b'\0\0\0\x01')], [])]))
+]
+
+"""
+get_sample: generate the dtsi and dts of a sample
+
+@sample (tuple): entry of SAMPLES
+
+return (Result): generated dtsi and dts
+"""
+def get_sample(sample):
+    _, soc, board, os_name, socname, zephyrboard, extmemory = sample
+    return generate(os.path.join(ROOT, 'samples', soc, 'soc.h'), board, os_name,
+                    socname=socname, zephyrboard=zephyrboard, extmemory=extmemory)
+
+"""
+read_golden: read a golden blob of tests/data
+
+@name (str): file name
+
+return (bytes): blob
+"""
+def read_golden(name):
+    with open(os.path.join(DATA, name), 'rb') as f:
+        return f.read()
+
+"""
+compile_text: compile a single dts source
+
+@text (str): dts source
+
+return (bytes): blob
+"""
+def compile_text(text):
+    return flatten(compile_dts('test.dts', {'test.dts': text}))
+
+class SampleTest(unittest.TestCase):
+    def test_golden(self):
+        for sample in SAMPLES:
+            with self.subTest(sample=sample[0]):
+                result = get_sample(sample)
+                warnings = []
+                tree = compile_dts(result.dts_name, {result.dtsi_name: result.dtsi, result.dts_name: result.dts},
+                                   warnings)
+
+                self.assertEqual(compare_blobs(read_golden(sample[0]), flatten(tree)), [])
+                self.assertEqual(warnings, [])
+
+    def test_dtc(self):
+        # the golden blobs must be the same as the dtc blobs, the sources are
+        # preprocessed by the Preprocessor instead of cpp
+        dtc = shutil.which('dtc')
+        if not dtc:
+            self.skipTest("dtc is not installed")
+
+        for sample in SAMPLES:
+            with self.subTest(sample=sample[0]):
+                result = get_sample(sample)
+                pp = Preprocessor({result.dtsi_name: result.dtsi, result.dts_name: result.dts})
+                pp.read(result.dts_name, result.dts)
+
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, result.dts_name)
+                    with open(path, 'w') as f:
+                        f.write('\n'.join(pp.lines))
+                    blob = subprocess.run([dtc, '-q', '-I', 'dts', '-O', 'dtb', path],
+                                          check=True, stdout=subprocess.PIPE).stdout
+
+                self.assertEqual(compare_blobs(blob, read_golden(sample[0])), [])
+
+    def test_libfdt(self):
+        try:
+            import libfdt
+        except ImportError:
+            self.skipTest("libfdt is not installed")
+
+        for sample in SAMPLES:
+            with self.subTest(sample=sample[0]):
+                blob = read_golden(sample[0])
+                fdt = libfdt.Fdt(blob)
+                root = unflatten(blob)['root']
+
+                self.assertEqual(fdt.totalsize(), len(blob))
+                self.assertEqual(fdt.version(), 17)
+
+                # walk the tree with libfdt and with unflatten()
+                stack = [(0, root)]
+                while stack:
+                    offset, node = stack.pop()
+                    self.assertEqual(fdt.get_name(offset), node[0])
+                    for name, value in node[1]:
+                        self.assertEqual(bytes(fdt.getprop(offset, name)), value)
+
+                    children = []
+                    child = fdt.first_subnode(offset, libfdt.QUIET_NOTFOUND)
+                    while child >= 0:
+                        children.append(child)
+                        child = fdt.next_subnode(child, libfdt.QUIET_NOTFOUND)
+
+                    self.assertEqual(len(children), len(node[2]))
+                    stack.extend(zip(children, node[2]))
+
+class CompileTest(unittest.TestCase):
+    def test_errors(self):
+        for text, message in ERRORS:
+            with self.subTest(text=text):
+                with self.assertRaises(DtsError) as cm:
+                    compile_text(text)
+                self.assertEqual(str(cm.exception), message)
+
+    def test_trees(self):
+        for text, root in TREES:
+            with self.subTest(text=text):
+                self.assertEqual(unflatten(compile_text(text))['root'], root)
+
+    def test_memreserve(self):
+        blob = compile_text('/dts-v1/;\n/memreserve/ 0x1000 0x2000;\n/ {\n};\n')
+
+        self.assertEqual(unflatten(blob)['memreserve'], [(0x1000, 0x2000)])
+
+    def test_compare(self):
+        blob = compile_text('/dts-v1/;\n/ {\n\ta = <1>;\n\tn {\n\t};\n};\n')
+        other = compile_text('/dts-v1/;\n/ {\n\ta = <2>;\n\tb;\n};\n')
+
+        self.assertEqual(compare_blobs(blob, blob), [])
+        self.assertEqual(compare_blobs(blob, other), ["/: property a is <0x2> instead of <0x1>",
+                                                      "/: unexpected property b",
+                                                      "/n: node is missing"])
+
+    def test_invalid_blob(self):
+        blob = read_golden(SAMPLES[0][0])
+
+        for invalid in [blob[:20], b'\0' * len(blob), blob[:-1], blob[:-1] + b'x']:
+            with self.subTest(size=len(invalid)):
+                with self.assertRaises(FdtError):
+                    unflatten(invalid)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.expression import evaluate_expression, ExpressionError
+from core.soc_header import SocHeader
+
+MACROS = {
+    'BASE': 0xf8000000,
+    'ZERO': 0,
+    'ONE': 1
+}
+
+# expression, value
+EXPRESSIONS = [
+    # numbers
+    ('12', 12),
+    ('0', 0),
+    ('0x1F', 31),
+    ('0b101', 5),
+    ('010', 10),
+    ('08', 8),
+    ('(010 + 1)', 11),
+    # suffixes
+    ('12u', 12),
+    ('12UL', 12),
+    ('0x10ull', 16),
+    ('(1u << 12)', 4096),
+    # precedence
+    ('1 + 2 * 3', 7),
+    ('(1 + 2) * 3', 9),
+    ('1 << 2 + 1', 8),
+    ('1 | 2 & 3', 3),
+    ('1 ^ 3 | 4', 6),
+    ('2 < 3 == 1', 1),
+    ('-7 / 2', -3),
+    ('-7 % 2', -1),
+    ('~0 & 0xff', 255),
+    ('!0 + !5', 1),
+    ('1 ? 2 : 3 ? 4 : 5', 2),
+    ('0 ? 2 : 0 ? 4 : 5', 5),
+    # macros
+    ('(BASE + 0x10000)', 0xf8010000),
+    ('ONE ? BASE : ZERO', 0xf8000000),
+    # short-circuit, the operand which is not taken is not evaluated
+    ('(1 ? 5 : UNDEF)', 5),
+    ('(0 ? UNDEF : 6)', 6),
+    ('(0 && (1 / 0))', 0),
+    ('(1 || UNDEF)', 1),
+    ('(ZERO && (1 << -1))', 0),
+    ('(1 ? 2 : (0 && UNDEF))', 2),
+    ('(0 ? (1 / 0) : 1 || UNDEF)', 1)
+]
+
+# expression, error message
+ERRORS = [
+    ('1 / 0', "division by zero"),
+    ('1 << -1', "negative shift count -1"),
+    ('(1 + 2', "unexpected end of '(1 + 2'"),
+    ('1 +', "unexpected end of '1 +'"),
+    ('1 ? 2', "unexpected end of '1 ? 2'"),
+    ('0 ? 1 :', "unexpected end of '0 ? 1 :'"),
+    ('1 $ 2', "unexpected '$' in '1 $ 2'"),
+    ('(0 || UNDEF)', "UNDEF is not defined"),
+    ('(1 && UNDEF)', "UNDEF is not defined")
+]
+
+# defines of soc.h, macro, value
+DEFINES = [
+    (['#define A 010\n'], 'A', 10),
+    (['#define A (010)\n'], 'A', 10),
+    (['#define A 08\n', '#define B (A + 1)\n'], 'B', 9),
+    (['#define A B\n', '#define B 12\n'], 'A', 12),
+    (['#define A (B ? 1 : C)\n', '#define B 1\n'], 'A', 1),
+    (['#define A (B && C)\n', '#define B 0\n'], 'A', 0),
+    # cycles
+    (['#define A B\n', '#define B A\n'], 'A', None),
+    (['#define A (A + 1)\n'], 'A', None),
+    (['#define A (B + 1)\n', '#define B (C + 1)\n', '#define C (A + 1)\n'], 'A', None),
+    (['#define A (B ? 1 : A)\n', '#define B 1\n'], 'A', 1)
+]
+
+"""
+lookup: get the value of a macro of MACROS
+
+@name (str): macro name
+
+return (int): value of the macro
+
+raise ExpressionError: the macro is not defined
+"""
+def lookup(name):
+    if name not in MACROS:
+        raise ExpressionError("%s is not defined" % name)
+
+    return MACROS[name]
+
+class ExpressionTest(unittest.TestCase):
+    def test_expressions(self):
+        for text, value in EXPRESSIONS:
+            with self.subTest(text=text):
+                self.assertEqual(evaluate_expression(text, lookup), value)
+
+    def test_errors(self):
+        for text, message in ERRORS:
+            with self.subTest(text=text):
+                with self.assertRaises(ExpressionError) as cm:
+                    evaluate_expression(text, lookup)
+                self.assertEqual(str(cm.exception), message)
+
+    def test_octal(self):
+        self.assertEqual(evaluate_expression('010', lookup, octal=True), 8)
+        self.assertEqual(evaluate_expression('(010 + 1)', lookup, octal=True), 9)
+        with self.assertRaises(ExpressionError):
+            evaluate_expression('08', lookup, octal=True)
+
+    def test_width(self):
+        self.assertEqual(evaluate_expression('(-1)', lookup, 32), 0xffffffff)
+        self.assertEqual(evaluate_expression('(1 << 32)', lookup, 32), 0)
+
+    def test_defines(self):
+        for lines, name, value in DEFINES:
+            with self.subTest(lines=lines):
+                warnings = []
+                self.assertEqual(SocHeader(lines, warnings).evaluate(name), value)
+                # a define which can not be evaluated is reported
+                self.assertEqual(len(warnings), 1 if value is None else 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.core import parse_soc_lines
+from core.generator import generate
+from core.interrupts import check_interrupts
+from core.address_map import check_address_map
+
+# UART_1 to UART_11 are added to the multicores sample, UART_1 is a
+# substring of UART_10 and UART_11
+UARTS = 12
+UART_ADDR = 0xf8020000
+UART_SIZE = 0x100
+UART_IRQ = 18
+
+"""
+get_soc_lines: get the lines of the multicores sample with more UARTs
+
+return (list): lines of soc.h
+"""
+def get_soc_lines():
+    with open(os.path.join(ROOT, 'samples', 'multicores', 'soc.h'), 'r') as f:
+        lines = f.readlines()
+
+    end = max(i for i, line in enumerate(lines) if line.startswith('#endif'))
+    for i in range(1, UARTS):
+        lines.insert(end, "#define SYSTEM_PLIC_SYSTEM_UART_%d_IO_INTERRUPT %d\n" % (i, UART_IRQ + i - 1))
+        lines.insert(end, "#define SYSTEM_UART_%d_IO_CTRL %s\n" % (i, hex(UART_ADDR + i * UART_SIZE)))
+        lines.insert(end, "#define SYSTEM_UART_%d_IO_CTRL_SIZE %s\n" % (i, hex(UART_SIZE)))
+
+    return lines
+
+class ManyPeripheralsTest(unittest.TestCase):
+    def setUp(self):
+        self.lines = get_soc_lines()
+
+    def test_parse(self):
+        uarts = parse_soc_lines(self.lines)['peripherals']['UART']
+
+        self.assertEqual(len(uarts), UARTS)
+        for i in range(1, UARTS):
+            uart = uarts['UART_%d' % i]
+            self.assertEqual(uart.addr, UART_ADDR + i * UART_SIZE)
+            self.assertEqual(uart.size, UART_SIZE)
+            self.assertEqual(uart.interrupts, (UART_IRQ + i - 1,))
+
+    def test_interrupt_map(self):
+        interrupt_map = parse_soc_lines(self.lines)['interrupt_map']
+
+        self.assertEqual(interrupt_map.get(UART_IRQ), ('UART_1',))
+        self.assertEqual(interrupt_map.get(UART_IRQ + 9), ('UART_10',))
+        for irq, owners in interrupt_map.items():
+            self.assertEqual(len(owners), 1, "interrupt %d is shared by %s" % (irq, owners))
+
+    def test_validate(self):
+        model = generate(''.join(self.lines), 'ti180', 'linux').model
+
+        self.assertEqual(check_interrupts(model).errors, [])
+        self.assertEqual(check_address_map(model).errors, [])
+
+if __name__ == '__main__':
+    unittest.main()
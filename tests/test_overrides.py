@@ -0,0 +1,56 @@
+# SPDX-License-Identifier: MIT
+#
+# Copyright (C) 2023 Efinix, Inc.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.core import override_peripherals, get_node_index
+
+"""
+get_buses_node: get a bus tree with a nested node
+
+return (dict): bus nodes
+"""
+def get_buses_node():
+    return {
+        "buses": {
+            "BMB": {
+                "peripherals": {
+                    "UART_0": {
+                        "compatible": "uart",
+                        "dma": {"channel": {"id": "0"}}
+                    }
+                }
+            }
+        }
+    }
+
+class OverrideTest(unittest.TestCase):
+    def test_replaced_node(self):
+        buses_node = get_buses_node()
+        node_index = get_node_index(buses_node)
+
+        override_peripherals(buses_node, {"overrides": {"UART_0": {"dma": {"channel": {"id": "1"}}}}},
+                             node_index, [])
+        override_peripherals(buses_node, {"overrides": {"channel": {"id": "2"}}}, node_index, [])
+
+        uart = buses_node['buses']['BMB']['peripherals']['UART_0']
+        self.assertEqual(uart['dma']['channel']['id'], "2")
+        self.assertIs(node_index['dma'], uart['dma'])
+
+    def test_unmatched(self):
+        buses_node = get_buses_node()
+        warnings = []
+
+        unmatched = override_peripherals(buses_node, {"overrides": {"UART_1": {}}}, None, warnings)
+
+        self.assertEqual(unmatched, ["UART_1"])
+        self.assertEqual(len(warnings), 1)
+
+if __name__ == '__main__':
+    unittest.main()